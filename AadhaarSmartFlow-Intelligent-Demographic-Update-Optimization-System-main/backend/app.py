@@ -1,22 +1,53 @@
 
 # app.py - Complete Backend with ML Model Integration
-from flask import Flask, request, jsonify, send_from_directory
+from flask import Flask, Response, abort, g, request, jsonify, send_file, send_from_directory
 from flask_sqlalchemy import SQLAlchemy
 from flask_cors import CORS
-from flask_bcrypt import Bcrypt
 from flask_jwt_extended import JWTManager, create_access_token, jwt_required, get_jwt_identity, get_jwt
+import atexit
+import heapq
+import itertools
 import json
 from datetime import datetime, timedelta
 import hashlib
 import logging
-from sqlalchemy import func, desc
+import re
+from sqlalchemy import func, desc, case, event, update
+from sqlalchemy.engine import make_url
+from sqlalchemy.dialects.postgresql import JSONB, insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from werkzeug.utils import secure_filename
+from sqlalchemy.orm import deferred, undefer_group
 import os
 import warnings
+from migrate import run_migrations
+from serialization import STREAM_FETCH_ROWS, FastJSONProvider, streaming_response
+from response_cache import ChangeCounters, ResponseCache
+from events import EventHub, create_broker, sse_stream
+from notifications import NotificationService, decode_cursor
+from storage import ContentStore, HashingTempFile, StoreRequest, DIGEST_PATTERN
+from serving import send_document, send_static_asset
+from validation import DocumentValidator
+from passwords import PasswordHasher, PasswordHasherBusy
+from identity import IdentityCache, snapshot
+from ratelimit import Policy, RateLimiter, create_backend as create_rate_limit_backend
+from idempotency import IdempotencyStore
+from search import MAX_RANKED_CANDIDATES, search_requests, search_supported
+from scheduler import OPEN_STATUSES, ReviewScheduler
+from rebalance import Rebalancer
+from routing import CenterRouter
+from eta import EtaEngine, format_eta
+from metrics import MetricsEngine
+from archive import Archiver
+from export import ExportDataset, ExportSource, Exporter, mask_aadhaar
+from transitions import READ_LIMIT as TRANSITION_READ_LIMIT, TransitionLog
+from timeseries import EVENTS as ROLLUP_EVENTS, GROUPABLE as ROLLUP_GROUPS, TIERS as ROLLUP_TIERS, RollupStore
 warnings.filterwarnings('ignore')
 
 
 # Initialize Flask app
 app = Flask(__name__, static_folder='../public')
+app.json = FastJSONProvider(app)
 
 # BASE directory
 BASE_DIR = os.path.abspath(os.path.dirname(__file__))
@@ -25,10 +56,18 @@ BASE_DIR = os.path.abspath(os.path.dirname(__file__))
 INSTANCE_DIR = os.path.join(BASE_DIR, "instance")
 os.makedirs(INSTANCE_DIR, exist_ok=True)
 
+# Finished exports are written here
+EXPORT_FOLDER = os.getenv('EXPORT_FOLDER', os.path.join(INSTANCE_DIR, "exports"))
+
 # Ensure upload folder exists
-UPLOAD_FOLDER = os.path.join(BASE_DIR, "uploads")
+UPLOAD_FOLDER = os.getenv('UPLOAD_FOLDER', os.path.join(BASE_DIR, "uploads"))
 os.makedirs(UPLOAD_FOLDER, exist_ok=True)
 
+# Uploads stream straight into the content-addressed store while being hashed
+document_store = ContentStore(UPLOAD_FOLDER)
+StoreRequest.content_store = document_store
+app.request_class = StoreRequest
+
 # Configure CORS for React frontend
 CORS(app,
      resources={r"/api/*": {"origins": ["http://localhost:8080", "http://127.0.0.1:8080", "http://localhost:8081", "http://127.0.0.1:8081"]}},
@@ -38,17 +77,40 @@ CORS(app,
 
 # Configuration
 app.config['SECRET_KEY'] = os.getenv('SECRET_KEY', 'aadhaar-smartflow-secret-key-2024')
-app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{os.path.join(INSTANCE_DIR, 'aadhaar.db')}"
+app.config['SQLALCHEMY_DATABASE_URI'] = os.getenv('DATABASE_URL', f"sqlite:///{os.path.join(INSTANCE_DIR, 'aadhaar.db')}")
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
 app.config['JWT_SECRET_KEY'] = os.getenv('JWT_SECRET_KEY', 'jwt-aadhaar-secret-2024')
 app.config['JWT_ACCESS_TOKEN_EXPIRES'] = timedelta(hours=24)
 app.config['UPLOAD_FOLDER'] = UPLOAD_FOLDER
 app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 16MB max file size
+# Hand file bodies to the front proxy: nginx X-Accel-Redirect prefix, or X-Sendfile
+app.config['DOCUMENT_ACCEL_PREFIX'] = os.getenv('DOCUMENT_ACCEL_PREFIX')
+app.config['USE_X_SENDFILE'] = os.getenv('USE_X_SENDFILE', 'false').lower() in ('1', 'true', 'yes')
+# bcrypt cost factor; existing hashes are upgraded on the next successful login
+app.config['BCRYPT_LOG_ROUNDS'] = int(os.getenv('BCRYPT_LOG_ROUNDS', '12'))
+# Size of the password hashing process pool (0 hashes inline on the request thread)
+app.config['PASSWORD_HASH_WORKERS'] = int(os.getenv('PASSWORD_HASH_WORKERS')) if os.getenv('PASSWORD_HASH_WORKERS') else None
+# Hashing calls allowed to queue or run at once; beyond that logins get 503 + Retry-After
+app.config['PASSWORD_HASH_MAX_PENDING'] = int(os.getenv('PASSWORD_HASH_MAX_PENDING')) if os.getenv('PASSWORD_HASH_MAX_PENDING') else None
+app.config['RATE_LIMIT_ENABLED'] = os.getenv('RATE_LIMIT_ENABLED', 'true').lower() in ('1', 'true', 'yes')
+# Seconds between work-stealing passes over officer and center queues (0 turns it off)
+app.config['REBALANCE_INTERVAL_SECONDS'] = int(os.getenv('REBALANCE_INTERVAL_SECONDS', '300'))
+# Closed requests and audit logs older than this move to the archive tables
+app.config['ARCHIVE_AFTER_DAYS'] = int(os.getenv('ARCHIVE_AFTER_DAYS', '90'))
+# Seconds between archiving passes (0 turns it off)
+app.config['ARCHIVE_INTERVAL_SECONDS'] = int(os.getenv('ARCHIVE_INTERVAL_SECONDS', '3600'))
+# Seconds between polls of the request transition log (0 turns the follower off)
+app.config['TRANSITION_POLL_SECONDS'] = int(os.getenv('TRANSITION_POLL_SECONDS', '1'))
+# Superseded transitions older than this are compacted away
+app.config['TRANSITION_COMPACT_AFTER_DAYS'] = int(os.getenv('TRANSITION_COMPACT_AFTER_DAYS', '30'))
 
 # Initialize extensions
 db = SQLAlchemy(app)
-bcrypt = Bcrypt(app)
 jwt = JWTManager(app)
+password_hasher = PasswordHasher(rounds=app.config['BCRYPT_LOG_ROUNDS'],
+                                 max_workers=app.config['PASSWORD_HASH_WORKERS'],
+                                 max_pending=app.config['PASSWORD_HASH_MAX_PENDING'])
+atexit.register(password_hasher.shutdown)
 
 # Configure logging
 logging.basicConfig(
@@ -60,6 +122,16 @@ logger = logging.getLogger(__name__)
 
 # ==================== DATABASE MODELS ====================
 
+# Native JSON storage: JSON1 text on SQLite, JSONB on Postgres
+JSONType = db.JSON().with_variant(JSONB(), 'postgresql')
+
+# Generated columns are plain SQL, and each database spells JSON paths its own way.
+# Postgres only has stored generated columns.
+if make_url(app.config['SQLALCHEMY_DATABASE_URI']).get_backend_name() == 'postgresql':
+    PRIMARY_DOCUMENT_TYPE = db.Computed("document_types->>0", persisted=True)
+else:
+    PRIMARY_DOCUMENT_TYPE = db.Computed("json_extract(document_types, '$[0]')")
+
 class User(db.Model):
     __tablename__ = 'users'
     id = db.Column(db.Integer, primary_key=True)
@@ -76,10 +148,10 @@ class User(db.Model):
     last_updated = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
     def set_password(self, password):
-        self.password_hash = bcrypt.generate_password_hash(password).decode('utf-8')
+        self.password_hash = password_hasher.hash(password)
 
     def check_password(self, password):
-        return bcrypt.check_password_hash(self.password_hash, password)
+        return password_hasher.verify(password, self.password_hash)
 
     def to_dict(self):
         return {
@@ -104,8 +176,11 @@ class UpdateRequest(db.Model):
     status = db.Column(db.String(20), default='pending')
     old_data = db.Column(db.Text)
     new_data = db.Column(db.Text)
-    documents = db.Column(db.Text)
-    document_types = db.Column(db.Text)
+    # Decoded lazily, only when a caller serializes with details
+    details = deferred(db.Column(JSONType), group='details')
+    documents = deferred(db.Column(JSONType), group='details')
+    document_types = db.Column(JSONType)
+    primary_document_type = db.Column(db.String(50), PRIMARY_DOCUMENT_TYPE)
     risk_score = db.Column(db.Float, default=0.0)
     is_duplicate = db.Column(db.Boolean, default=False)
     duplicate_confidence = db.Column(db.Float, default=0.0)
@@ -117,6 +192,8 @@ class UpdateRequest(db.Model):
     completed_at = db.Column(db.DateTime)
     assigned_officer = db.Column(db.String(100))
     processing_center = db.Column(db.String(100))
+    assigned_officer_id = db.Column(db.Integer, db.ForeignKey('officers.id'))
+    processing_center_id = db.Column(db.Integer, db.ForeignKey('processing_centers.id'))
     auto_approved = db.Column(db.Boolean, default=False)
     rejection_reason = db.Column(db.Text)
 
@@ -124,10 +201,13 @@ class UpdateRequest(db.Model):
         db.Index('idx_aadhaar_status', 'aadhaar_id', 'status'),
         db.Index('idx_submitted_at', 'submitted_at'),
         db.Index('idx_duplicate', 'is_duplicate'),
+        db.Index('idx_officer_queue', 'assigned_officer_id', 'status', 'submitted_at'),
+        db.Index('idx_center_queue', 'processing_center_id', 'status', 'submitted_at'),
+        db.Index('idx_document_type', 'primary_document_type'),
     )
 
-    def to_dict(self):
-        return {
+    def to_dict(self, include_details=True):
+        data = {
             'id': self.id,
             'request_id': self.request_id,
             'aadhaar_id': self.aadhaar_id,
@@ -145,12 +225,13 @@ class UpdateRequest(db.Model):
             'completed_at': self.completed_at.isoformat() if self.completed_at else None,
             'auto_approved': self.auto_approved,
             'assigned_officer': self.assigned_officer,
-            'processing_center': self.processing_center,
-            'details': json.loads(self.old_data) if self.old_data and self.old_data.startswith('[') else [
-                {'field': self.update_type, 'oldValue': self.old_data, 'newValue': self.new_data}
-            ],
-            'documents': json.loads(self.documents) if self.documents and self.documents.startswith('[') else []
+            'processing_center': self.processing_center
         }
+        if include_details:
+            data['details'] = self.details if self.details is not None else build_request_details(
+                self.update_type, self.old_data, self.new_data)
+            data['documents'] = self.documents or []
+        return data
 
 
 class Officer(db.Model):
@@ -163,19 +244,25 @@ class Officer(db.Model):
     role = db.Column(db.String(20), default='officer')
     department = db.Column(db.String(100))
     processing_center = db.Column(db.String(100))
+    processing_center_id = db.Column(db.Integer, db.ForeignKey('processing_centers.id'))
     designation = db.Column(db.String(50))
     is_active = db.Column(db.Boolean, default=True)
     current_workload = db.Column(db.Integer, default=0)
     max_workload = db.Column(db.Integer, default=100)
     total_processed = db.Column(db.Integer, default=0)
+    # Share of decisions agreeing with the heuristic risk band (metrics.py), not verified accuracy
     accuracy_score = db.Column(db.Float, default=0.0)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
+    __table_args__ = (
+        db.Index('idx_officer_center', 'processing_center_id', 'is_active', 'current_workload'),
+    )
+
     def set_password(self, password):
-        self.password_hash = bcrypt.generate_password_hash(password).decode('utf-8')
+        self.password_hash = password_hasher.hash(password)
 
     def check_password(self, password):
-        return bcrypt.check_password_hash(self.password_hash, password)
+        return password_hasher.verify(password, self.password_hash)
 
     def to_dict(self):
         return {
@@ -245,6 +332,229 @@ class AuditLog(db.Model):
         }
 
 
+class ArchivedRequest(db.Model):
+    # A closed update_requests row moved out of the hot table; see archive.py
+    __tablename__ = 'archived_requests'
+    id = db.Column(db.Integer, primary_key=True)
+    request_id = db.Column(db.String(20), unique=True, nullable=False)
+    aadhaar_id = db.Column(db.String(12), nullable=False)
+    update_type = db.Column(db.String(50), nullable=False)
+    status = db.Column(db.String(20))
+    risk_score = db.Column(db.Float)
+    submitted_at = db.Column(db.DateTime)
+    completed_at = db.Column(db.DateTime)
+    processing_center_id = db.Column(db.Integer)
+    assigned_officer_id = db.Column(db.Integer)
+    # The remaining update_requests columns
+    record = db.Column(JSONType, nullable=False)
+    archived_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        db.Index('idx_archived_aadhaar', 'aadhaar_id', 'submitted_at'),
+    )
+
+    def to_dict(self, include_details=True):
+        return archiver.restore(self).to_dict(include_details)
+
+
+class ArchiveRollup(db.Model):
+    # Counts of archived requests, so totals and distributions never read the archive
+    __tablename__ = 'archive_rollups'
+    month = db.Column(db.String(7), primary_key=True)
+    update_type = db.Column(db.String(50), primary_key=True)
+    status = db.Column(db.String(20), primary_key=True)
+    count = db.Column(db.Integer, default=0, nullable=False)
+    auto_approved = db.Column(db.Integer, default=0, nullable=False)
+    duplicates = db.Column(db.Integer, default=0, nullable=False)
+
+
+class RequestRollup(db.Model):
+    # Request events counted per hour/day/month bucket; see timeseries.py
+    __tablename__ = 'request_rollups'
+    tier = db.Column(db.String(5), primary_key=True)
+    event = db.Column(db.String(10), primary_key=True)
+    bucket = db.Column(db.DateTime, primary_key=True)
+    update_type = db.Column(db.String(50), primary_key=True)
+    status = db.Column(db.String(20), primary_key=True)
+    # 0 for requests without a center
+    center_id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    auto_approved = db.Column(db.Boolean, primary_key=True)
+    is_duplicate = db.Column(db.Boolean, primary_key=True)
+    count = db.Column(db.Integer, default=0, nullable=False)
+
+
+class ExportJob(db.Model):
+    # A background CSV/Parquet export and the offset it has reached; see export.py
+    __tablename__ = 'export_jobs'
+    id = db.Column(db.String(32), primary_key=True)
+    dataset = db.Column(db.String(20), nullable=False)
+    format = db.Column(db.String(10), nullable=False)
+    filters = db.Column(JSONType)
+    status = db.Column(db.String(10), default='queued', nullable=False)
+    source_index = db.Column(db.Integer, default=0)
+    last_id = db.Column(db.Integer, default=0)
+    rows_written = db.Column(db.Integer, default=0)
+    # CSV byte offset, or Parquet parts closed, at the last recorded offset
+    checkpoint = db.Column(db.BigInteger, default=0)
+    error = db.Column(db.Text)
+    requested_by = db.Column(db.String(50))
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow)
+    finished_at = db.Column(db.DateTime)
+    # The exporter running the job and until when; see Exporter._claim
+    lease_owner = db.Column(db.String(32))
+    lease_until = db.Column(db.DateTime)
+
+    __table_args__ = (
+        db.Index('idx_export_status', 'status', 'created_at'),
+    )
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'dataset': self.dataset,
+            'format': self.format,
+            'filters': self.filters or {},
+            'status': self.status,
+            'rows_written': self.rows_written or 0,
+            'error': self.error,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None
+        }
+
+
+class RequestTransition(db.Model):
+    # One change to a request's status or assignment; see transitions.py
+    __tablename__ = 'request_transitions'
+    seq = db.Column(db.Integer, primary_key=True)
+    request_pk = db.Column(db.Integer, nullable=False)
+    # transitions.STATUS_CODES
+    from_status = db.Column(db.SmallInteger, nullable=False)
+    to_status = db.Column(db.SmallInteger, nullable=False)
+    center_id = db.Column(db.Integer)
+    officer_id = db.Column(db.Integer)
+    at = db.Column(db.DateTime, nullable=False)
+
+    __table_args__ = (
+        db.Index('idx_transition_request', 'request_pk', 'seq'),
+        # Deleted seqs are never handed out again, so offsets stay valid after compaction
+        {'sqlite_autoincrement': True},
+    )
+
+
+class TransitionOffset(db.Model):
+    # How far a durable consumer has read request_transitions
+    __tablename__ = 'transition_offsets'
+    consumer = db.Column(db.String(50), primary_key=True)
+    seq = db.Column(db.Integer, default=0, nullable=False)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+
+class ArchivedAuditLog(db.Model):
+    __tablename__ = 'archived_audit_logs'
+    id = db.Column(db.Integer, primary_key=True)
+    action = db.Column(db.String(100), nullable=False)
+    user_id = db.Column(db.String(50))
+    user_type = db.Column(db.String(20))
+    details = db.Column(db.Text)
+    ip_address = db.Column(db.String(45))
+    timestamp = db.Column(db.DateTime)
+
+    __table_args__ = (
+        db.Index('idx_archived_audit_timestamp', 'timestamp'),
+    )
+
+
+class Notification(db.Model):
+    __tablename__ = 'notifications'
+    id = db.Column(db.Integer, primary_key=True)
+    aadhaar_id = db.Column(db.String(12), nullable=False)
+    request_id = db.Column(db.String(20))
+    type = db.Column(db.String(20), default='info')
+    title = db.Column(db.String(100))
+    message = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    read_at = db.Column(db.DateTime)
+
+    __table_args__ = (
+        db.Index('idx_notification_inbox', 'aadhaar_id', 'created_at', 'id'),
+        db.Index('idx_notification_created', 'created_at'),
+    )
+
+    def to_dict(self, relative_time=True):
+        data = {
+            'id': self.id,
+            'type': self.type,
+            'title': self.title,
+            'message': self.message,
+            'requestId': self.request_id,
+            'read': self.read_at is not None,
+            'created_at': self.created_at.isoformat() if self.created_at else None
+        }
+        # Relative times go stale, so cached responses leave them to the client
+        if relative_time:
+            data['time'] = format_relative_time(self.created_at)
+        return data
+
+
+class StoredDocument(db.Model):
+    __tablename__ = 'stored_documents'
+    sha256 = db.Column(db.String(64), primary_key=True)
+    size = db.Column(db.Integer, nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+
+class DocumentMeta(db.Model):
+    __tablename__ = 'document_meta'
+    sha256 = db.Column(db.String(64), db.ForeignKey('stored_documents.sha256'), primary_key=True)
+    status = db.Column(db.String(20), default='pending', nullable=False)  # pending, valid, invalid
+    detected_type = db.Column(db.String(50))
+    page_count = db.Column(db.Integer)
+    width = db.Column(db.Integer)
+    height = db.Column(db.Integer)
+    phash = db.Column(db.String(16))
+    reused_image = db.Column(db.Boolean, default=False, nullable=False)
+    errors = db.Column(db.Text)
+    validated_at = db.Column(db.DateTime)
+
+    __table_args__ = (
+        db.Index('idx_document_meta_status', 'status', 'sha256', 'reused_image'),
+        db.Index('idx_document_meta_phash', 'phash'),
+    )
+
+
+class IdempotencyKey(db.Model):
+    __tablename__ = 'idempotency_keys'
+    id = db.Column(db.Integer, primary_key=True)
+    scope = db.Column(db.String(64), nullable=False)
+    key = db.Column(db.String(255), nullable=False)
+    fingerprint = db.Column(db.String(64), nullable=False)
+    status_code = db.Column(db.Integer)  # NULL while the first request is running
+    response = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+
+    __table_args__ = (
+        db.UniqueConstraint('scope', 'key', name='uq_idempotency_scope_key'),
+        db.Index('idx_idempotency_created', 'created_at'),
+    )
+
+
+class MetricState(db.Model):
+    # Mergeable running statistics per subject ('overall', 'center:<id>', 'officer:<id>'), plus the recompute epoch
+    __tablename__ = 'metric_states'
+    key = db.Column(db.String(64), primary_key=True)
+    state = db.Column(JSONType, nullable=False)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+
+class NotificationCounter(db.Model):
+    __tablename__ = 'notification_counters'
+    aadhaar_id = db.Column(db.String(12), primary_key=True)
+    unread = db.Column(db.Integer, default=0, nullable=False)
+    # When every notification was last marked read; older unflushed deltas no longer apply
+    reset_at = db.Column(db.DateTime)
+
+
 class MLModelMetrics(db.Model):
     __tablename__ = 'ml_model_metrics'
     id = db.Column(db.Integer, primary_key=True)
@@ -374,7 +684,8 @@ class MLModelManager:
             return {'is_life_event': True, 'type': 'name_change', 'confidence': 0.70, 'method': 'rule_based'}
         return {'is_life_event': False, 'type': 'other', 'confidence': 0.0, 'method': 'rule_based'}
 
-    def calculate_risk_score(self, update_request, user_data, life_event_info):
+    def calculate_risk_score(self, update_request, user_data, life_event_info, recent_submissions=None):
+        # recent_submissions: the applicant's submissions in the last 30 days, counted here when not given
         try:
             base_score = 0.0
             if user_data and user_data.date_of_birth:
@@ -405,8 +716,9 @@ class MLModelManager:
             if life_event_info['is_life_event']:
                 base_score *= 0.7
 
-            recent_submissions = UpdateRequest.query.filter_by(aadhaar_id=update_request.aadhaar_id).filter(
-                UpdateRequest.submitted_at >= datetime.utcnow() - timedelta(days=30)).count()
+            if recent_submissions is None:
+                recent_submissions = UpdateRequest.query.filter_by(aadhaar_id=update_request.aadhaar_id).filter(
+                    UpdateRequest.submitted_at >= datetime.utcnow() - timedelta(days=30)).count()
             if recent_submissions > 2:
                 base_score += min(0.3, recent_submissions * 0.1)
 
@@ -447,6 +759,83 @@ class MLModelManager:
 
 _ml_manager_instance = None
 
+# Request update_type -> User column changed on approval
+USER_UPDATE_FIELDS = {
+    'name_change': 'name',
+    'address_change': 'address',
+    'phone_change': 'phone',
+    'marital_status': 'marital_status'
+}
+
+COMPLETED_STATUSES = ('approved', 'rejected', 'auto_approved')
+MAX_BULK_REVIEW = 500
+MAX_SEARCH_PAGE_SIZE = 100
+MAX_SEARCH_RESULTS = 1000
+
+change_counters = ChangeCounters()
+response_cache = ResponseCache(change_counters)
+
+event_hub = EventHub()
+event_broker = create_broker(event_hub)
+
+notification_service = NotificationService(
+    app, db, Notification, NotificationCounter,
+    on_delivered=lambda aadhaar_ids: change_counters.bump(*(('user', a) for a in aadhaar_ids))
+)
+atexit.register(notification_service.close)
+
+
+
+def load_identity(user_type, identity):
+    if user_type == 'user':
+        row = User.query.filter_by(aadhaar_id=identity).first()
+    else:
+        row = Officer.query.filter_by(officer_id=identity).first()
+    return snapshot(user_type, identity, row) if row else None
+
+
+identity_cache = IdentityCache(load_identity)
+
+# endpoint -> token buckets that must all have a token; per_minute is the sustained rate
+RATE_LIMIT_POLICIES = {
+    'login': [Policy('ip', per_minute=60, burst=30), Policy('account', per_minute=10, burst=10)],
+    'submit': [Policy('ip', per_minute=120, burst=60), Policy('identity', per_minute=20, burst=10)],
+}
+
+
+def rate_limit_account():
+    data = request.get_json(silent=True) or {}
+    account = data.get('aadhaar_id') or data.get('email')
+    return str(account) if account else None
+
+
+rate_limiter = RateLimiter(
+    create_rate_limit_backend(),
+    RATE_LIMIT_POLICIES,
+    scopes={
+        'ip': lambda: request.remote_addr,
+        'identity': get_jwt_identity,
+        'account': rate_limit_account
+    },
+    enabled=app.config['RATE_LIMIT_ENABLED']
+)
+
+idempotency_store = IdempotencyStore(db, IdempotencyKey)
+
+review_scheduler = ReviewScheduler()
+
+DOCUMENT_DIGEST_PATTERN = re.compile(r'([0-9a-f]{64})')
+
+# status -> (notification type, title, message)
+NOTIFICATION_TEMPLATES = {
+    'pending': ('info', 'Request Received', "Your {type} request ({id}) has been received."),
+    'processing': ('info', 'Under Officer Review', "Your {type} request ({id}) has been assigned for officer review."),
+    'auto_approved': ('success', 'Update Auto-Approved', "Your {type} request ({id}) has been automatically approved."),
+    'approved': ('success', 'Update Approved', "Your {type} request ({id}) has been approved."),
+    'rejected': ('error', 'Request Rejected', "Your {type} request ({id}) was rejected."),
+    'duplicate': ('warning', 'Duplicate Request Detected', "Your {type} request ({id}) matches a recent submission and was not processed.")
+}
+
 
 # ==================== HELPER FUNCTIONS ====================
 
@@ -468,26 +857,381 @@ def log_audit(action, user_id=None, user_type=None, details=""):
         )
         db.session.add(audit)
         db.session.commit()
+        change_counters.bump(('audit',))
     except Exception as e:
         logger.error(f"Audit log error: {e}")
 
 
+def bump_request_versions(*update_requests):
+    # Call after commit so cached reads never pair old data with a new version
+    keys = {('requests',)}
+    for update_request in update_requests:
+        keys.add(('request', update_request.request_id))
+        keys.add(('user', update_request.aadhaar_id))
+    change_counters.bump(*keys)
+
+
+def publish_transition(update_request, previous_status, officer_id=None):
+    message = {
+        'event': 'status',
+        'request_id': update_request.request_id,
+        'update_type': update_request.update_type,
+        'status': update_request.status,
+        'previous_status': previous_status,
+        'timestamp': datetime.utcnow().isoformat()
+    }
+    channels = [f'user:{update_request.aadhaar_id}']
+    if officer_id:
+        channels.append(f'officer:{officer_id}')
+    for channel in channels:
+        try:
+            event_broker.publish(channel, message)
+        except Exception as e:
+            logger.error(f"Event publish error: {e}")
+
+    template = NOTIFICATION_TEMPLATES.get(update_request.status)
+    if template:
+        kind, title, text = template
+        text = text.format(type=update_request.update_type.replace('_', ' '), id=update_request.request_id)
+        if update_request.status == 'rejected' and update_request.rejection_reason:
+            text += f" Reason: {update_request.rejection_reason}"
+        notification_service.enqueue(update_request.aadhaar_id, title, text, kind, update_request.request_id)
+
+
+def format_relative_time(timestamp):
+    if not timestamp:
+        return ""
+    seconds = (datetime.utcnow() - timestamp).total_seconds()
+    if seconds < 60:
+        return "Just now"
+    for unit, size in (('week', 604800), ('day', 86400), ('hour', 3600), ('minute', 60)):
+        if seconds >= size:
+            count = int(seconds // size)
+            return f"{count} {unit}{'s' if count > 1 else ''} ago"
+
+
+def build_request_details(update_type, old_data, new_data):
+    # Clients may send old_data as a JSON list of field changes
+    if isinstance(old_data, list):
+        return old_data
+    if old_data and old_data.startswith('['):
+        try:
+            return json.loads(old_data)
+        except ValueError:
+            pass
+    return [{'field': update_type, 'oldValue': old_data, 'newValue': new_data}]
+
+
+def wants_details():
+    return request.args.get('include_details', 'false').lower() in ('1', 'true', 'yes')
+
+
+def wants_stream():
+    return request.args.get('stream', 'false').lower() in ('1', 'true', 'yes')
+
+
+def apply_user_update(aadhaar_id, update_request):
+    # Set-based, so the caller needs no loaded User; callers invalidate the cached principal after commit
+    values = {'last_updated': datetime.utcnow()}
+    field = USER_UPDATE_FIELDS.get(update_request.update_type)
+    if field:
+        values[field] = update_request.new_data
+    db.session.execute(
+        update(User)
+        .where(User.aadhaar_id == aadhaar_id)
+        .values(values)
+        .execution_options(synchronize_session=False)
+    )
+
+
+def load_review_queue():
+    rows = db.session.query(
+        UpdateRequest.id, UpdateRequest.submitted_at, UpdateRequest.update_type, UpdateRequest.risk_score,
+        UpdateRequest.processing_center_id, UpdateRequest.assigned_officer_id
+    ).filter(UpdateRequest.status.in_(OPEN_STATUSES)).yield_per(5000)
+    review_scheduler.rebuild(rows)
+
+
+def next_requests_for_officer(officer, n, include_details=False):
+    # Built lazily for workers that did not go through __main__
+    if not review_scheduler.loaded:
+        load_review_queue()
+    ids = review_scheduler.next_for_officer(officer.id, officer.processing_center_id, n)
+    if not ids:
+        return []
+    query = UpdateRequest.query.filter(UpdateRequest.id.in_(ids))
+    if include_details:
+        query = query.options(undefer_group('details'))
+    by_id = {r.id: r for r in query.all()}
+    return [by_id[i] for i in ids if i in by_id]
+
+
+def load_recent_completions(since):
+    return db.session.query(UpdateRequest.processed_at, UpdateRequest.processing_center_id,
+                            UpdateRequest.assigned_officer_id).filter(
+        UpdateRequest.processed_at >= since, UpdateRequest.assigned_officer_id.isnot(None),
+        UpdateRequest.auto_approved.isnot(True)).all()
+
+
+eta_engine = EtaEngine(review_scheduler, load_recent_completions)
+
+metrics_engine = MetricsEngine(app, db, MetricState, Officer, ProcessingCenter, UpdateRequest, ArchivedRequest)
+atexit.register(metrics_engine.flush)
+
+rollup_store = RollupStore(app, db, RequestRollup, UpdateRequest, ArchivedRequest)
+atexit.register(rollup_store.flush)
+
+transition_log = TransitionLog(app, db, RequestTransition, TransitionOffset, UpdateRequest,
+                               interval=app.config['TRANSITION_POLL_SECONDS'],
+                               compact_after_days=app.config['TRANSITION_COMPACT_AFTER_DAYS'])
+transition_log.capture()
+atexit.register(transition_log.stop)
+
+
+def transitions_committed(entries):
+    # Keeps this worker's review queues and cached responses in step with changes made by other workers.
+    # Changes this worker made itself are applied a second time, which is harmless.
+    pks = {e['request_pk'] for e in entries}
+    rows = UpdateRequest.query.filter(UpdateRequest.id.in_(pks)).all()
+    centers = {e['center_id'] for e in entries}
+    if review_scheduler.loaded:
+        for pk in pks:
+            position = review_scheduler.position(pk, limit=1)
+            if position:
+                centers.add(position[0])
+        for update_request in rows:
+            review_scheduler.upsert(update_request)
+        for pk in pks - {r.id for r in rows}:
+            review_scheduler.remove(pk)
+    bump_request_versions(*rows)
+    change_counters.bump(*{('queue', center_id) for center_id in centers})
+
+
+transition_log.follow('caches', transitions_committed)
+
+
+def requests_rebalanced(moves):
+    for move in moves:
+        review_scheduler.reassign(move['id'], move['to_center'], move['to_officer'])
+    with app.app_context():
+        moved = UpdateRequest.query.filter(UpdateRequest.id.in_([m['id'] for m in moves])).all()
+        officer_pks = {m['from_officer'] for m in moves} | {m['to_officer'] for m in moves}
+        officers = dict(db.session.query(Officer.id, Officer.officer_id).filter(Officer.id.in_(officer_pks)))
+    identity_cache.invalidate(*(('officer', officer_id) for officer_id in officers.values()))
+    bump_request_versions(*moved)
+    change_counters.bump(('audit',), *{('queue', m[side]) for m in moves for side in ('from_center', 'to_center')})
+    # Requests taken from a center's unassigned pool are now under officer review
+    from_status = {m['id']: m['from_status'] for m in moves}
+    for update_request in moved:
+        if from_status[update_request.id] != update_request.status:
+            publish_transition(update_request, from_status[update_request.id],
+                               officers.get(update_request.assigned_officer_id))
+
+
+rebalancer = Rebalancer(app, db, UpdateRequest, Officer, ProcessingCenter, AuditLog, on_moved=requests_rebalanced,
+                        interval=app.config['REBALANCE_INTERVAL_SECONDS'], transitions=transition_log)
+atexit.register(rebalancer.stop)
+
+archiver = Archiver(app, db, UpdateRequest, ArchivedRequest, ArchiveRollup, AuditLog, ArchivedAuditLog,
+                    on_archived=lambda rows: bump_request_versions(*rows),
+                    days=app.config['ARCHIVE_AFTER_DAYS'], interval=app.config['ARCHIVE_INTERVAL_SECONDS'])
+atexit.register(archiver.stop)
+
+
+REQUEST_EXPORT_COLUMNS = [
+    ('id', 'int'), ('request_id', 'str'), ('aadhaar_id', 'str'), ('update_type', 'str'), ('sub_type', 'str'),
+    ('status', 'str'), ('risk_score', 'float'), ('is_duplicate', 'bool'), ('duplicate_confidence', 'float'),
+    ('is_life_event', 'bool'), ('life_event_type', 'str'), ('life_event_confidence', 'float'),
+    ('auto_approved', 'bool'), ('submitted_at', 'datetime'), ('processed_at', 'datetime'),
+    ('completed_at', 'datetime'), ('processing_center_id', 'int'), ('assigned_officer_id', 'int'),
+    ('rejection_reason', 'str'),
+]
+AUDIT_EXPORT_COLUMNS = [
+    ('id', 'int'), ('action', 'str'), ('user_id', 'str'), ('user_type', 'str'), ('details', 'str'),
+    ('timestamp', 'datetime'),
+]
+
+
+def request_export_values(update_request):
+    # Old and new values are personal data and stay out of exports
+    values = {name: getattr(update_request, name) for name, _ in REQUEST_EXPORT_COLUMNS}
+    values['aadhaar_id'] = mask_aadhaar(values['aadhaar_id'])
+    return values
+
+
+def audit_export_values(log):
+    values = {name: getattr(log, name) for name, _ in AUDIT_EXPORT_COLUMNS}
+    if log.user_type == 'user':
+        values['user_id'] = mask_aadhaar(values['user_id'])
+    return values
+
+
+exporter = Exporter(app, db, ExportJob, {
+    'requests': ExportDataset(REQUEST_EXPORT_COLUMNS, [
+        ExportSource(ArchivedRequest, ArchivedRequest.submitted_at,
+                     {'status': ArchivedRequest.status, 'center_id': ArchivedRequest.processing_center_id},
+                     lambda row: request_export_values(archiver.restore(row))),
+        ExportSource(UpdateRequest, UpdateRequest.submitted_at,
+                     {'status': UpdateRequest.status, 'center_id': UpdateRequest.processing_center_id},
+                     request_export_values),
+    ]),
+    'audit_logs': ExportDataset(AUDIT_EXPORT_COLUMNS, [
+        ExportSource(ArchivedAuditLog, ArchivedAuditLog.timestamp, {'action': ArchivedAuditLog.action},
+                     audit_export_values),
+        ExportSource(AuditLog, AuditLog.timestamp, {'action': AuditLog.action}, audit_export_values),
+    ]),
+}, EXPORT_FOLDER)
+
+
+def find_request(request_id):
+    # The hot row, else a detached copy rebuilt from the archive
+    update_request = UpdateRequest.query.options(undefer_group('details')).filter_by(request_id=request_id).first()
+    return update_request or archiver.find(request_id)
+
+
+def submitted_key(row):
+    return row.submitted_at or datetime.min
+
+
+def paginate_with_archive(hot_query, archive_query, page, per_page):
+    # One page of hot and archived requests, both ordered by submitted_at desc, merged the same way.
+    # Archived requests were closed long ago, but may have been submitted after one still open.
+    total = hot_query.order_by(None).count() + archive_query.order_by(None).count()
+    offset = max(0, page - 1) * per_page
+    end = offset + per_page
+    rows = heapq.merge(hot_query.limit(end).all(), archive_query.limit(end).all(), key=submitted_key, reverse=True)
+    items = [archiver.restore(row) if isinstance(row, ArchivedRequest) else row
+             for row in itertools.islice(rows, offset, end)]
+    return items, total
+
+
+def merged_rows(*queries, limit=None):
+    # Rows of requests queries ordered by submitted_at desc, merged newest first, fetched in chunks
+    rows = heapq.merge(*(query.yield_per(STREAM_FETCH_ROWS) for query in queries), key=submitted_key, reverse=True)
+    return itertools.islice(rows, limit) if limit else rows
+
+
+def tiered_rows(*queries, limit=None):
+    # The rows of each query in turn, hot table first, fetched in chunks. Only for tables
+    # whose archive holds strictly older rows, like audit logs by timestamp.
+    rows = itertools.chain.from_iterable(query.yield_per(STREAM_FETCH_ROWS) for query in queries)
+    return itertools.islice(rows, limit) if limit else rows
+
+
+def current_principal():
+    # Resolves the JWT subject once per request; later calls reuse it
+    key = ('user' if get_jwt().get('user_type') == 'user' else 'officer', get_jwt_identity())
+    cached = g.get('principal')
+    if cached is None or cached[0] != key:
+        cached = g.principal = (key, identity_cache.get(*key))
+    return cached[1]
+
+
+def rehash_password(account, password):
+    # Upgrades hashes made at an older cost factor; a failure here must not fail the login
+    if not password_hasher.needs_rehash(account.password_hash):
+        return
+    try:
+        account.set_password(password)
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        logger.error(f"Password rehash error: {e}")
+
+
+def password_hasher_busy():
+    response = jsonify({'success': False, 'error': 'Authentication service busy, please retry'})
+    response.headers['Retry-After'] = '1'
+    return response, 503
+
+
 def generate_request_id():
     timestamp = datetime.utcnow().strftime('%Y%m%d%H%M%S')
     random_part = hashlib.md5(str(datetime.utcnow().timestamp()).encode()).hexdigest()[:6].upper()
     return f'REQ{timestamp}{random_part}'
 
 
-def assign_to_processing_center(update_request):
+def load_routing_centers():
+    with app.app_context():
+        return db.session.query(ProcessingCenter.id, ProcessingCenter.state, ProcessingCenter.district,
+                                ProcessingCenter.pin_code).filter(ProcessingCenter.is_active.is_(True)).all()
+
+
+center_router = CenterRouter(load_routing_centers)
+# Cross-center rebalancing tries receivers nearest first
+rebalancer.nearness = center_router.tier
+
+
+@event.listens_for(ProcessingCenter, 'after_insert')
+@event.listens_for(ProcessingCenter, 'after_delete')
+def center_added_or_removed(mapper, connection, target):
+    center_router.invalidate()
+
+
+@event.listens_for(ProcessingCenter, 'after_update')
+def center_updated(mapper, connection, target):
+    state = db.inspect(target)
+    if any(state.attrs[field].history.has_changes() for field in ('state', 'district', 'pin_code', 'is_active')):
+        center_router.invalidate()
+
+
+def routing_address(update_request, user):
+    # Where the applicant lives now: the new address for address changes, else the one on file
+    if update_request.update_type == 'address_change':
+        return update_request.new_data
+    return getattr(user, 'address', None)
+
+
+def claim_center_slot(center_pk, enforce_capacity=True):
+    query = update(ProcessingCenter).where(ProcessingCenter.id == center_pk)
+    if enforce_capacity:
+        query = query.where(ProcessingCenter.current_load < ProcessingCenter.total_capacity)
+    result = db.session.execute(query.values(current_load=ProcessingCenter.current_load + 1)
+                                .execution_options(synchronize_session=False))
+    return result.rowcount > 0
+
+
+def release_center_load(update_requests):
+    # Reviewed requests no longer count towards their center's current_load
+    released = {}
+    for update_request in update_requests:
+        if update_request.processing_center_id:
+            released[update_request.processing_center_id] = released.get(update_request.processing_center_id, 0) + 1
+    for center_pk, count in released.items():
+        db.session.execute(
+            update(ProcessingCenter)
+            .where(ProcessingCenter.id == center_pk)
+            .values(current_load=case((ProcessingCenter.current_load > count, ProcessingCenter.current_load - count),
+                                      else_=0))
+            .execution_options(synchronize_session=False)
+        )
+
+
+def assign_to_processing_center(update_request, address=None):
     try:
-        centers = ProcessingCenter.query.filter_by(is_active=True).order_by(ProcessingCenter.current_load.asc()).all()
-        if not centers:
+        home_state, tiers = center_router.candidates(address)
+        for tier, center_pks in tiers:
+            # Least loaded first, relative to each center's capacity
+            centers = db.session.query(ProcessingCenter.id, ProcessingCenter.current_load,
+                                       ProcessingCenter.total_capacity).filter(
+                ProcessingCenter.id.in_(center_pks), ProcessingCenter.is_active.is_(True),
+                ProcessingCenter.current_load < ProcessingCenter.total_capacity).all()
+            for center in sorted(centers, key=lambda c: (c.current_load or 0) / c.total_capacity):
+                if claim_center_slot(center.id):
+                    db.session.commit()
+                    center_router.record(tier, home_state, center.id)
+                    return db.session.get(ProcessingCenter, center.id)
+
+        # Every center is at capacity: take the least loaded anyway rather than drop the request
+        center = ProcessingCenter.query.filter_by(is_active=True).order_by(ProcessingCenter.current_load.asc()).first()
+        if not center:
             return None
-        selected_center = centers[0]
-        selected_center.current_load += 1
+        claim_center_slot(center.id, enforce_capacity=False)
         db.session.commit()
-        return selected_center
+        center_router.record('national', home_state, center.id, over_capacity=True)
+        return center
     except Exception as e:
+        db.session.rollback()
         logger.error(f"Center assignment error: {e}")
         return None
 
@@ -496,7 +1240,7 @@ def assign_to_officer(processing_center):
     try:
         if not processing_center:
             return None
-        officers = Officer.query.filter_by(processing_center=processing_center.name, is_active=True).filter(
+        officers = Officer.query.filter_by(processing_center_id=processing_center.id, is_active=True).filter(
             Officer.current_workload < Officer.max_workload).order_by(Officer.current_workload.asc()).all()
         if not officers:
             return None
@@ -583,6 +1327,9 @@ def register():
 
         return jsonify({'success': True, 'message': 'Registration successful', 'user': user.to_dict()}), 201
 
+    except PasswordHasherBusy:
+        db.session.rollback()
+        return password_hasher_busy()
     except Exception as e:
         db.session.rollback()
         logger.error(f"Registration error: {e}")
@@ -605,13 +1352,17 @@ def register_officer():
         officer_count = Officer.query.count()
         officer_id = f"OFF{100 + officer_count + 1:03d}"
 
+        center_name = data.get('processing_center', 'General Center')
+        center = ProcessingCenter.query.filter_by(name=center_name).first()
+
         officer = Officer(
             officer_id=officer_id,
             name=data['name'],
             email=data['email'],
             department=data['department'],
             designation=data.get('designation', 'Officer'),
-            processing_center=data.get('processing_center', 'General Center')
+            processing_center=center_name,
+            processing_center_id=center.id if center else None
         )
 
         officer.set_password(data['password'])
@@ -622,6 +1373,9 @@ def register_officer():
 
         return jsonify({'success': True, 'message': 'Officer registration successful', 'officer_id': officer_id}), 201
 
+    except PasswordHasherBusy:
+        db.session.rollback()
+        return password_hasher_busy()
     except Exception as e:
         db.session.rollback()
         logger.error(f"Officer registration error: {e}")
@@ -629,6 +1383,7 @@ def register_officer():
 
 
 @app.route('/api/auth/login', methods=['POST'])
+@rate_limiter.limit('login')
 def login():
     try:
         data = request.get_json()
@@ -647,6 +1402,8 @@ def login():
             user = User.query.filter_by(aadhaar_id=aadhaar_id).first()
             if not user or not user.check_password(password):
                 return jsonify({'success': False, 'error': 'Invalid credentials'}), 401
+            rehash_password(user, password)
+            identity_cache.put(snapshot('user', user.aadhaar_id, user))
 
             access_token = create_access_token(
                 identity=user.aadhaar_id,
@@ -674,6 +1431,8 @@ def login():
             officer = Officer.query.filter_by(email=email).first()
             if not officer or not officer.check_password(password):
                 return jsonify({'success': False, 'error': 'Invalid credentials'}), 401
+            rehash_password(officer, password)
+            identity_cache.put(snapshot('officer', officer.officer_id, officer))
 
             access_token = create_access_token(
                 identity=officer.officer_id,
@@ -694,6 +1453,8 @@ def login():
 
         return jsonify({'success': False, 'error': 'Invalid user type'}), 400
 
+    except PasswordHasherBusy:
+        return password_hasher_busy()
     except Exception as e:
         logger.error(f"Login error: {e}")
         return jsonify({'success': False, 'error': 'Internal server error'}), 500
@@ -703,19 +1464,9 @@ def login():
 @jwt_required()
 def validate_token():
     try:
-        user_id = get_jwt_identity()
-        claims = get_jwt()
-        
-        user_data = None
-        if claims.get('user_type') == 'user':
-            user = User.query.filter_by(aadhaar_id=user_id).first()
-            if user:
-                user_data = user.to_dict()
-        else:
-            officer = Officer.query.filter_by(officer_id=user_id).first()
-            if officer:
-                user_data = officer.to_dict()
-                
+        principal = current_principal()
+        user_data = principal.to_dict() if principal else None
+
         return jsonify({
             'success': True,
             'user': user_data
@@ -726,6 +1477,7 @@ def validate_token():
 
 @app.route('/api/user/dashboard', methods=['GET'])
 @jwt_required()
+@response_cache.cached(lambda: ('user', get_jwt_identity()))
 def get_user_dashboard():
     try:
         user_id = get_jwt_identity()
@@ -741,9 +1493,28 @@ def get_user_dashboard():
         review = UpdateRequest.query.filter_by(aadhaar_id=user_id, status='review').count()
         pending = UpdateRequest.query.filter_by(aadhaar_id=user_id, status='pending').count()
         rejected = UpdateRequest.query.filter_by(aadhaar_id=user_id, status='rejected').count()
+        # Archived requests are all closed
+        archived = dict(db.session.query(ArchivedRequest.status, func.count(ArchivedRequest.id)).filter(
+            ArchivedRequest.aadhaar_id == user_id).group_by(ArchivedRequest.status).all())
+        total += sum(archived.values())
+        approved += archived.get('approved', 0) + archived.get('auto_approved', 0)
+        rejected += archived.get('rejected', 0)
         
         # Get recent requests
-        recent = UpdateRequest.query.filter_by(aadhaar_id=user_id).order_by(UpdateRequest.submitted_at.desc()).limit(5).all()
+        recent = list(merged_rows(
+            UpdateRequest.query.filter_by(aadhaar_id=user_id).order_by(UpdateRequest.submitted_at.desc()).limit(5),
+            ArchivedRequest.query.filter_by(aadhaar_id=user_id).order_by(ArchivedRequest.submitted_at.desc()).limit(5),
+            limit=5))
+
+        notifications, _ = notification_service.inbox(user_id, limit=5)
+        notifications = [n.to_dict(relative_time=False) for n in notifications] or [
+            {
+                'id': 0,
+                'message': "Welcome to Aadhaar Smart Flow! Track your updates here.",
+                'time': "Just now",
+                'type': "info"
+            }
+        ]
         
         return jsonify({
             'success': True,
@@ -759,24 +1530,78 @@ def get_user_dashboard():
                 'status': r.status,
                 'date': r.submitted_at.strftime('%b %d, %Y')
             } for r in recent],
-            'notifications': [
-                {
-                    'id': 1,
-                    'message': "Welcome to Aadhaar Smart Flow! Track your updates here.",
-                    'time': "Just now",
-                    'type': "info"
-                }
-            ]
+            'notifications': notifications,
+            'unread_notifications': notification_service.counters.get(user_id)
         }), 200
     except Exception as e:
         logger.error(f"User dashboard error: {e}")
         return jsonify({'success': False, 'error': str(e)}), 500
 
 
+@app.route('/api/notifications', methods=['GET'])
+@jwt_required()
+def get_notifications():
+    try:
+        claims = get_jwt()
+        user_id = get_jwt_identity()
+        if claims.get('user_type') != 'user':
+            return jsonify({'success': False, 'error': 'Not authorized'}), 403
+
+        limit = min(request.args.get('limit', 20, type=int), 100)
+        cursor = request.args.get('cursor')
+        if cursor:
+            cursor = decode_cursor(cursor)
+            if cursor is None:
+                return jsonify({'success': False, 'error': 'Invalid cursor'}), 400
+
+        notifications, next_cursor = notification_service.inbox(user_id, cursor, limit)
+        return jsonify({
+            'success': True,
+            'notifications': [n.to_dict() for n in notifications],
+            'unread': notification_service.counters.get(user_id),
+            'next_cursor': next_cursor
+        }), 200
+
+    except Exception as e:
+        logger.error(f"Get notifications error: {e}")
+        return jsonify({'success': False, 'error': 'Internal server error'}), 500
+
+
+@app.route('/api/notifications/read', methods=['POST'])
+@jwt_required()
+def mark_notifications_read():
+    try:
+        claims = get_jwt()
+        user_id = get_jwt_identity()
+        if claims.get('user_type') != 'user':
+            return jsonify({'success': False, 'error': 'Not authorized'}), 403
+
+        # Without ids every unread notification is marked
+        data = request.get_json(silent=True) or {}
+        ids = data.get('ids')
+        if ids is not None and not isinstance(ids, list):
+            return jsonify({'success': False, 'error': 'ids must be a list'}), 400
+
+        updated = notification_service.mark_read(user_id, ids)
+        change_counters.bump(('user', user_id))
+        return jsonify({
+            'success': True,
+            'updated': updated,
+            'unread': notification_service.counters.get(user_id)
+        }), 200
+
+    except Exception as e:
+        db.session.rollback()
+        logger.error(f"Mark notifications read error: {e}")
+        return jsonify({'success': False, 'error': 'Internal server error'}), 500
+
+
 # ==================== UPDATE REQUEST ROUTES ====================
 
 @app.route('/api/updates/submit', methods=['POST'])
 @jwt_required()
+@idempotency_store.idempotent(get_jwt_identity)
+@rate_limiter.limit('submit')
 def submit_update():
     try:
         claims = get_jwt()
@@ -792,21 +1617,23 @@ def submit_update():
             logger.warning(f"Missing fields in request: {data.keys()}")
             return jsonify({'success': False, 'error': 'update_type and new_data required'}), 400
 
-        user = User.query.filter_by(aadhaar_id=user_id).first()
+        user = current_principal()
         if not user:
             return jsonify({'success': False, 'error': 'User not found'}), 404
 
         request_id = generate_request_id()
 
+        old_data = data.get('old_data', '')
         update_request = UpdateRequest(
             request_id=request_id,
             aadhaar_id=user_id,
             update_type=data['update_type'],
             sub_type=data.get('sub_type'),
-            old_data=data.get('old_data', ''),
+            old_data=json.dumps(old_data) if isinstance(old_data, list) else old_data,
             new_data=data['new_data'],
-            documents=json.dumps(data.get('documents', [])),
-            document_types=json.dumps(data.get('document_types', [])),
+            details=build_request_details(data['update_type'], old_data, data['new_data']),
+            documents=data.get('documents') or [],
+            document_types=data.get('document_types') or [],
             status='pending',
             submitted_at=datetime.utcnow()
         )
@@ -826,38 +1653,45 @@ def submit_update():
         update_request.life_event_type = life_event_result['type']
         update_request.life_event_confidence = life_event_result['confidence']
 
-        update_request.risk_score = get_ml_manager().calculate_risk_score(update_request, user, life_event_result)
+        update_request.risk_score = get_ml_manager().calculate_risk_score(update_request, user, life_event_result,
+                                                                          len(existing_requests))
 
-        has_documents = bool(data.get('documents'))
+        has_documents = documents_verified(update_request.documents)
         should_auto_approve = get_ml_manager().should_auto_approve(update_request.risk_score, life_event_result, has_documents)
 
+        officer = None
+
         if should_auto_approve and not update_request.is_duplicate:
             update_request.status = 'auto_approved'
             update_request.auto_approved = True
             update_request.processed_at = datetime.utcnow()
             update_request.completed_at = datetime.utcnow()
 
-            if update_request.update_type == 'name_change':
-                user.name = update_request.new_data
-            elif update_request.update_type == 'address_change':
-                user.address = update_request.new_data
-            elif update_request.update_type == 'phone_change':
-                user.phone = update_request.new_data
-
-            user.last_updated = datetime.utcnow()
-            db.session.add(user)
+            apply_user_update(user_id, update_request)
 
         else:
-            processing_center = assign_to_processing_center(update_request)
+            processing_center = assign_to_processing_center(update_request, routing_address(update_request, user))
             if processing_center:
                 update_request.processing_center = processing_center.name
+                update_request.processing_center_id = processing_center.id
                 officer = assign_to_officer(processing_center)
                 if officer:
                     update_request.assigned_officer = officer.name
+                    update_request.assigned_officer_id = officer.id
                     update_request.status = 'processing'
 
         db.session.add(update_request)
         db.session.commit()
+        if update_request.auto_approved:
+            identity_cache.invalidate(('user', user_id))
+        if officer:
+            identity_cache.invalidate(('officer', officer.officer_id))
+        review_scheduler.upsert(update_request)
+        rollup_store.record_request(update_request, 'submitted')
+        if update_request.auto_approved:
+            rollup_store.record_request(update_request, 'completed')
+        bump_request_versions(update_request)
+        publish_transition(update_request, None, officer.officer_id if officer else None)
         logger.info(f"Update request {request_id} created with status: {update_request.status}")
 
         log_audit('UPDATE_SUBMITTED', user_id, 'user',
@@ -888,6 +1722,7 @@ def submit_update():
 
 
 @app.route('/api/updates/types', methods=['GET'])
+@response_cache.cached(per_identity=False)
 def get_update_types():
     types = [
         {'id': 'address', 'name': 'Address Change', 'description': 'Update your residential address', 'requiredDocuments': ['Address Proof (Electricity Bill/Rent Agreement)']},
@@ -900,6 +1735,7 @@ def get_update_types():
 
 @app.route('/api/updates/my-requests', methods=['GET'])
 @jwt_required()
+@response_cache.cached(lambda: ('user', get_jwt_identity()))
 def get_my_requests():
     try:
         claims = get_jwt()
@@ -911,19 +1747,31 @@ def get_my_requests():
         page = request.args.get('page', 1, type=int)
         per_page = request.args.get('per_page', 10, type=int)
 
+        include_details = wants_details()
+
         requests_query = UpdateRequest.query.filter_by(aadhaar_id=user_id).order_by(desc(UpdateRequest.submitted_at))
-        requests = requests_query.paginate(page=page, per_page=per_page, error_out=False)
+        if include_details:
+            requests_query = requests_query.options(undefer_group('details'))
+        archive_query = ArchivedRequest.query.filter_by(aadhaar_id=user_id).order_by(desc(ArchivedRequest.submitted_at))
+
+        # Stream every matching row instead of one page
+        if wants_stream():
+            return streaming_response('requests', merged_rows(requests_query, archive_query),
+                                      lambda req: req.to_dict(include_details))
+
+        items, total = paginate_with_archive(requests_query, archive_query, page, per_page)
+        pages = -(-total // per_page) if per_page > 0 else 0
 
         return jsonify({
             'success': True,
-            'requests': [req.to_dict() for req in requests.items],
+            'requests': [req.to_dict(include_details) for req in items],
             'pagination': {
                 'page': page,
                 'per_page': per_page,
-                'total': requests.total,
-                'pages': requests.pages,
-                'has_next': requests.has_next,
-                'has_prev': requests.has_prev
+                'total': total,
+                'pages': pages,
+                'has_next': page < pages,
+                'has_prev': page > 1
             }
         }), 200
 
@@ -934,10 +1782,11 @@ def get_my_requests():
 
 @app.route('/api/updates/<request_id>', methods=['GET'])
 @jwt_required()
+@response_cache.cached(lambda request_id: ('request', request_id))
 def get_request_details(request_id):
     try:
         user_id = get_jwt_identity()
-        update_request = UpdateRequest.query.filter_by(request_id=request_id).first()
+        update_request = find_request(request_id)
         
         if not update_request:
             return jsonify({'success': False, 'error': 'Request not found'}), 404
@@ -946,7 +1795,9 @@ def get_request_details(request_id):
         claims = get_jwt()
         if claims.get('user_type') == 'user' and update_request.aadhaar_id != user_id:
             return jsonify({'success': False, 'error': 'Unauthorized'}), 403
-            
+
+        # The applicant's name comes from User, which approvals can change
+        response_cache.depends_on(('user', update_request.aadhaar_id))
         data = update_request.to_dict()
         
         # Add user info
@@ -973,7 +1824,17 @@ def get_request_details(request_id):
         
         # Format for TrackStatus.tsx
         data['submittedDate'] = data['submitted_at'][:10] if data['submitted_at'] else 'N/A'
-        data['estimatedTime'] = '24-48 hours'
+        data['estimatedTime'] = 'Completed' if update_request.completed_at else 'Not available'
+        if update_request.status in OPEN_STATUSES:
+            if not review_scheduler.loaded:
+                load_review_queue()
+            # Positions move as the center's queue drains
+            response_cache.depends_on(('queue', update_request.processing_center_id))
+            estimate = eta_engine.estimate(update_request.id)
+            if estimate:
+                data['estimatedTime'] = format_eta(estimate['hours'])
+                data['estimated_completion'] = estimate['completion'].isoformat()
+                data['queue_position'] = estimate['queue_position']
         data['type'] = data['update_type']
         
         return jsonify(data), 200
@@ -983,18 +1844,37 @@ def get_request_details(request_id):
         return jsonify({'success': False, 'error': 'Internal server error'}), 500
 
 
+@app.route('/api/events/stream', methods=['GET'])
+@jwt_required(locations=['headers', 'query_string'])
+def stream_events():
+    # EventSource cannot set headers, so the token may also come as ?jwt=<token>
+    claims = get_jwt()
+    identity = get_jwt_identity()
+
+    if claims.get('user_type') == 'user':
+        channels = [f'user:{identity}']
+    elif claims.get('user_type') == 'officer':
+        channels = [f'officer:{identity}']
+    else:
+        return jsonify({'success': False, 'error': 'Unauthorized'}), 403
+
+    subscriber = event_hub.subscribe(channels)
+    return Response(sse_stream(event_hub, subscriber), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+
 # ==================== OFFICER ROUTES ====================
 
 @app.route('/api/officer/dashboard', methods=['GET'])
 @jwt_required()
+@response_cache.cached(lambda: ('requests',), vary=lambda: datetime.utcnow().date())
 def officer_dashboard():
     try:
         claims = get_jwt()
         if claims.get('user_type') != 'officer':
             return jsonify({'success': False, 'error': 'Officer access only'}), 403
 
-        officer_id = get_jwt_identity()
-        officer = Officer.query.filter_by(officer_id=officer_id).first()
+        officer = current_principal()
         if not officer:
             return jsonify({'success': False, 'error': 'Officer not found'}), 404
             
@@ -1011,18 +1891,12 @@ def officer_dashboard():
         auto_approved = UpdateRequest.query.filter_by(auto_approved=True).count()
         duplicate_requests = UpdateRequest.query.filter_by(is_duplicate=True).count()
 
-        # Get requests assigned to THIS officer
-        officer_requests = UpdateRequest.query.filter_by(assigned_officer=officer.name).filter(
-            UpdateRequest.status.in_(['pending', 'processing'])
-        ).order_by(desc(UpdateRequest.submitted_at)).limit(10).all()
-        
-        # Fallback for demo: if no requests assigned to this officer, show ANY pending/processing requests
-        if not officer_requests:
-            officer_requests = UpdateRequest.query.filter(
-                UpdateRequest.status.in_(['pending', 'processing'])
-            ).order_by(desc(UpdateRequest.risk_score), desc(UpdateRequest.submitted_at)).limit(10).all()
+        include_details = wants_details()
+        # This officer's queue plus the center's unassigned requests, in review order
+        officer_requests = next_requests_for_officer(officer, 10, include_details)
 
         dashboard_metrics = load_dashboard_metrics()
+        officer_metrics = metrics_engine.officer(officer.id)
 
         return jsonify({
             'success': True,
@@ -1038,9 +1912,10 @@ def officer_dashboard():
                 'auto_approval_rate': round((auto_approved / total_requests * 100), 2) if total_requests else 0,
                 'officer_workload': officer.current_workload,
                 'workload_percentage': round((officer.current_workload / officer.max_workload) * 100, 2),
-                'efficiency': 97
+                'efficiency': officer_metrics['efficiency'],
+                'risk_agreement': officer_metrics['risk_agreement']
             },
-            'assigned_requests': [req.to_dict() for req in officer_requests],
+            'assigned_requests': [req.to_dict(include_details) for req in officer_requests],
             'dashboard_metrics': dashboard_metrics
         }), 200
 
@@ -1051,6 +1926,7 @@ def officer_dashboard():
 
 @app.route('/api/officer/pending-requests', methods=['GET'])
 @jwt_required()
+@response_cache.cached(lambda: ('requests',))
 def pending_requests():
     try:
         claims = get_jwt()
@@ -1060,18 +1936,29 @@ def pending_requests():
         page = request.args.get('page', 1, type=int)
         per_page = request.args.get('per_page', 20, type=int)
 
-        query = UpdateRequest.query.filter(UpdateRequest.status.in_(['pending', 'processing']))
+        include_details = wants_details()
+
+        # One joined query for the applicant's name/age instead of a lookup per row
+        query = db.session.query(UpdateRequest, User.name, User.date_of_birth).outerjoin(
+            User, User.aadhaar_id == UpdateRequest.aadhaar_id
+        ).filter(UpdateRequest.status.in_(['pending', 'processing']))
         query = query.order_by(desc(UpdateRequest.risk_score), desc(UpdateRequest.submitted_at))
-        requests = query.paginate(page=page, per_page=per_page, error_out=False)
+        if include_details:
+            query = query.options(undefer_group('details'))
 
-        requests_data = []
-        for req in requests.items:
-            req_dict = req.to_dict()
-            user = User.query.filter_by(aadhaar_id=req.aadhaar_id).first()
-            if user:
-                req_dict['user_name'] = user.name
-                req_dict['user_age'] = get_ml_manager().calculate_age(user.date_of_birth) if user.date_of_birth else None
-            requests_data.append(req_dict)
+        def serialize(row):
+            req, user_name, date_of_birth = row
+            req_dict = req.to_dict(include_details)
+            if user_name is not None:
+                req_dict['user_name'] = user_name
+                req_dict['user_age'] = get_ml_manager().calculate_age(date_of_birth) if date_of_birth else None
+            return req_dict
+
+        if wants_stream():
+            return streaming_response('requests', query, serialize)
+
+        requests = query.paginate(page=page, per_page=per_page, error_out=False)
+        requests_data = [serialize(row) for row in requests.items]
 
         return jsonify({
             'success': True,
@@ -1089,6 +1976,106 @@ def pending_requests():
         return jsonify({'success': False, 'error': 'Internal server error'}), 500
 
 
+@app.route('/api/officer/next-requests', methods=['GET'])
+@jwt_required()
+def next_requests():
+    try:
+        claims = get_jwt()
+        if claims.get('user_type') != 'officer':
+            return jsonify({'success': False, 'error': 'Officer access only'}), 403
+
+        officer = current_principal()
+        if not officer:
+            return jsonify({'success': False, 'error': 'Officer not found'}), 404
+
+        n = min(max(1, request.args.get('n', 10, type=int)), MAX_SEARCH_PAGE_SIZE)
+        include_details = wants_details()
+        return jsonify({
+            'success': True,
+            'requests': [r.to_dict(include_details) for r in next_requests_for_officer(officer, n, include_details)]
+        }), 200
+
+    except Exception as e:
+        logger.error(f"Next requests error: {e}")
+        return jsonify({'success': False, 'error': 'Internal server error'}), 500
+
+
+@app.route('/api/officer/rebalance-plan', methods=['GET'])
+@jwt_required()
+def rebalance_plan():
+    # The moves the next rebalancing pass would make, without making them
+    try:
+        claims = get_jwt()
+        if claims.get('user_type') not in ['officer', 'admin']:
+            return jsonify({'success': False, 'error': 'Officer access only'}), 403
+
+        moves = rebalancer.run(dry_run=True)
+        return jsonify({'success': True, 'moves': moves, 'stats': rebalancer.stats()}), 200
+
+    except Exception as e:
+        logger.error(f"Rebalance plan error: {e}")
+        return jsonify({'success': False, 'error': 'Internal server error'}), 500
+
+
+@app.route('/api/officer/search', methods=['GET'])
+@jwt_required()
+def search_update_requests():
+    try:
+        claims = get_jwt()
+        if claims.get('user_type') != 'officer':
+            return jsonify({'success': False, 'error': 'Officer access only'}), 403
+        if not search_supported(db):
+            return jsonify({'success': False,
+                            'error': f'Search needs SQLite FTS5 and is not available on {db.engine.dialect.name}'}), 501
+
+        query_text = request.args.get('q', '').strip()
+        if not query_text:
+            return jsonify({'success': False, 'error': 'q is required'}), 400
+
+        page = max(1, request.args.get('page', 1, type=int))
+        per_page = min(max(1, request.args.get('per_page', 20, type=int)), MAX_SEARCH_PAGE_SIZE)
+        if page * per_page > MAX_SEARCH_RESULTS:
+            return jsonify({'success': False, 'error': f'Only the top {MAX_SEARCH_RESULTS} matches can be paged'}), 400
+        statuses = [s for s in request.args.get('status', '').split(',') if s]
+        # rank=all scores every match instead of only the newest; slower for very common terms
+        candidates = None if request.args.get('rank') == 'all' else MAX_RANKED_CANDIDATES
+
+        # One extra row tells us whether there is a next page without counting every match
+        hits, truncated = search_requests(db, query_text, statuses, limit=per_page + 1,
+                                          offset=(page - 1) * per_page, candidates=candidates)
+        has_more = len(hits) > per_page
+        hits = hits[:per_page]
+
+        rows = db.session.query(UpdateRequest, User.name).outerjoin(
+            User, User.aadhaar_id == UpdateRequest.aadhaar_id
+        ).filter(UpdateRequest.id.in_([hit[0] for hit in hits])).all()
+        by_id = {req.id: (req, user_name) for req, user_name in rows}
+
+        results = []
+        for request_pk, score, snippet in hits:
+            if request_pk not in by_id:
+                continue
+            req, user_name = by_id[request_pk]
+            req_dict = req.to_dict(include_details=False)
+            req_dict['user_name'] = user_name
+            req_dict['score'] = round(-score, 4)
+            req_dict['snippet'] = snippet
+            results.append(req_dict)
+
+        return jsonify({
+            'success': True,
+            'query': query_text,
+            'results': results,
+            'pagination': {'page': page, 'per_page': per_page, 'has_more': has_more},
+            # Older matches were not ranked; repeat with rank=all to include them
+            'truncated': truncated
+        }), 200
+
+    except Exception as e:
+        logger.error(f"Search error: {e}")
+        return jsonify({'success': False, 'error': 'Internal server error'}), 500
+
+
 @app.route('/api/officer/update-status', methods=['POST'])
 @jwt_required()
 def update_request_status():
@@ -1111,42 +2098,48 @@ def update_request_status():
         if not update_request:
             return jsonify({'success': False, 'error': 'Request not found'}), 404
 
-        officer = Officer.query.filter_by(officer_id=officer_id).first()
+        officer = current_principal()
         if not officer:
             return jsonify({'success': False, 'error': 'Officer not found'}), 404
 
+        previous_status = update_request.status
         if action == 'approve':
             update_request.status = 'approved'
             update_request.assigned_officer = officer.name
-
-            user = User.query.filter_by(aadhaar_id=update_request.aadhaar_id).first()
-            if user:
-                if update_request.update_type == 'name_change':
-                    user.name = update_request.new_data
-                elif update_request.update_type == 'address_change':
-                    user.address = update_request.new_data
-                elif update_request.update_type == 'phone_change':
-                    user.phone = update_request.new_data
-                elif update_request.update_type == 'marital_status':
-                    user.marital_status = update_request.new_data
-
-                user.last_updated = datetime.utcnow()
-                db.session.add(user)
+            update_request.assigned_officer_id = officer.id
+            apply_user_update(update_request.aadhaar_id, update_request)
 
         elif action == 'reject':
             update_request.status = 'rejected'
             update_request.rejection_reason = reason
             update_request.assigned_officer = officer.name
+            update_request.assigned_officer_id = officer.id
         else:
             return jsonify({'success': False, 'error': 'Invalid action'}), 400
 
         update_request.processed_at = datetime.utcnow()
         update_request.completed_at = datetime.utcnow()
 
-        officer.current_workload = max(0, officer.current_workload - 1)
-        officer.total_processed += 1
+        if previous_status in OPEN_STATUSES:
+            release_center_load([update_request])
+        db.session.execute(
+            update(Officer)
+            .where(Officer.id == officer.id)
+            .values(current_workload=case((Officer.current_workload > 0, Officer.current_workload - 1), else_=0),
+                    total_processed=Officer.total_processed + 1)
+            .execution_options(synchronize_session=False)
+        )
 
         db.session.commit()
+        identity_cache.invalidate(('officer', officer_id), ('user', update_request.aadhaar_id))
+        review_scheduler.remove(update_request.id)
+        if previous_status in OPEN_STATUSES:
+            eta_engine.record_completion(update_request.processing_center_id, officer.id)
+            metrics_engine.record_review(update_request, officer.id)
+            rollup_store.record_request(update_request, 'completed')
+            change_counters.bump(('queue', update_request.processing_center_id))
+        bump_request_versions(update_request)
+        publish_transition(update_request, previous_status, officer_id)
 
         log_audit('REQUEST_REVIEWED', officer_id, 'officer',
                   f"Request {request_id} {action}ed by {officer.name}")
@@ -1159,10 +2152,142 @@ def update_request_status():
         return jsonify({'success': False, 'error': 'Internal server error'}), 500
 
 
+@app.route('/api/officer/bulk-update-status', methods=['POST'])
+@jwt_required()
+def bulk_update_request_status():
+    try:
+        claims = get_jwt()
+        officer_id = get_jwt_identity()
+
+        if claims.get('user_type') != 'officer':
+            return jsonify({'success': False, 'error': 'Officer access only'}), 403
+
+        data = request.get_json() or {}
+        request_ids = data.get('request_ids')
+        action = data.get('action')
+        reason = data.get('reason', '')
+
+        if not isinstance(request_ids, list) or not request_ids or not action:
+            return jsonify({'success': False, 'error': 'Missing request_ids or action'}), 400
+        if action not in ('approve', 'reject'):
+            return jsonify({'success': False, 'error': 'Invalid action'}), 400
+        if len(request_ids) > MAX_BULK_REVIEW:
+            return jsonify({'success': False, 'error': f'At most {MAX_BULK_REVIEW} requests per batch'}), 400
+
+        officer = Officer.query.filter_by(officer_id=officer_id).first()
+        if not officer:
+            return jsonify({'success': False, 'error': 'Officer not found'}), 404
+
+        # Deduplicate while keeping the caller's order for the response
+        request_ids = list(dict.fromkeys(str(r) for r in request_ids))
+        update_requests = {
+            r.request_id: r for r in UpdateRequest.query.filter(UpdateRequest.request_id.in_(request_ids)).all()
+        }
+
+        now = datetime.utcnow()
+        results = []
+        reviewed = []
+        previous_statuses = {}
+        # Open requests count against the workload of whoever held them, not the reviewer
+        released = {}
+        # field -> {aadhaar_id: new value}; oldest submission first so the latest one wins
+        user_changes = {}
+
+        for request_id in request_ids:
+            update_request = update_requests.get(request_id)
+            if not update_request:
+                results.append({'request_id': request_id, 'success': False, 'error': 'Request not found'})
+                continue
+            if update_request.status in COMPLETED_STATUSES:
+                results.append({'request_id': request_id, 'success': False,
+                                'error': f'Request already {update_request.status}'})
+                continue
+
+            previous_statuses[request_id] = update_request.status
+            if update_request.status in OPEN_STATUSES and update_request.assigned_officer_id is not None:
+                released[update_request.assigned_officer_id] = released.get(update_request.assigned_officer_id, 0) + 1
+            if action == 'approve':
+                update_request.status = 'approved'
+            else:
+                update_request.status = 'rejected'
+                update_request.rejection_reason = reason
+            update_request.assigned_officer = officer.name
+            update_request.assigned_officer_id = officer.id
+            update_request.processed_at = now
+            update_request.completed_at = now
+
+            reviewed.append(update_request)
+            results.append({'request_id': request_id, 'success': True, 'status': update_request.status})
+
+        if action == 'approve':
+            for update_request in sorted(reviewed, key=lambda r: r.submitted_at or now):
+                field = USER_UPDATE_FIELDS.get(update_request.update_type)
+                if field:
+                    user_changes.setdefault(field, {})[update_request.aadhaar_id] = update_request.new_data
+
+            for field, values in user_changes.items():
+                db.session.execute(
+                    update(User)
+                    .where(User.aadhaar_id.in_(list(values)))
+                    .values({field: case(values, value=User.aadhaar_id), 'last_updated': now})
+                    .execution_options(synchronize_session=False)
+                )
+
+        if reviewed:
+            release_center_load(r for r in reviewed if previous_statuses[r.request_id] in OPEN_STATUSES)
+            release = case(released, value=Officer.id, else_=0) if released else 0
+            db.session.execute(
+                update(Officer)
+                .where(Officer.id.in_({officer.id, *released}))
+                .values(current_workload=case((Officer.current_workload > release, Officer.current_workload - release),
+                                              else_=0),
+                        total_processed=case((Officer.id == officer.id, Officer.total_processed + len(reviewed)),
+                                             else_=Officer.total_processed))
+                .execution_options(synchronize_session=False)
+            )
+
+            ip_address = request.remote_addr
+            db.session.add_all([
+                AuditLog(action='REQUEST_REVIEWED', user_id=officer_id, user_type='officer',
+                         details=f"Request {r.request_id} {r.status} by {officer.name} (bulk)",
+                         ip_address=ip_address, timestamp=now)
+                for r in reviewed
+            ])
+
+        db.session.commit()
+        if reviewed:
+            identity_cache.invalidate(('officer', officer_id), *(('user', r.aadhaar_id) for r in reviewed))
+            for update_request in reviewed:
+                review_scheduler.remove(update_request.id)
+                if previous_statuses[update_request.request_id] in OPEN_STATUSES:
+                    eta_engine.record_completion(update_request.processing_center_id, officer.id)
+                    metrics_engine.record_review(update_request, officer.id)
+                    rollup_store.record_request(update_request, 'completed')
+            change_counters.bump(*{('queue', r.processing_center_id) for r in reviewed})
+            bump_request_versions(*reviewed)
+            change_counters.bump(('audit',))
+            for update_request in reviewed:
+                publish_transition(update_request, previous_statuses[update_request.request_id], officer_id)
+
+        return jsonify({
+            'success': True,
+            'action': action,
+            'processed': len(reviewed),
+            'failed': len(results) - len(reviewed),
+            'results': results
+        }), 200
+
+    except Exception as e:
+        db.session.rollback()
+        logger.error(f"Bulk update status error: {e}")
+        return jsonify({'success': False, 'error': 'Internal server error'}), 500
+
+
 # ==================== ANALYTICS ====================
 
 @app.route('/api/analytics/dashboard', methods=['GET'])
 @jwt_required()
+@response_cache.cached(lambda: ('requests',), vary=lambda: datetime.utcnow().date())
 def analytics_dashboard():
     try:
         claims = get_jwt()
@@ -1176,40 +2301,47 @@ def analytics_dashboard():
         duplicate_count = UpdateRequest.query.filter_by(is_duplicate=True).count()
 
         # Type distribution
-        type_distribution = db.session.query(UpdateRequest.update_type, func.count(UpdateRequest.id)).group_by(UpdateRequest.update_type).all()
-        update_types = [{'type': t.replace('_', ' ').title(), 'count': c} for t, c in type_distribution]
+        type_distribution = dict(db.session.query(UpdateRequest.update_type, func.count(UpdateRequest.id)).group_by(UpdateRequest.update_type).all())
 
         # Status distribution
-        status_distribution = db.session.query(UpdateRequest.status, func.count(UpdateRequest.id)).group_by(UpdateRequest.status).all()
-        status_data = [{'status': s, 'count': c} for s, c in status_distribution]
-
-        # Daily stats for last 7 days
+        status_distribution = dict(db.session.query(UpdateRequest.status, func.count(UpdateRequest.id)).group_by(UpdateRequest.status).all())
+
+        # Archived requests count through their rollups
+        for (update_type, status), (count, auto_approved, duplicates) in archiver.rollups().items():
+            total_requests += count
+            auto_approved_count += auto_approved
+            duplicate_count += duplicates
+            type_distribution[update_type] = type_distribution.get(update_type, 0) + count
+            status_distribution[status] = status_distribution.get(status, 0) + count
+        update_types = [{'type': t.replace('_', ' ').title(), 'count': c} for t, c in type_distribution.items()]
+        status_data = [{'status': s, 'count': c} for s, c in status_distribution.items()]
+
+        overall_metrics = metrics_engine.overall()
+        center_performance = []
+        for center in db.session.query(ProcessingCenter.id, ProcessingCenter.name, ProcessingCenter.current_load).filter(
+                ProcessingCenter.is_active.is_(True)):
+            center_performance.append({'center': center.name, 'requests': center.current_load,
+                                       **metrics_engine.center(center.id)})
+
+        # Daily stats for last 7 days, from the day rollups
+        today = datetime.combine(datetime.utcnow().date(), datetime.min.time())
+        week = (today - timedelta(days=6), today + timedelta(days=1))
+        daily = {}
+        for event in ROLLUP_EVENTS:
+            for point in rollup_store.query('day', *week, event=event, group_by='status'):
+                daily[(point['bucket'], event, point['status'])] = point['count']
         daily_stats = []
         for i in range(6, -1, -1):  # From 6 days ago to today
-            d = (datetime.utcnow().date() - timedelta(days=i))
-            day_name = d.strftime('%a')
-
-            # Get counts for this day
-            approved = UpdateRequest.query.filter(
-                UpdateRequest.status.in_(['approved', 'auto_approved']),
-                func.date(UpdateRequest.completed_at) == d
-            ).count()
-
-            rejected = UpdateRequest.query.filter(
-                UpdateRequest.status == 'rejected',
-                func.date(UpdateRequest.completed_at) == d
-            ).count()
-
-            review = UpdateRequest.query.filter(
-                UpdateRequest.status.in_(['pending', 'processing']),
-                func.date(UpdateRequest.submitted_at) == d
-            ).count()
-
+            d = (today - timedelta(days=i))
+            bucket = d.isoformat()
             daily_stats.append({
-                'day': day_name,
-                'autoApproved': approved,
-                'manualReview': review,
-                'rejected': rejected
+                'day': d.strftime('%a'),
+                'autoApproved': daily.get((bucket, 'completed', 'approved'), 0)
+                                + daily.get((bucket, 'completed', 'auto_approved'), 0),
+                # Sent to officer review that day
+                'manualReview': daily.get((bucket, 'submitted', 'pending'), 0)
+                                + daily.get((bucket, 'submitted', 'processing'), 0),
+                'rejected': daily.get((bucket, 'completed', 'rejected'), 0)
             })
 
         # ML Model metrics
@@ -1253,8 +2385,10 @@ def analytics_dashboard():
                 'pending': pending_count,
                 'auto_approved': auto_approved_count,
                 'duplicate_requests': duplicate_count,
-                'efficiency': 95
+                'efficiency': overall_metrics['efficiency_score'],
+                'avg_processing_time': overall_metrics['avg_processing_time']
             },
+            'center_performance': center_performance,
             'distributions': {
                 'update_types': update_types,
                 'status': status_data
@@ -1268,8 +2402,82 @@ def analytics_dashboard():
         return jsonify({'success': False, 'error': 'Internal server error'}), 500
 
 
+# Range charted when the caller gives no start
+DEFAULT_TIMESERIES_RANGE = {'hour': timedelta(hours=48), 'day': timedelta(days=30), 'month': timedelta(days=730)}
+
+
+@app.route('/api/analytics/timeseries', methods=['GET'])
+@jwt_required()
+@response_cache.cached(lambda: ('requests',), vary=lambda: datetime.utcnow().replace(minute=0, second=0, microsecond=0))
+def analytics_timeseries():
+    try:
+        claims = get_jwt()
+        if claims.get('user_type') not in ['officer', 'admin']:
+            return jsonify({'success': False, 'error': 'Unauthorized'}), 403
+
+        granularity = request.args.get('granularity', 'day')
+        event = request.args.get('event', 'completed')
+        group_by = request.args.get('group_by')
+        if granularity not in ROLLUP_TIERS or event not in ROLLUP_EVENTS or (group_by and group_by not in ROLLUP_GROUPS):
+            return jsonify({'success': False, 'error': f"granularity must be one of {', '.join(ROLLUP_TIERS)}, "
+                                                       f"event one of {', '.join(ROLLUP_EVENTS)}, "
+                                                       f"group_by one of {', '.join(ROLLUP_GROUPS)}"}), 400
+        try:
+            end = datetime.fromisoformat(request.args['end']) if request.args.get('end') else datetime.utcnow()
+            start = datetime.fromisoformat(request.args['start']) if request.args.get('start') \
+                else end - DEFAULT_TIMESERIES_RANGE[granularity]
+        except ValueError:
+            return jsonify({'success': False, 'error': 'start and end must be ISO dates'}), 400
+
+        filters = {name: request.args[name] for name in ('update_type', 'status') if request.args.get(name)}
+        if request.args.get('center_id'):
+            filters['center_id'] = request.args.get('center_id', type=int)
+
+        series = rollup_store.query(granularity, start, end, event=event, group_by=group_by, **filters)
+        return jsonify({
+            'success': True,
+            'granularity': granularity,
+            'event': event,
+            'start': start.isoformat(),
+            'end': end.isoformat(),
+            'series': series
+        }), 200
+
+    except Exception as e:
+        logger.error(f"Analytics timeseries error: {e}")
+        return jsonify({'success': False, 'error': 'Internal server error'}), 500
+
+
+AUDIT_REQUEST_ID_PATTERN = re.compile(r'REQ\d+[A-Z0-9]+')
+
+
+def format_audit_log(log, officer_name):
+    # Try to find request_id in details string
+    req_id = ""
+    if "Request" in (log.details or ""):
+        match = AUDIT_REQUEST_ID_PATTERN.search(log.details)
+        if match:
+            req_id = match.group(0)
+
+    display_action = 'reviewed'
+    if 'approved' in (log.details or "").lower(): display_action = 'approved'
+    elif 'rejected' in (log.details or "").lower(): display_action = 'rejected'
+
+    return {
+        'id': f"LOG-{log.id:03d}",
+        'timestamp': log.timestamp.strftime('%Y-%m-%d %H:%M:%S'),
+        'officer': officer_name or log.user_id or "System",
+        'action': display_action,
+        'requestId': req_id or "-",
+        'updateType': "Demographic Update", # Fallback
+        'aadhaar': "XXXX-XXXX-XXXX", # Privacy
+        'comment': log.details
+    }
+
+
 @app.route('/api/officer/audit-logs', methods=['GET'])
 @jwt_required()
+@response_cache.cached(lambda: ('audit',))
 def get_audit_logs():
     try:
         claims = get_jwt()
@@ -1280,46 +2488,26 @@ def get_audit_logs():
         action = request.args.get('action')
         officer_name = request.args.get('officer')
         
-        query = db.session.query(AuditLog, Officer.name).outerjoin(
-            Officer, AuditLog.user_id == Officer.officer_id
-        )
-        
-        if action and action != 'all':
-            query = query.filter(AuditLog.action.ilike(f"%{action}%"))
-        
-        logs = query.order_by(AuditLog.timestamp.desc()).limit(100).all()
-        
-        formatted_logs = []
-        for log, name in logs:
-            # Try to find request_id in details string
-            req_id = ""
-            if "Request" in (log.details or ""):
-                import re
-                match = re.search(r'REQ\d+[A-Z0-9]+', log.details)
-                if match:
-                    req_id = match.group(0)
-            
-            # Action mapping for frontend
-            action_map = {
-                'REQUEST_REVIEWED': 'reviewed',
-                'APPROVE': 'approved',
-                'REJECT': 'rejected'
-            }
-            
-            display_action = 'reviewed'
-            if 'approved' in (log.details or "").lower(): display_action = 'approved'
-            elif 'rejected' in (log.details or "").lower(): display_action = 'rejected'
-
-            formatted_logs.append({
-                'id': f"LOG-{log.id:03d}",
-                'timestamp': log.timestamp.strftime('%Y-%m-%d %H:%M:%S'),
-                'officer': name or log.user_id or "System",
-                'action': display_action,
-                'requestId': req_id or "-",
-                'updateType': "Demographic Update", # Fallback
-                'aadhaar': "XXXX-XXXX-XXXX", # Privacy
-                'comment': log.details
-            })
+        queries = []
+        # Archived logs are older than every hot one, so they follow it
+        for model in (AuditLog, ArchivedAuditLog):
+            query = db.session.query(model, Officer.name).outerjoin(
+                Officer, model.user_id == Officer.officer_id
+            )
+
+            if action and action != 'all':
+                query = query.filter(model.action.ilike(f"%{action}%"))
+
+            queries.append(query.order_by(model.timestamp.desc()))
+
+        if wants_stream():
+            limit = request.args.get('limit', type=int)
+            return streaming_response('logs', tiered_rows(*queries, limit=limit), lambda row: format_audit_log(*row))
+
+        logs = queries[0].limit(100).all()
+        if len(logs) < 100:
+            logs += queries[1].limit(100 - len(logs)).all()
+        formatted_logs = [format_audit_log(log, name) for log, name in logs]
 
         return jsonify({
             'success': True,
@@ -1331,44 +2519,262 @@ def get_audit_logs():
         return jsonify({'success': False, 'error': str(e)}), 500
 
 
+@app.route('/api/officer/transitions', methods=['GET'])
+@jwt_required()
+def get_transitions():
+    # Tails the transition log: pass the returned next_after back as after to continue
+    try:
+        claims = get_jwt()
+        if claims.get('user_type') not in ['officer', 'admin']:
+            return jsonify({'success': False, 'error': 'Unauthorized'}), 403
+
+        after = request.args.get('after', 0, type=int)
+        limit = min(max(request.args.get('limit', TRANSITION_READ_LIMIT, type=int), 1), TRANSITION_READ_LIMIT)
+        request_pk = None
+        if request.args.get('request_id'):
+            update_request = find_request(request.args['request_id'])
+            if update_request is None:
+                return jsonify({'success': False, 'error': 'Request not found'}), 404
+            request_pk = update_request.id
+
+        entries = transition_log.read(after, limit, request_pk)
+        pks = {e['request_pk'] for e in entries}
+        request_ids = dict(db.session.query(UpdateRequest.id, UpdateRequest.request_id).filter(
+            UpdateRequest.id.in_(pks)))
+        request_ids.update(db.session.query(ArchivedRequest.id, ArchivedRequest.request_id).filter(
+            ArchivedRequest.id.in_(pks - set(request_ids))))
+        for e in entries:
+            e['request_id'] = request_ids.get(e['request_pk'])
+
+        return jsonify({
+            'success': True,
+            'transitions': entries,
+            'next_after': entries[-1]['seq'] if entries else after,
+            'head': transition_log.head()
+        }), 200
+
+    except Exception as e:
+        logger.error(f"Get transitions error: {e}")
+        return jsonify({'success': False, 'error': 'Internal server error'}), 500
+
+
+@app.route('/api/officer/cache-stats', methods=['GET'])
+@jwt_required()
+def get_cache_stats():
+    claims = get_jwt()
+    if claims.get('user_type') not in ['officer', 'admin']:
+        return jsonify({'success': False, 'error': 'Unauthorized'}), 403
+    return jsonify({'success': True, 'cache': response_cache.stats(), 'identities': identity_cache.stats(),
+                    'password_hasher': password_hasher.stats(), 'rate_limits': rate_limiter.stats(),
+                    'idempotency': idempotency_store.stats(), 'scheduler': review_scheduler.stats(),
+                    'rebalancer': rebalancer.stats(), 'routing': center_router.stats(),
+                    'eta': eta_engine.stats(),
+                    'metrics': metrics_engine.stats(), 'archive': archiver.stats(),
+                    'rollups': rollup_store.stats(), 'exports': exporter.stats(),
+                    'transitions': transition_log.stats()}), 200
+
+
+# ==================== EXPORTS ====================
+
+@app.route('/api/exports', methods=['POST'])
+@jwt_required()
+def create_export():
+    try:
+        claims = get_jwt()
+        if claims.get('user_type') not in ['officer', 'admin']:
+            return jsonify({'success': False, 'error': 'Unauthorized'}), 403
+
+        data = request.get_json() or {}
+        filters = {key: value for key, value in (data.get('filters') or {}).items() if value not in (None, '')}
+        try:
+            job = exporter.create(data.get('dataset', 'requests'), data.get('format', 'csv'), filters,
+                                  get_jwt_identity())
+        except ValueError as e:
+            return jsonify({'success': False, 'error': str(e)}), 400
+
+        log_audit('EXPORT_REQUESTED', get_jwt_identity(), claims.get('user_type'),
+                  f"Export {job.id}: Dataset={job.dataset}, Format={job.format}, Filters={job.filters}")
+        return jsonify({'success': True, 'export': job.to_dict()}), 202
+
+    except Exception as e:
+        db.session.rollback()
+        logger.error(f"Create export error: {e}")
+        return jsonify({'success': False, 'error': 'Internal server error'}), 500
+
+
+def owned_export(job_id):
+    # The job if the caller may see it: its requester, or any admin
+    job = db.session.get(ExportJob, job_id)
+    if job is None or (get_jwt().get('user_type') != 'admin' and job.requested_by != get_jwt_identity()):
+        return None
+    return job
+
+
+@app.route('/api/exports/<job_id>', methods=['GET'])
+@jwt_required()
+def get_export(job_id):
+    if get_jwt().get('user_type') not in ['officer', 'admin']:
+        return jsonify({'success': False, 'error': 'Unauthorized'}), 403
+    job = owned_export(job_id)
+    if job is None:
+        return jsonify({'success': False, 'error': 'Export not found'}), 404
+    return jsonify({'success': True, 'export': job.to_dict()}), 200
+
+
+@app.route('/api/exports/<job_id>/download', methods=['GET'])
+@jwt_required()
+def download_export(job_id):
+    if get_jwt().get('user_type') not in ['officer', 'admin']:
+        return jsonify({'success': False, 'error': 'Unauthorized'}), 403
+    job = owned_export(job_id)
+    if job is None:
+        return jsonify({'success': False, 'error': 'Export not found'}), 404
+    if job.status != 'done' or not os.path.exists(exporter.path(job)):
+        return jsonify({'success': False, 'error': f'Export is {job.status}'}), 409
+    return send_file(exporter.path(job), as_attachment=True, conditional=True,
+                     download_name=f'{job.dataset}-{job.created_at:%Y%m%d%H%M%S}.{job.format}')
+
+
 # ==================== FILE UPLOAD ====================
 
+def save_validation_result(digest, result):
+    # Called from the validator's callback thread
+    with app.app_context():
+        meta = db.session.get(DocumentMeta, digest)
+        if meta is None:
+            return
+        errors = list(result['errors'])
+        reused = False
+        if result['phash']:
+            reused = db.session.query(DocumentMeta.sha256).filter(
+                DocumentMeta.phash == result['phash'], DocumentMeta.sha256 != digest).first() is not None
+            if reused:
+                errors.append('image matches a previously uploaded document')
+
+        meta.detected_type = result['detected_type']
+        meta.page_count = result['page_count']
+        meta.width = result['width']
+        meta.height = result['height']
+        meta.phash = result['phash']
+        meta.reused_image = reused
+        meta.errors = '; '.join(errors) or None
+        meta.status = 'invalid' if result['errors'] else 'valid'
+        meta.validated_at = datetime.utcnow()
+        db.session.commit()
+
+
+def load_pending_documents(limit, exclude=()):
+    with app.app_context():
+        query = db.session.query(DocumentMeta.sha256).filter(DocumentMeta.status == 'pending')
+        if exclude:
+            query = query.filter(DocumentMeta.sha256.notin_(exclude))
+        digests = [row.sha256 for row in query.limit(limit)]
+    return [(digest, document_store.path(digest)) for digest in digests]
+
+
+document_validator = DocumentValidator(on_result=save_validation_result, load_pending=load_pending_documents)
+atexit.register(document_validator.shutdown)
+
+
+def documents_verified(documents):
+    # True only when every referenced document passed validation and is not a re-used image
+    digests = set()
+    for document in documents or []:
+        match = DOCUMENT_DIGEST_PATTERN.search(os.path.basename(str(document)))
+        if not match:
+            return False
+        digests.add(match.group(1))
+    if not digests:
+        return False
+    verified = db.session.query(func.count(DocumentMeta.sha256)).filter(
+        DocumentMeta.sha256.in_(digests), DocumentMeta.status == 'valid',
+        DocumentMeta.reused_image.is_(False)).scalar()
+    return verified == len(digests)
+
+
+UPLOAD_EXTENSIONS = {'.pdf', '.jpg', '.jpeg', '.png'}
+RAW_UPLOAD_TYPES = {'application/pdf', 'application/octet-stream', 'image/jpeg', 'image/png'}
+
+
+def insert_if_missing(table, index_elements, **values):
+    # INSERT ... ON CONFLICT DO NOTHING; both dialects we run on spell it the same way
+    insert = postgresql_insert if db.engine.dialect.name == 'postgresql' else sqlite_insert
+    return db.session.execute(insert(table).values(**values).on_conflict_do_nothing(index_elements=index_elements))
+
+
+def store_uploaded_document(stream):
+    # Returns (sha256, size, deduplicated). Objects are kept for good: requests, archived ones
+    # included, reference their documents for as long as they exist, and nothing deletes them.
+    if isinstance(stream, HashingTempFile):
+        digest, size, created = document_store.commit(stream)
+    else:
+        digest, size, created = document_store.write_stream(stream)
+
+    insert_if_missing(StoredDocument.__table__, ['sha256'], sha256=digest, size=size, created_at=datetime.utcnow())
+    insert_if_missing(DocumentMeta.__table__, ['sha256'], sha256=digest, status='pending', reused_image=False)
+    db.session.commit()
+
+    if db.session.get(DocumentMeta, digest).status == 'pending':
+        document_validator.submit(digest, document_store.path(digest))
+    return digest, size, not created
+
+
 @app.route('/api/documents/upload', methods=['POST'])
 @app.route('/api/upload/document', methods=['POST'])
 @jwt_required()
 def upload_document():
     try:
-        if 'file' not in request.files:
-            return jsonify({'success': False, 'error': 'No file provided'}), 400
+        if request.mimetype in RAW_UPLOAD_TYPES:
+            # Raw body upload: the file name travels in a header
+            original_name = request.headers.get('X-Filename', '')
+            stream = request.stream
+        else:
+            if 'file' not in request.files:
+                return jsonify({'success': False, 'error': 'No file provided'}), 400
 
-        file = request.files['file']
-        if file.filename == '':
-            return jsonify({'success': False, 'error': 'No file selected'}), 400
+            file = request.files['file']
+            if file.filename == '':
+                return jsonify({'success': False, 'error': 'No file selected'}), 400
+            original_name = file.filename
+            stream = file.stream
 
-        timestamp = datetime.utcnow().strftime('%Y%m%d_%H%M%S')
-        random_hash = hashlib.md5(f"{timestamp}{file.filename}".encode()).hexdigest()[:8]
-        filename = f"{timestamp}_{random_hash}.pdf"
+        extension = os.path.splitext(secure_filename(original_name))[1].lower()
+        if extension not in UPLOAD_EXTENSIONS:
+            extension = '.pdf'
 
-        file_path = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-        file.save(file_path)
+        digest, size, deduplicated = store_uploaded_document(stream)
+        filename = f"{digest}{extension}"
 
         user_id = get_jwt_identity()
-        log_audit('DOCUMENT_UPLOADED', user_id, get_jwt().get('user_type'), f"Uploaded: {filename}")
+        log_audit('DOCUMENT_UPLOADED', user_id, get_jwt().get('user_type'),
+                  f"Uploaded: {filename} ({size} bytes{', deduplicated' if deduplicated else ''})")
 
         return jsonify({
             'success': True,
             'message': 'File uploaded successfully',
             'filename': filename,
-            'file_path': f'/uploads/{filename}'
+            'file_path': f'/uploads/{filename}',
+            'sha256': digest,
+            'size': size,
+            'deduplicated': deduplicated,
+            'validation': db.session.get(DocumentMeta, digest).status
         }), 200
 
     except Exception as e:
+        db.session.rollback()
         logger.error(f"Upload document error: {e}")
         return jsonify({'success': False, 'error': 'Internal server error'}), 500
 
 
 @app.route('/uploads/<filename>')
 def serve_uploaded_file(filename):
+    digest, extension = os.path.splitext(filename)
+    if DIGEST_PATTERN.match(digest):
+        response = send_document(document_store, digest, filename)
+        if response is None:
+            abort(404)
+        return response
+    # Files uploaded before content addressing sit directly in the upload folder
     return send_from_directory(app.config['UPLOAD_FOLDER'], filename)
 
 
@@ -1429,6 +2835,7 @@ def create_sample_data():
                 role='officer',
                 department='Delhi Center',
                 processing_center='Delhi Processing Center',
+                processing_center_id=ProcessingCenter.query.filter_by(center_id='PC001').first().id,
                 designation='Senior Officer',
                 current_workload=0,
                 max_workload=100
@@ -1443,6 +2850,7 @@ def create_sample_data():
                 role='officer',
                 department='Mumbai Center',
                 processing_center='Mumbai Processing Center',
+                processing_center_id=ProcessingCenter.query.filter_by(center_id='PC002').first().id,
                 designation='Officer',
                 current_workload=0,
                 max_workload=100
@@ -1488,7 +2896,9 @@ def create_sample_data():
                 risk_score=0.45,
                 submitted_at=datetime.utcnow() - timedelta(days=1),
                 assigned_officer='Rajesh Kumar',
-                processing_center='Delhi Processing Center'
+                processing_center='Delhi Processing Center',
+                assigned_officer_id=Officer.query.filter_by(officer_id='OFF001').first().id,
+                processing_center_id=ProcessingCenter.query.filter_by(center_id='PC001').first().id
             )
             db.session.add(req2)
             db.session.commit()
@@ -1496,24 +2906,54 @@ def create_sample_data():
 
 @app.route('/')
 def serve_frontend():
-    return send_from_directory(app.static_folder, 'index.html')
+    response = send_static_asset(app.static_folder, 'index.html')
+    if response is None:
+        abort(404)
+    return response
 
 
 @app.route('/<path:path>')
 def serve_static(path):
-    return send_from_directory(app.static_folder, path)
+    # Build output under assets/ carries content hashes in its file names
+    response = send_static_asset(app.static_folder, path, immutable=path.startswith('assets/'))
+    if response is None:
+        abort(404)
+    return response
 
 
 # ==================== MAIN ====================
 
-
-if __name__ == '__main__':
+def initialize_database():
+    # Schema upgrades and one-time setup; every entry point runs this before serving
     with app.app_context():
         logger.info("Initializing database...")
         db.create_all()
+        run_migrations(db)
         logger.info("Creating sample data...")
         create_sample_data()
+        load_review_queue()
+        if not MetricState.query.first():
+            metrics_engine.recompute()
+        if not RequestRollup.query.first():
+            rollup_store.rebuild()
         logger.info("Database initialized successfully.")
-        
+
+
+def start_background_services():
+    # With the debug reloader, the parent process only watches files and the child serves, so
+    # starting these in both would double them. Every entry point calls this once before app.run.
+    if app.debug and os.environ.get('WERKZEUG_RUN_MAIN') != 'true':
+        return
+    document_validator.refill()
+    exporter.resume()
+    rebalancer.start()
+    archiver.start()
+    transition_log.start()
+
+
+if __name__ == '__main__':
+    initialize_database()
+    app.debug = True
+    start_background_services()
     app.run(host='0.0.0.0', port=5000, debug=True)
 
@@ -0,0 +1,224 @@
+# archive.py - Hot/cold tiering of closed requests and old audit logs
+#
+# update_requests and audit_logs only ever grow, and every count, paginate()
+# total and unindexed filter pays for years of closed history. The Archiver
+# moves requests closed more than ARCHIVE_AFTER_DAYS ago into
+# archived_requests, and audit logs older than that into
+# archived_audit_logs. The hot tables then only hold open work plus a fixed
+# window of history.
+#
+# An archived request keeps the columns it is looked up and counted by. The
+# rest of the row is packed into one JSON record, and restore() unpacks it
+# into a detached UpdateRequest, so to_dict() and the views built on it read
+# the same either way. Each move also adds the rows to archive_rollups:
+# counts per (month, update_type, status). Totals and distributions stay
+# whole without reading the archive.
+#
+# Rows move in primary-key batches of ARCHIVE_BATCH_SIZE. Each batch is one
+# transaction: insert into the archive, add to the rollups, delete from the
+# hot table. A crash leaves every row in exactly one place. Requests are only
+# ever archived closed (approved, rejected, auto_approved, or a duplicate
+# that was never reviewed), and review and rebalancing only touch open ones,
+# so nothing else writes to a row while it moves.
+import logging
+import threading
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+from sqlalchemy import DateTime, and_, func, insert, or_
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import undefer_group
+
+logger = logging.getLogger(__name__)
+
+ARCHIVE_AFTER_DAYS = 90
+# Submission reads the applicant's last 30 days of requests from the hot table for duplicate
+# detection and the risk score, and analytics_dashboard its last-7-days chart
+MIN_ARCHIVE_AFTER_DAYS = 30
+ARCHIVE_INTERVAL_SECONDS = 3600
+ARCHIVE_BATCH_SIZE = 500
+CLOSED_STATUSES = ('approved', 'rejected', 'auto_approved')
+# Kept as real columns on archived_requests; everything else goes in the record
+INDEXED_COLUMNS = ('id', 'request_id', 'aadhaar_id', 'update_type', 'status', 'risk_score', 'submitted_at',
+                   'completed_at', 'processing_center_id', 'assigned_officer_id')
+
+
+def to_record(row, columns):
+    record = {}
+    for column in columns:
+        value = getattr(row, column.key)
+        record[column.key] = value.isoformat() if isinstance(value, datetime) else value
+    return record
+
+
+def restore(model, archived, columns):
+    # A detached model instance with the archived row's values; never added to a session
+    values = dict(archived.record)
+    for column in columns:
+        if isinstance(column.type, DateTime) and values.get(column.key):
+            values[column.key] = datetime.fromisoformat(values[column.key])
+    for key in INDEXED_COLUMNS:
+        values[key] = getattr(archived, key)
+    return model(**{column.key: values.get(column.key) for column in columns})
+
+
+class Archiver:
+    def __init__(self, app, db, request_model, archive_model, rollup_model, audit_model, audit_archive_model,
+                 on_archived=None, days=ARCHIVE_AFTER_DAYS, interval=ARCHIVE_INTERVAL_SECONDS,
+                 batch_size=ARCHIVE_BATCH_SIZE):
+        self.app = app
+        self.db = db
+        self.Request = request_model
+        self.Archive = archive_model
+        self.Rollup = rollup_model
+        self.Audit = audit_model
+        self.AuditArchive = audit_archive_model
+        self.on_archived = on_archived
+        self.days = max(MIN_ARCHIVE_AFTER_DAYS, days)
+        self.interval = interval
+        self.batch_size = batch_size
+        # Computed columns are derived again by the database on restore
+        self.columns = [c for c in request_model.__table__.columns if c.computed is None]
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self.runs = 0
+        self.archived_requests = 0
+        self.archived_audit_logs = 0
+        self.conflicts = 0
+        self.last_run = None
+
+    def start(self):
+        if not self.interval or (self._thread is not None and self._thread.is_alive()):
+            return
+        self._thread = threading.Thread(target=self._run, name='archiver', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.run()
+            except Exception as e:
+                logger.error(f"Archiver error: {e}")
+
+    def cutoff(self, now=None):
+        return (now or datetime.utcnow()) - timedelta(days=self.days)
+
+    def run(self, max_batches=None):
+        # Moves every eligible row, or max_batches batches of each table; returns (requests, audit logs) moved
+        with self._lock, self.app.app_context():
+            cutoff = self.cutoff()
+            requests = self._drain(self._archive_requests, cutoff, max_batches)
+            audit_logs = self._drain(self._archive_audit_logs, cutoff, max_batches)
+            self.runs += 1
+            self.last_run = datetime.utcnow()
+        if requests or audit_logs:
+            logger.info(f"Archived {requests} requests and {audit_logs} audit logs")
+        return requests, audit_logs
+
+    def _drain(self, archive_batch, cutoff, max_batches):
+        moved, batches, last_id = 0, 0, 0
+        while max_batches is None or batches < max_batches:
+            try:
+                count, last_id = archive_batch(cutoff, last_id)
+            except IntegrityError:
+                # Another worker moved the same rows first
+                self.db.session.rollback()
+                self.conflicts += 1
+                break
+            except Exception:
+                self.db.session.rollback()
+                raise
+            finally:
+                self.db.session.expunge_all()
+            moved += count
+            batches += 1
+            if count < self.batch_size:
+                break
+        return moved
+
+    def _archive_requests(self, cutoff, last_id):
+        Request, session = self.Request, self.db.session
+        # SQLite hands out max(id) + 1, so the newest row stays put and its id is never reused
+        newest = session.query(func.max(Request.id)).scalar() or 0
+        rows = session.query(Request).options(undefer_group('details')).filter(
+            Request.id > last_id, Request.id < newest,
+            or_(and_(Request.status.in_(CLOSED_STATUSES), Request.completed_at < cutoff),
+                # Duplicates are closed without ever being completed
+                and_(Request.status == 'duplicate', Request.submitted_at < cutoff))
+        ).order_by(Request.id).limit(self.batch_size).all()
+        if not rows:
+            return 0, last_id
+
+        now = datetime.utcnow()
+        archived, rollups = [], {}
+        for row in rows:
+            record = to_record(row, self.columns)
+            archived.append({**{key: getattr(row, key) for key in INDEXED_COLUMNS},
+                             'record': {k: v for k, v in record.items() if k not in INDEXED_COLUMNS},
+                             'archived_at': now})
+            month = (row.completed_at or row.submitted_at or now).strftime('%Y-%m')
+            counts = rollups.setdefault((month, row.update_type, row.status), [0, 0, 0])
+            counts[0] += 1
+            counts[1] += bool(row.auto_approved)
+            counts[2] += bool(row.is_duplicate)
+        session.execute(insert(self.Archive), archived)
+        self._add_rollups(rollups)
+        session.query(Request).filter(Request.id.in_([row['id'] for row in archived])).delete(
+            synchronize_session=False)
+        session.commit()
+
+        self.archived_requests += len(archived)
+        if self.on_archived:
+            self.on_archived([SimpleNamespace(**row) for row in archived])
+        return len(archived), archived[-1]['id']
+
+    def _add_rollups(self, rollups):
+        Rollup, session = self.Rollup, self.db.session
+        for (month, update_type, status), (count, auto_approved, duplicates) in rollups.items():
+            updated = session.query(Rollup).filter_by(month=month, update_type=update_type, status=status).update(
+                {'count': Rollup.count + count, 'auto_approved': Rollup.auto_approved + auto_approved,
+                 'duplicates': Rollup.duplicates + duplicates}, synchronize_session=False)
+            if not updated:
+                session.add(Rollup(month=month, update_type=update_type, status=status, count=count,
+                                   auto_approved=auto_approved, duplicates=duplicates))
+        session.flush()
+
+    def _archive_audit_logs(self, cutoff, last_id):
+        Audit, session = self.Audit, self.db.session
+        newest = session.query(func.max(Audit.id)).scalar() or 0
+        rows = session.query(Audit).filter(Audit.id > last_id, Audit.id < newest, Audit.timestamp < cutoff).order_by(
+            Audit.id).limit(self.batch_size).all()
+        if not rows:
+            return 0, last_id
+        columns = [c.key for c in Audit.__table__.columns]
+        archived = [{key: getattr(row, key) for key in columns} for row in rows]
+        session.execute(insert(self.AuditArchive), archived)
+        session.query(Audit).filter(Audit.id.in_([row['id'] for row in archived])).delete(synchronize_session=False)
+        session.commit()
+        self.archived_audit_logs += len(archived)
+        return len(archived), archived[-1]['id']
+
+    def find(self, request_id):
+        # The archived request as a detached UpdateRequest, or None
+        archived = self.Archive.query.filter_by(request_id=request_id).first()
+        return restore(self.Request, archived, self.columns) if archived else None
+
+    def restore(self, archived):
+        return restore(self.Request, archived, self.columns)
+
+    def rollups(self):
+        # {(update_type, status): (count, auto_approved, duplicates)} over every archived month
+        Rollup = self.Rollup
+        return {(update_type, status): (count or 0, auto_approved or 0, duplicates or 0)
+                for update_type, status, count, auto_approved, duplicates in self.db.session.query(
+                    Rollup.update_type, Rollup.status, func.sum(Rollup.count), func.sum(Rollup.auto_approved),
+                    func.sum(Rollup.duplicates)).group_by(Rollup.update_type, Rollup.status)}
+
+    def stats(self):
+        return {'runs': self.runs, 'archived_requests': self.archived_requests,
+                'archived_audit_logs': self.archived_audit_logs, 'conflicts': self.conflicts,
+                'after_days': self.days, 'last_run': self.last_run.isoformat() if self.last_run else None}
@@ -0,0 +1,20 @@
+# archive_requests.py - Move closed requests and old audit logs to the archive tables
+#
+#   python archive_requests.py [--days 90] [--batches N]
+import argparse
+
+from app import app, archiver, db
+from archive import MIN_ARCHIVE_AFTER_DAYS
+
+parser = argparse.ArgumentParser()
+parser.add_argument('--days', type=int, default=archiver.days, help='archive rows closed longer ago than this')
+parser.add_argument('--batches', type=int, default=None, help='stop after this many batches per table')
+args = parser.parse_args()
+
+with app.app_context():
+    db.create_all()
+
+archiver.days = max(MIN_ARCHIVE_AFTER_DAYS, args.days)
+requests, audit_logs = archiver.run(max_batches=args.batches)
+print(f"Archived {requests} requests and {audit_logs} audit logs closed before {archiver.cutoff():%Y-%m-%d}")
+print(f"Stats: {archiver.stats()}")
@@ -13,10 +13,12 @@ with app.app_context():
 
     # 2. Ensure officers exist
     if Officer.query.count() == 0:
-        off1 = Officer(officer_id='OFF001', name='Rajesh Kumar', email='officer1@uidai.gov.in', processing_center='Delhi Processing Center')
+        off1 = Officer(officer_id='OFF001', name='Rajesh Kumar', email='officer1@uidai.gov.in', processing_center='Delhi Processing Center',
+                       processing_center_id=ProcessingCenter.query.filter_by(center_id='PC001').first().id)
         off1.set_password('password123')
         db.session.add(off1)
-        off2 = Officer(officer_id='OFF002', name='Priya Sharma', email='officer2@uidai.gov.in', processing_center='Mumbai Processing Center')
+        off2 = Officer(officer_id='OFF002', name='Priya Sharma', email='officer2@uidai.gov.in', processing_center='Mumbai Processing Center',
+                       processing_center_id=ProcessingCenter.query.filter_by(center_id='PC002').first().id)
         off2.set_password('password123')
         db.session.add(off2)
         db.session.commit()
@@ -31,9 +33,11 @@ with app.app_context():
             center = assign_to_processing_center(req)
             if center:
                 req.processing_center = center.name
+                req.processing_center_id = center.id
                 officer = assign_to_officer(center)
                 if officer:
                     req.assigned_officer = officer.name
+                    req.assigned_officer_id = officer.id
                     req.status = 'processing'
                     print(f"Assigned {req.request_id} to {officer.name}")
     
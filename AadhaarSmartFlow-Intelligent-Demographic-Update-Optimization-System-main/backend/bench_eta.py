@@ -0,0 +1,132 @@
+# bench_eta.py - Backtest of EtaEngine against submitted_at/completed_at pairs
+#
+# Replays a history of reviewed requests in time order through a
+# ReviewScheduler and an EtaEngine, just as the app feeds them. Submissions
+# are upserted. Completions are removed and recorded. The ETA is estimated
+# at submission time and compared with the actual time to completion.
+# The fixed '24-48 hours' estimate this replaced is scored alongside.
+#
+# The history comes from --database (update_requests reviewed by an officer)
+# or from a simulation. The simulation has officers working 09:00-18:00
+# with their own queues served in priority_key order, so overnight gaps and
+# uneven officers are part of the test.
+#
+#   python bench_eta.py [--days 28] [--database sqlite:///instance/aadhaar.db]
+import argparse
+import random
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+from eta import EtaEngine
+from scheduler import IndexedHeap, ReviewScheduler, priority_key
+
+UPDATE_TYPES = ['address_change', 'phone_change', 'name_change', 'email_change', 'marital_status']
+# (center_id, officer_pk, mean minutes per review)
+OFFICERS = [(1, 1, 12), (1, 2, 15), (1, 3, 20), (2, 4, 10), (2, 5, 25)]
+SHIFT_HOURS = (9, 18)
+
+
+def simulated_history(rng, days):
+    # [(pk, submitted_at, completed_at, center_id, officer_pk, update_type, risk_score)]
+    start = datetime(2026, 1, 5)
+    queues = {pk: IndexedHeap() for _, pk, _ in OFFICERS}
+    busy_until = {pk: 0 for _, pk, _ in OFFICERS}
+    speed = {pk: minutes for _, pk, minutes in OFFICERS}
+    requests, history = [], []
+    # Arrivals run at 80% of what the officers clear in a shift, spread over the whole day
+    daily_capacity = sum(60 / m for _, _, m in OFFICERS) * (SHIFT_HOURS[1] - SHIFT_HOURS[0])
+    per_minute = daily_capacity * 0.8 / 1440
+    for minute in range(days * 1440):
+        now = start + timedelta(minutes=minute)
+        for _ in range(int(per_minute) + (rng.random() < per_minute - int(per_minute))):
+            center_id = rng.choice([1, 1, 2])
+            officer_pk = min((pk for c, pk, _ in OFFICERS if c == center_id), key=lambda pk: len(queues[pk]))
+            update_type, risk = rng.choice(UPDATE_TYPES), round(rng.random(), 2)
+            pk = len(requests)
+            requests.append((now, center_id, officer_pk, update_type, risk))
+            queues[officer_pk].push(pk, priority_key(now, update_type, risk))
+        if not SHIFT_HOURS[0] <= now.hour < SHIFT_HOURS[1]:
+            continue
+        for officer_pk, queue in queues.items():
+            if busy_until[officer_pk] <= minute and len(queue):
+                pk, _ = queue.pop()
+                busy_until[officer_pk] = minute + max(1, round(rng.expovariate(1 / speed[officer_pk])))
+                submitted_at, center_id, _, update_type, risk = requests[pk]
+                history.append((pk, submitted_at, start + timedelta(minutes=busy_until[officer_pk]),
+                                center_id, officer_pk, update_type, risk))
+    return history
+
+
+def database_history(url):
+    from sqlalchemy import create_engine, text
+
+    engine = create_engine(url)
+    with engine.connect() as conn:
+        rows = conn.execute(text(
+            "SELECT id, submitted_at, completed_at, processing_center_id, assigned_officer_id, update_type, risk_score "
+            "FROM update_requests WHERE completed_at IS NOT NULL AND submitted_at IS NOT NULL "
+            "AND assigned_officer_id IS NOT NULL AND auto_approved IS NOT 1")).all()
+    parse = lambda value: value if isinstance(value, datetime) else datetime.fromisoformat(str(value))
+    return [(r[0], parse(r[1]), parse(r[2]), r[3], r[4], r[5], r[6] or 0.0) for r in rows]
+
+
+def backtest(history):
+    # [(predicted hours, actual hours)], predicted at submission
+    scheduler = ReviewScheduler()
+    scheduler.loaded = True
+    engine = EtaEngine(scheduler)
+    events = []
+    for pk, submitted_at, completed_at, center_id, officer_pk, update_type, risk in history:
+        events.append((submitted_at, 1, pk, center_id, officer_pk, update_type, risk))
+        events.append((completed_at, 0, pk, center_id, officer_pk, update_type, risk))
+    events.sort(key=lambda e: (e[0], e[1]))
+
+    submitted, pairs = {}, []
+    for at, is_submit, pk, center_id, officer_pk, update_type, risk in events:
+        if is_submit:
+            scheduler.upsert(SimpleNamespace(id=pk, status='processing', processing_center_id=center_id,
+                                             assigned_officer_id=officer_pk, submitted_at=at,
+                                             update_type=update_type, risk_score=risk))
+            submitted[pk] = (at, engine.estimate(pk, now=at)['hours'])
+        else:
+            scheduler.remove(pk)
+            engine.record_completion(center_id, officer_pk, at=at)
+            submitted_at, predicted = submitted.pop(pk)
+            pairs.append((predicted, (at - submitted_at).total_seconds() / 3600))
+    return pairs
+
+
+def percentile(values, q):
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+def report(label, pairs):
+    errors = sorted(abs(p - a) for p, a in pairs)
+    bias = sum(p - a for p, a in pairs) / len(pairs)
+    close = sum(1 for p, a in pairs if abs(p - a) <= max(2.0, 0.25 * a)) / len(pairs)
+    print(f"  {label:22s} MAE {sum(errors) / len(errors):6.1f}h  median {percentile(errors, 0.5):6.1f}h  "
+          f"p90 {percentile(errors, 0.9):6.1f}h  bias {bias:+6.1f}h  within max(2h, 25%) {close:6.1%}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--days', type=int, default=28)
+    parser.add_argument('--database', help='SQLAlchemy URL to backtest update_requests from')
+    args = parser.parse_args()
+
+    history = database_history(args.database) if args.database else simulated_history(random.Random(42), args.days)
+    if not history:
+        print("No reviewed requests to backtest")
+        return
+    pairs = backtest(history)
+    actual = sorted(a for _, a in pairs)
+    print(f"{len(pairs)} reviewed requests, actual time to completion p50 {percentile(actual, 0.5):.1f}h "
+          f"p90 {percentile(actual, 0.9):.1f}h")
+    report('EtaEngine', pairs)
+    report("fixed '24-48 hours'", [(36.0, a) for _, a in pairs])
+    inside = sum(1 for a in actual if 24 <= a <= 48) / len(actual)
+    print(f"  actual inside 24-48h window: {inside:.1%}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,110 @@
+# bench_json.py - CPU and peak RSS of list responses on a 10k-row payload
+#
+# Compares the stdlib Flask encoder, the orjson provider and streaming mode on
+# /api/officer/pending-requests against a scratch database. Each mode runs in
+# its own process so ru_maxrss reflects only that mode.
+#
+#   python bench_json.py [--rows 10000] [--repeat 5]
+import argparse
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+MODES = ['stdlib', 'orjson', 'stream']
+
+
+def seed(rows):
+    from app import app, db, create_sample_data, UpdateRequest
+
+    with app.app_context():
+        db.create_all()
+        create_sample_data()
+        now = datetime.utcnow()
+        db.session.bulk_insert_mappings(UpdateRequest, [{
+            'request_id': f'REQBENCH{i:08d}',
+            'aadhaar_id': '123456789012',
+            'update_type': 'address_change',
+            'status': 'processing',
+            'old_data': f'{i} Old Street, Delhi',
+            'new_data': f'{i} New Street, Mumbai',
+            'details': [{'field': 'address_change', 'oldValue': f'{i} Old Street', 'newValue': f'{i} New Street'}],
+            'documents': [f'doc_{i}.pdf'],
+            'document_types': ['address_proof'],
+            'risk_score': (i % 100) / 100,
+            'submitted_at': now - timedelta(minutes=i),
+            'processing_center': 'Delhi Processing Center',
+            'assigned_officer': 'Rajesh Kumar'
+        } for i in range(rows)])
+        db.session.commit()
+
+
+def run_mode(mode, rows, repeat):
+    from flask.json.provider import DefaultJSONProvider
+    from app import app
+
+    if mode == 'stdlib':
+        app.json = DefaultJSONProvider(app)
+
+    client = app.test_client()
+    login = client.post('/api/auth/login', json={
+        'user_type': 'officer', 'email': 'officer1@uidai.gov.in', 'password': 'password123'})
+    headers = {'Authorization': f"Bearer {login.get_json()['token']}"}
+
+    url = '/api/officer/pending-requests?include_details=true'
+    url += '&stream=true' if mode == 'stream' else f'&per_page={rows + 10}'
+
+    rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    cpu_start = time.process_time()
+    wall_start = time.perf_counter()
+    size = 0
+    for _ in range(repeat):
+        response = client.get(url, headers=headers, buffered=False)
+        for chunk in response.iter_encoded():
+            size += len(chunk)
+        response.close()
+    cpu = (time.process_time() - cpu_start) / repeat
+    wall = (time.perf_counter() - wall_start) / repeat
+    rss_after = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    print(f"{mode:8s} cpu {cpu * 1000:8.1f} ms  wall {wall * 1000:8.1f} ms  "
+          f"body {size / repeat / 1024:8.0f} KiB  peak RSS +{(rss_after - rss_before) / 1024:6.1f} MiB")
+
+    # Encoder cost on its own, without query and ORM hydration
+    if mode != 'stream':
+        from app import UpdateRequest
+        with app.app_context():
+            payload = {'requests': [r.to_dict() for r in UpdateRequest.query.limit(rows).all()]}
+            cpu_start = time.process_time()
+            for _ in range(repeat):
+                app.json.response(payload)
+            encode = (time.process_time() - cpu_start) / repeat
+        print(f"{'':8s} encode only {encode * 1000:8.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, default=10000)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--mode', choices=MODES)
+    args = parser.parse_args()
+
+    if args.mode:
+        run_mode(args.mode, args.rows, args.repeat)
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        env = dict(os.environ, DATABASE_URL=f"sqlite:///{os.path.join(tmp, 'bench.db')}")
+        subprocess.run([sys.executable, '-c', f'import bench_json; bench_json.seed({args.rows})'],
+                       env=env, check=True, cwd=os.path.dirname(os.path.abspath(__file__)))
+        print(f"{args.rows} rows, mean of {args.repeat} requests")
+        for mode in MODES:
+            subprocess.run([sys.executable, __file__, '--mode', mode, '--rows', str(args.rows),
+                            '--repeat', str(args.repeat)], env=env, check=True)
+
+
+if __name__ == '__main__':
+    main()
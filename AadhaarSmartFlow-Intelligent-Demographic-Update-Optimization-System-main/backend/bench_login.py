@@ -0,0 +1,99 @@
+# bench_login.py - Login throughput and unrelated-endpoint latency in a login storm
+#
+# Simulates a threaded WSGI server (--threads request threads) receiving
+# logins at --rate per second for --duration seconds while /api/health is
+# probed every 10 ms, against a scratch database. Three setups are compared:
+# bcrypt inline with no admission limit (the old behaviour), inline with the
+# bounded queue, and the process pool with the bounded queue. Rate limiting is
+# switched off, since every login is for the same account.
+#
+#   python bench_login.py [--rate 10] [--duration 5] [--threads 8] [--rounds 12]
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+MODES = (
+    ('inline, unbounded', {'PASSWORD_HASH_WORKERS': '0', 'PASSWORD_HASH_MAX_PENDING': '1000000'}),
+    ('inline, bounded', {'PASSWORD_HASH_WORKERS': '0'}),
+    ('pool, bounded', {}),
+)
+
+
+def percentile(values, pct):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct / 100))]
+
+
+def run(label, rate, duration, threads):
+    from app import app, db, create_sample_data
+
+    with app.app_context():
+        db.create_all()
+        create_sample_data()
+
+    client = app.test_client()
+    credentials = {'aadhaar_id': '123456789012', 'password': 'password123'}
+
+    def login():
+        return client.post('/api/auth/login', json=credentials).status_code
+
+    def probe(submitted):
+        client.get('/api/health')
+        return time.perf_counter() - submitted
+
+    # Warm the pool so process start-up is not measured
+    login()
+
+    server = ThreadPoolExecutor(max_workers=threads)
+    login_futures, probe_futures = [], []
+    start = time.perf_counter()
+    next_login = start
+    while time.perf_counter() - start < duration:
+        now = time.perf_counter()
+        while next_login <= now:
+            login_futures.append(server.submit(login))
+            next_login += 1 / rate
+        probe_futures.append(server.submit(probe, now))
+        time.sleep(0.01)
+    server.shutdown(wait=True)
+    elapsed = time.perf_counter() - start
+
+    statuses = [f.result() for f in login_futures]
+    latencies = [f.result() * 1000 for f in probe_futures]
+    ok = statuses.count(200)
+    print(f"  {label:18s} logins {ok:4d} ok {statuses.count(503):4d} busy ({ok / elapsed:5.1f}/s)  "
+          f"/api/health p50 {statistics.median(latencies):8.1f} ms  p99 {percentile(latencies, 99):8.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rate', type=float, default=10)
+    parser.add_argument('--duration', type=float, default=5)
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--rounds', type=int, default=12)
+    parser.add_argument('--child')
+    args = parser.parse_args()
+
+    if args.child:
+        run(args.child, args.rate, args.duration, args.threads)
+        return
+
+    print(f"{args.rate:g} logins/s for {args.duration:g}s, {args.threads} request threads, "
+          f"bcrypt cost {args.rounds}, {os.cpu_count()} cores")
+    for label, overrides in MODES:
+        with tempfile.TemporaryDirectory() as tmp:
+            env = dict(os.environ, DATABASE_URL=f"sqlite:///{os.path.join(tmp, 'bench.db')}",
+                       UPLOAD_FOLDER=os.path.join(tmp, 'uploads'), BCRYPT_LOG_ROUNDS=str(args.rounds),
+                       RATE_LIMIT_ENABLED='false', **overrides)
+            subprocess.run([sys.executable, __file__, '--child', label, '--rate', str(args.rate),
+                            '--duration', str(args.duration), '--threads', str(args.threads)],
+                           env=env, check=True)
+
+
+if __name__ == '__main__':
+    main()
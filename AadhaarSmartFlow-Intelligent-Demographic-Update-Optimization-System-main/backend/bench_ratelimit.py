@@ -0,0 +1,67 @@
+# bench_ratelimit.py - Per-request cost of the rate limiter
+#
+# Times LocalBackend.hit on its own, then RateLimiter.check for the login
+# policies: once with the app's scope functions inside a request context
+# (one client, so mostly the limited path), and once spread over --keys
+# identities so buckets are created, refilled and swept.
+#
+#   python bench_ratelimit.py [--calls 200000] [--keys 50000]
+import argparse
+import random
+import time
+
+from ratelimit import LocalBackend, RateLimiter
+
+
+def per_call_us(fn, calls):
+    start = time.perf_counter()
+    for i in range(calls):
+        fn(i)
+    return (time.perf_counter() - start) / calls * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--calls', type=int, default=200000)
+    parser.add_argument('--keys', type=int, default=50000)
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    keys = [f'login:account:{rng.randrange(10 ** 12):012d}' for _ in range(args.keys)]
+    picks = [keys[rng.randrange(args.keys)] for _ in range(args.calls)]
+
+    backend = LocalBackend()
+    hit_us = per_call_us(lambda i: backend.hit(picks[i], 10 / 60, 10), args.calls)
+
+    from app import app, RATE_LIMIT_POLICIES, rate_limiter
+
+    # The app's own scope functions, reading the address and body of the current request
+    real = RateLimiter(LocalBackend(), RATE_LIMIT_POLICIES, rate_limiter.scopes)
+    with app.test_request_context('/api/auth/login', method='POST', json={'aadhaar_id': '123456789012'},
+                                  environ_base={'REMOTE_ADDR': '10.0.0.1'}):
+        real_us = per_call_us(lambda i: real.check('login'), args.calls)
+
+    # Many identities, so buckets are created, refilled and swept
+    accounts = [k.rsplit(':', 1)[1] for k in picks]
+    current = {'i': 0}
+    spread = RateLimiter(LocalBackend(), RATE_LIMIT_POLICIES, scopes={
+        'ip': lambda: f'10.0.{current["i"] % 250}.{current["i"] % 199}',
+        'account': lambda: accounts[current['i']],
+    })
+
+    def check(i):
+        current['i'] = i
+        spread.check('login')
+
+    spread_us = per_call_us(check, args.calls)
+
+    policies = len(RATE_LIMIT_POLICIES['login'])
+    print(f"{args.calls} calls, {policies} login policies")
+    print(f"  LocalBackend.hit, {args.keys} keys        {hit_us:6.2f} us/call")
+    print(f"  login check, one client (app scopes)  {real_us:6.2f} us/request")
+    print(f"  login check, {args.keys} identities      {spread_us:6.2f} us/request "
+          f"({spread.limited} limited, {spread.backend.size()} live buckets)")
+
+
+if __name__ == '__main__':
+    main()
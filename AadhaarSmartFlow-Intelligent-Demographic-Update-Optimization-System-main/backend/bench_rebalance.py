@@ -0,0 +1,173 @@
+# bench_rebalance.py - Queue waits with and without work stealing
+#
+# Replays a load history minute by minute. Requests are assigned the way
+# submit does it: center by lowest current_load (which never goes down, so
+# effectively round robin), then the active officer with the lowest workload
+# in that center. Officers review their own queue in priority_key order,
+# then the center's unassigned pool. The run is repeated with plan_transfers
+# applied every --interval minutes, on the same snapshot the Rebalancer
+# builds (backlog, reviews in the last THROUGHPUT_WINDOW_HOURS). The output
+# shows wait percentiles, the worst center's p95 and the number of moves.
+#
+# The history comes from --database (update_requests that were not
+# auto-approved, and the officers table; review times are sampled) or is
+# synthetic. The synthetic history has three centers of unequal strength and
+# one officer who is off for two days with a full queue.
+#
+#   python bench_rebalance.py [--days 14] [--interval 5] [--database sqlite:///instance/aadhaar.db]
+import argparse
+import random
+from collections import deque
+from datetime import datetime, timedelta
+
+from rebalance import (PRIOR_HOURS, PRIOR_REVIEWS_PER_HOUR, THROUGHPUT_WINDOW_HOURS, Worker,
+                       plan_transfers)
+from scheduler import IndexedHeap, priority_key
+
+MAX_WORKLOAD = 100
+UPDATE_TYPES = ['address_change', 'phone_change', 'name_change', 'email_change', 'marital_status']
+
+
+class SimOfficer:
+    def __init__(self, pk, center_id, minutes_per_review, off=()):
+        self.pk = pk
+        self.center_id = center_id
+        self.minutes_per_review = minutes_per_review
+        self.off = off
+        self.queue = IndexedHeap()
+        self.busy_until = 0
+        self.done = deque()
+
+    def active(self, minute):
+        return not any(start <= minute < end for start, end in self.off)
+
+
+def synthetic_history(rng, days):
+    # (minute, update_type, risk_score), and officers as (pk, center_id, minutes per review, off periods)
+    officers = [(1, 1, 10, ()), (2, 1, 10, ((3 * 1440, 5 * 1440),)), (3, 1, 12, ()), (4, 1, 12, ()),
+                (5, 2, 10, ()), (6, 2, 14, ()), (7, 2, 14, ()),
+                (8, 3, 18, ()), (9, 3, 20, ())]
+    capacity = sum(60 / m for _, _, m, _ in officers)
+    arrivals = []
+    for minute in range(days * 1440):
+        # Daytime peak, quiet nights; about 85% of total capacity over a day
+        hour = (minute // 60) % 24
+        rate = capacity * 0.85 * (1.6 if 9 <= hour < 18 else 0.4375) / 60
+        for _ in range(int(rate) + (rng.random() < rate - int(rate))):
+            arrivals.append((minute, rng.choice(UPDATE_TYPES), round(rng.random(), 2)))
+    return arrivals, officers
+
+
+def database_history(url, rng):
+    from sqlalchemy import create_engine, text
+
+    engine = create_engine(url)
+    with engine.connect() as conn:
+        rows = conn.execute(text(
+            "SELECT submitted_at, update_type, risk_score FROM update_requests "
+            "WHERE auto_approved IS NOT 1 AND submitted_at IS NOT NULL ORDER BY submitted_at")).all()
+        officers = conn.execute(text(
+            "SELECT id, processing_center_id FROM officers WHERE processing_center_id IS NOT NULL")).all()
+    start = datetime.fromisoformat(str(rows[0][0]))
+    arrivals = [(int((datetime.fromisoformat(str(s)) - start).total_seconds() // 60), t, r or 0.0) for s, t, r in rows]
+    return arrivals, [(pk, center_id, rng.choice([10, 12, 15]), ()) for pk, center_id in officers]
+
+
+def simulate(arrivals, officer_specs, interval, rng):
+    officers = [SimOfficer(*spec) for spec in officer_specs]
+    centers = sorted({o.center_id for o in officers})
+    center_load = {c: 0 for c in centers}
+    pools = {c: IndexedHeap() for c in centers}
+    start = datetime(2026, 1, 1)
+    requests, waits, moves = [], [], 0
+    horizon = max(a[0] for a in arrivals) + 1
+    pending = deque(arrivals)
+    minute = 0
+    while minute < horizon or any(len(o.queue) for o in officers) or any(len(p) for p in pools.values()):
+        while pending and pending[0][0] <= minute:
+            _, update_type, risk = pending.popleft()
+            pk = len(requests)
+            center_id = min(centers, key=center_load.__getitem__)
+            center_load[center_id] += 1
+            key = priority_key(start + timedelta(minutes=minute), update_type, risk)
+            requests.append((minute, center_id))
+            candidates = [o for o in officers if o.center_id == center_id and o.active(minute)
+                          and len(o.queue) < MAX_WORKLOAD]
+            if candidates:
+                min(candidates, key=lambda o: len(o.queue)).queue.push(pk, key)
+            else:
+                pools[center_id].push(pk, key)
+
+        for officer in officers:
+            if officer.busy_until > minute or not officer.active(minute):
+                continue
+            own, pool = officer.queue, pools[officer.center_id]
+            best = min((q for q in (own, pool) if len(q)), key=lambda q: q.top(1)[0][0], default=None)
+            if best is None:
+                continue
+            pk, _ = best.pop()
+            waits.append((minute - requests[pk][0], requests[pk][1]))
+            officer.busy_until = minute + max(1, round(rng.expovariate(1 / officer.minutes_per_review)))
+            officer.done.append(officer.busy_until)
+
+        if interval and minute % interval == 0:
+            moves += rebalance(officers, pools, minute)
+        minute += 1
+    return waits, moves
+
+
+def rebalance(officers, pools, minute):
+    by_pk = {o.pk: o for o in officers}
+    window = THROUGHPUT_WINDOW_HOURS * 60
+    workers = []
+    for officer in officers:
+        while officer.done and officer.done[0] < minute - window:
+            officer.done.popleft()
+        rate = (len(officer.done) + PRIOR_REVIEWS_PER_HOUR * PRIOR_HOURS) / (THROUGHPUT_WINDOW_HOURS + PRIOR_HOURS)
+        workers.append(Worker(officer.center_id, officer.pk, len(officer.queue), rate,
+                              MAX_WORKLOAD - len(officer.queue), officer.active(minute)))
+    workers.extend(Worker(center_id, None, len(pool)) for center_id, pool in pools.items())
+
+    moved = 0
+    for ((center_id, from_pk), to_pk), count in plan_transfers(workers).items():
+        donor = pools[center_id] if from_pk is None else by_pk[from_pk].queue
+        # Off the back of the donor's queue, as Rebalancer._pick does
+        for key, pk in donor.top(len(donor))[-count:]:
+            donor.remove(pk)
+            by_pk[to_pk].queue.push(pk, key)
+            moved += 1
+    return moved
+
+
+def percentile(values, q):
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+def report(label, waits, moves):
+    hours = sorted(w / 60 for w, _ in waits)
+    worst = max(percentile(sorted(w / 60 for w, c in waits if c == center), 0.95)
+                for center in {c for _, c in waits})
+    print(f"  {label:24s} p50 {percentile(hours, 0.5):6.1f}h  p95 {percentile(hours, 0.95):6.1f}h  "
+          f"p99 {percentile(hours, 0.99):6.1f}h  max {hours[-1]:6.1f}h  worst center p95 {worst:6.1f}h  "
+          f"moves {moves}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--days', type=int, default=14)
+    parser.add_argument('--interval', type=int, default=5, help='minutes between rebalancing passes')
+    parser.add_argument('--database', help='SQLAlchemy URL to replay update_requests from')
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    if args.database:
+        arrivals, officers = database_history(args.database, rng)
+    else:
+        arrivals, officers = synthetic_history(rng, args.days)
+    print(f"{len(arrivals)} requests, {len(officers)} officers in {len({o[1] for o in officers})} centers")
+    report('assigned at submit only', *simulate(arrivals, officers, 0, random.Random(7)))
+    report(f'rebalanced every {args.interval} min', *simulate(arrivals, officers, args.interval, random.Random(7)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,92 @@
+# bench_routing.py - Cost of a routing lookup, and where requests land
+#
+# Builds a CenterRouter over --centers synthetic centers spread across
+# postal circles, weighted by population. Times candidates() for addresses
+# with a PIN, with only a state name, and with neither. Then routes
+# --requests applicants the way assign_to_processing_center does (nearest
+# tier first, least loaded under capacity) against capacities sized to
+# --fill of the total demand. Prints the tier mix and the cross-state
+# overflow rate.
+#
+#   python bench_routing.py [--centers 5000] [--requests 200000] [--fill 0.9]
+import argparse
+import random
+import time
+
+from routing import CenterRouter
+
+# Postal circle (first two PIN digits) -> state, with relative demand
+CIRCLES = {
+    '11': ('Delhi', 6), '12': ('Haryana', 4), '14': ('Punjab', 4), '20': ('Uttar Pradesh', 12),
+    '22': ('Uttar Pradesh', 8), '30': ('Rajasthan', 7), '38': ('Gujarat', 7), '40': ('Maharashtra', 9),
+    '41': ('Maharashtra', 6), '45': ('Madhya Pradesh', 7), '50': ('Telangana', 5), '52': ('Andhra Pradesh', 5),
+    '56': ('Karnataka', 7), '60': ('Tamil Nadu', 8), '68': ('Kerala', 4), '70': ('West Bengal', 9),
+    '75': ('Odisha', 4), '78': ('Assam', 3), '80': ('Bihar', 10),
+}
+
+
+def make_centers(rng, count):
+    circles = list(CIRCLES)
+    weights = [CIRCLES[c][1] for c in circles]
+    rows = []
+    for pk in range(1, count + 1):
+        circle = rng.choices(circles, weights)[0]
+        pin = f'{circle}{rng.randrange(10)}{rng.randrange(1000):03d}'
+        rows.append((pk, CIRCLES[circle][0], f'District {pin[:3]}', pin))
+    return rows
+
+
+def make_address(rng):
+    circle = rng.choices(list(CIRCLES), [w for _, w in CIRCLES.values()])[0]
+    kind = rng.random()
+    if kind < 0.8:
+        return f'{rng.randrange(1, 500)} Main Road, {CIRCLES[circle][0]} {circle}{rng.randrange(10)}{rng.randrange(1000):03d}'
+    if kind < 0.95:
+        return f'{rng.randrange(1, 500)} Main Road, {CIRCLES[circle][0]}'
+    return f'{rng.randrange(1, 500)} Main Road'
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--centers', type=int, default=5000)
+    parser.add_argument('--requests', type=int, default=200000)
+    parser.add_argument('--fill', type=float, default=0.9, help='total capacity as a share of demand')
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    centers = make_centers(rng, args.centers)
+    router = CenterRouter(lambda: centers, refresh_seconds=3600)
+    start = time.perf_counter()
+    router.refresh()
+    print(f"{args.centers} centers indexed in {(time.perf_counter() - start) * 1000:.1f} ms")
+
+    addresses = [make_address(rng) for _ in range(args.requests)]
+    start = time.perf_counter()
+    routes = [router.candidates(address) for address in addresses]
+    print(f"candidates(): {(time.perf_counter() - start) / args.requests * 1e6:.2f} us/request")
+
+    # Route against capacities, as assign_to_processing_center does with current_load
+    capacity = max(1, int(args.requests * args.fill / args.centers))
+    load = dict.fromkeys((pk for pk, *_ in centers), 0)
+    router.routed = dict.fromkeys(router.routed, 0)
+    start = time.perf_counter()
+    for home_state, tiers in routes:
+        for tier, center_pks in tiers:
+            open_centers = [pk for pk in center_pks if load[pk] < capacity]
+            if open_centers:
+                chosen = min(open_centers, key=load.__getitem__)
+                load[chosen] += 1
+                router.record(tier, home_state, chosen)
+                break
+        else:
+            chosen = min(load, key=load.__getitem__)
+            load[chosen] += 1
+            router.record('national', home_state, chosen, over_capacity=True)
+    elapsed = time.perf_counter() - start
+    print(f"routing with capacity {capacity}/center: {elapsed / args.requests * 1e6:.1f} us/request (in memory)")
+    for key, value in router.stats().items():
+        print(f"  {key:18s} {value}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,140 @@
+# bench_scheduler.py - Queue waits under the old and new review order
+#
+# Simulates one processing center: Poisson arrivals of update requests
+# with per-type risk scores, and --officers officers who each review one
+# request at a time. The same arrivals are run twice, once ordered the old
+# way (risk_score DESC, submitted_at DESC) and once by priority_key. The
+# output shows wait percentiles overall and by risk band, the longest wait
+# and the SLA miss rate. The heap operations behind the scheduler and
+# next_for_officer are timed on a --queue sized backlog.
+#
+#   python bench_scheduler.py [--days 14] [--officers 6] [--load 0.97] [--queue 100000]
+import argparse
+import random
+import time
+from datetime import datetime, timedelta
+
+from scheduler import HOUR, IndexedHeap, ReviewScheduler, priority_key, sla_deadline
+
+# (update_type, share of traffic, base risk)
+MIX = [('address_change', 0.40, 0.3), ('phone_change', 0.20, 0.2), ('email_change', 0.10, 0.2),
+       ('name_change', 0.12, 0.6), ('marital_status', 0.08, 0.5), ('photo_update', 0.06, 0.4),
+       ('biometric_update', 0.04, 0.7)]
+MEAN_REVIEW_MINUTES = 12
+
+
+def arrivals(rng, days, officers, load):
+    # (submitted_at, update_type, risk_score, review_seconds), in submission order
+    rate = officers * load / (MEAN_REVIEW_MINUTES * 60)
+    start = datetime(2026, 1, 1)
+    types, weights = [t for t, _, _ in MIX], [w for _, w, _ in MIX]
+    base = {t: r for t, _, r in MIX}
+    t, horizon, result = 0.0, days * 24 * HOUR, []
+    while True:
+        t += rng.expovariate(rate)
+        if t >= horizon:
+            return result
+        update_type = rng.choices(types, weights)[0]
+        risk = min(1.0, max(0.0, base[update_type] + rng.gauss(0.05, 0.2)))
+        result.append((start + timedelta(seconds=t), update_type, round(risk, 2),
+                       rng.expovariate(1 / (MEAN_REVIEW_MINUTES * 60))))
+
+
+def simulate(requests, officers, key_func):
+    # Returns [(wait_seconds, risk_score, missed_sla)] for every reviewed request
+    queue = IndexedHeap()
+    free_at = [requests[0][0].timestamp()] * officers
+    waits, next_arrival = [], 0
+    while next_arrival < len(requests) or len(queue):
+        officer = min(range(officers), key=free_at.__getitem__)
+        now = free_at[officer]
+        if not len(queue) and requests[next_arrival][0].timestamp() > now:
+            now = requests[next_arrival][0].timestamp()
+        while next_arrival < len(requests) and requests[next_arrival][0].timestamp() <= now:
+            submitted_at, update_type, risk, _ = requests[next_arrival]
+            queue.push(next_arrival, key_func(submitted_at, update_type, risk))
+            next_arrival += 1
+        index, _ = queue.pop()
+        submitted_at, update_type, risk, review_seconds = requests[index]
+        done = now + review_seconds
+        waits.append((now - submitted_at.timestamp(), risk, done > sla_deadline(submitted_at, update_type)))
+        free_at[officer] = done
+    return waits
+
+
+def legacy_key(submitted_at, update_type, risk_score):
+    return (-risk_score, -submitted_at.timestamp())
+
+
+def percentile(values, q):
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+def report(label, waits):
+    print(f"  {label}")
+    for band, low, high in (('all', 0.0, 1.01), ('risk < 0.4', 0.0, 0.4), ('risk >= 0.7', 0.7, 1.01)):
+        hours = sorted(w / HOUR for w, risk, _ in waits if low <= risk < high)
+        if not hours:
+            continue
+        print(f"    {band:12s} n={len(hours):6d}  p50 {percentile(hours, 0.5):7.1f}h  "
+              f"p95 {percentile(hours, 0.95):7.1f}h  p99 {percentile(hours, 0.99):7.1f}h  max {hours[-1]:7.1f}h")
+    missed = sum(1 for _, _, miss in waits if miss)
+    print(f"    SLA missed   {missed / len(waits):6.1%}")
+
+
+def time_operations(rng, size, officers):
+    now = datetime(2026, 1, 1)
+    rows = [(i, now - timedelta(seconds=rng.randrange(7 * 24 * 3600)), rng.choice(MIX)[0], rng.random(),
+             1, rng.choice([None] + list(range(officers)))) for i in range(size)]
+    scheduler = ReviewScheduler()
+    start = time.perf_counter()
+    scheduler.rebuild(rows)
+    rebuild_ms = (time.perf_counter() - start) * 1000
+
+    class Request:
+        status = 'pending'
+        processing_center_id = 1
+
+    calls = 20000
+    start = time.perf_counter()
+    for i in range(calls):
+        request = Request()
+        request.id, request.submitted_at, request.update_type, request.risk_score = size + i, now, 'address_change', rng.random()
+        request.assigned_officer_id = rng.choice([None] + list(range(officers)))
+        scheduler.upsert(request)
+    upsert_us = (time.perf_counter() - start) / calls * 1e6
+
+    start = time.perf_counter()
+    for i in range(calls):
+        scheduler.next_for_officer(rng.randrange(officers), 1, 10)
+    next_us = (time.perf_counter() - start) / calls * 1e6
+
+    start = time.perf_counter()
+    removed = rng.sample(range(size), min(size, calls))
+    for i in removed:
+        scheduler.remove(i)
+    remove_us = (time.perf_counter() - start) / len(removed) * 1e6
+
+    print(f"\n{size} open requests: rebuild {rebuild_ms:.0f} ms, upsert {upsert_us:.1f} us, "
+          f"remove {remove_us:.1f} us, next 10 for officer {next_us:.1f} us")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--days', type=int, default=14)
+    parser.add_argument('--officers', type=int, default=6)
+    parser.add_argument('--load', type=float, default=0.97)
+    parser.add_argument('--queue', type=int, default=100000)
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    requests = arrivals(rng, args.days, args.officers, args.load)
+    print(f"{len(requests)} requests over {args.days} days, {args.officers} officers, load {args.load:.0%}")
+    report('risk_score DESC, submitted_at DESC', simulate(requests, args.officers, legacy_key))
+    report('priority_key (SLA, risk, age)', simulate(requests, args.officers, priority_key))
+
+    time_operations(rng, args.queue, args.officers)
+
+
+if __name__ == '__main__':
+    main()
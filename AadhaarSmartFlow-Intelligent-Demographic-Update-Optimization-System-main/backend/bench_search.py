@@ -0,0 +1,107 @@
+# bench_search.py - Search latency over a large update_requests table
+#
+# Fills a scratch database with --rows requests (through the FTS triggers)
+# from --users applicants, then times search_requests for typical officer
+# queries: a name, a name prefix, a request_id prefix, an address fragment,
+# and a very common word (the worst case for ranking).
+#
+#   python bench_search.py [--rows 1000000] [--users 100000]
+import argparse
+import os
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+FIRST = ['Amit', 'Priya', 'Rahul', 'Sneha', 'Vikram', 'Anjali', 'Rohan', 'Kavya', 'Arjun', 'Meera',
+         'Suresh', 'Lakshmi', 'Imran', 'Fatima', 'Gurpreet', 'Deepa']
+LAST = ['Patel', 'Sharma', 'Kumar', 'Singh', 'Reddy', 'Nair', 'Iyer', 'Khan', 'Das', 'Gupta',
+        'Verma', 'Joshi', 'Mehta', 'Rao', 'Bose', 'Chopra']
+STREETS = ['MG Road', 'Park Street', 'Station Road', 'Gandhi Nagar', 'Civil Lines', 'Lake View',
+           'Nehru Place', 'Anna Salai', 'Brigade Road', 'Linking Road']
+CITIES = ['Delhi', 'Mumbai', 'Chennai', 'Kolkata', 'Bengaluru', 'Hyderabad', 'Pune', 'Jaipur', 'Lucknow']
+REASONS = [None, None, None, 'Address proof illegible', 'Name mismatch with birth certificate',
+           'Document expired', 'Photo not clear']
+CHUNK = 20000
+
+
+def fill(db, rows, users, rng):
+    from sqlalchemy import text
+
+    with db.engine.begin() as conn:
+        conn.execute(text('INSERT INTO users (aadhaar_id, name, created_at) VALUES (:a, :n, CURRENT_TIMESTAMP)'),
+                     [{'a': f'{i:012d}', 'n': f'{rng.choice(FIRST)} {rng.choice(LAST)}'} for i in range(users)])
+    for start in range(0, rows, CHUNK):
+        batch = []
+        for i in range(start, min(rows, start + CHUNK)):
+            update_type = rng.choice(['address_change', 'name_change', 'phone_change'])
+            if update_type == 'address_change':
+                new_data = f'{rng.randint(1, 999)} {rng.choice(STREETS)}, {rng.choice(CITIES)} {rng.randint(110001, 700099)}'
+            elif update_type == 'name_change':
+                new_data = f'{rng.choice(FIRST)} {rng.choice(LAST)}'
+            else:
+                new_data = f'9{rng.randint(100000000, 999999999)}'
+            batch.append({'r': f'REQ{i:014d}{rng.randrange(16 ** 6):06X}', 'a': f'{rng.randrange(users):012d}',
+                          't': update_type, 'n': new_data, 'o': '', 'x': rng.choice(REASONS),
+                          's': rng.choice(['pending', 'processing', 'approved', 'rejected'])})
+        with db.engine.begin() as conn:
+            conn.execute(text(
+                'INSERT INTO update_requests (request_id, aadhaar_id, update_type, new_data, old_data, '
+                'rejection_reason, status, submitted_at) VALUES (:r, :a, :t, :n, :o, :x, :s, CURRENT_TIMESTAMP)'),
+                batch)
+
+
+def run(rows, users):
+    from app import app, db
+    from migrate import run_migrations
+    from search import search_requests
+
+    rng = random.Random(42)
+    with app.app_context():
+        db.create_all()
+        run_migrations(db)
+        start = time.perf_counter()
+        fill(db, rows, users, rng)
+        print(f"{rows} requests indexed in {time.perf_counter() - start:.1f}s, "
+              f"database {os.path.getsize(db.engine.url.database) / 1024 / 1024:.0f} MiB")
+
+        queries = [
+            ('name', 'Gurpreet Chopra', None),
+            ('name prefix', 'Gurp Chop', None),
+            ('request_id prefix', f'REQ{rows // 2:014d}'[:14], None),
+            ('address fragment', 'Brigade Road Pune', None),
+            ('rejection reason', 'illegible', ['rejected']),
+            ('common word', 'Road', None),
+        ]
+        for label, query, statuses in queries:
+            timings = []
+            for _ in range(20):
+                t = time.perf_counter()
+                hits, _ = search_requests(db, query, statuses, limit=21)
+                timings.append((time.perf_counter() - t) * 1000)
+            print(f"  {label:18s} {query!r:24s} {len(hits):3d} hits  "
+                  f"median {statistics.median(timings):7.1f} ms  max {max(timings):7.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, default=1000000)
+    parser.add_argument('--users', type=int, default=100000)
+    parser.add_argument('--child', action='store_true')
+    args = parser.parse_args()
+
+    if args.child:
+        run(args.rows, args.users)
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        env = dict(os.environ, DATABASE_URL=f"sqlite:///{os.path.join(tmp, 'bench.db')}",
+                   UPLOAD_FOLDER=os.path.join(tmp, 'uploads'))
+        subprocess.run([sys.executable, __file__, '--child', '--rows', str(args.rows),
+                        '--users', str(args.users)], env=env, check=True)
+
+
+if __name__ == '__main__':
+    main()
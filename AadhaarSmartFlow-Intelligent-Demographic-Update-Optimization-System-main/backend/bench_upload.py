@@ -0,0 +1,77 @@
+# bench_upload.py - Upload throughput and disk saved by content addressing
+#
+# Uploads --uploads documents drawn from --unique distinct contents (the same
+# proof uploaded by many applicants) through /api/documents/upload against a
+# scratch database and upload folder.
+#
+#   python bench_upload.py [--uploads 500] [--unique 50] [--size-kb 512]
+import argparse
+import io
+import os
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+
+def run(uploads, unique, size_kb):
+    from app import app, db, create_sample_data
+
+    with app.app_context():
+        db.create_all()
+        create_sample_data()
+
+    client = app.test_client()
+    login = client.post('/api/auth/login', json={'aadhaar_id': '123456789012', 'password': 'password123'})
+    headers = {'Authorization': f"Bearer {login.get_json()['token']}"}
+
+    rng = random.Random(42)
+    contents = [rng.randbytes(size_kb * 1024) for _ in range(unique)]
+    picks = [rng.randrange(unique) for _ in range(uploads)]
+
+    rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    start = time.perf_counter()
+    logical = 0
+    for i, pick in enumerate(picks):
+        response = client.post('/api/documents/upload', headers=headers, content_type='multipart/form-data',
+                               data={'file': (io.BytesIO(contents[pick]), f'proof_{i}.pdf')})
+        assert response.status_code == 200, response.get_data()
+        logical += len(contents[pick])
+    elapsed = time.perf_counter() - start
+    rss_after = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    on_disk = 0
+    for dirpath, _, filenames in os.walk(os.path.join(app.config['UPLOAD_FOLDER'], 'objects')):
+        on_disk += sum(os.path.getsize(os.path.join(dirpath, f)) for f in filenames)
+
+    print(f"{uploads} uploads of {size_kb} KiB from {unique} distinct files")
+    print(f"  throughput   {uploads / elapsed:8.1f} uploads/sec ({logical / elapsed / 1024 / 1024:.1f} MiB/s)")
+    print(f"  uploaded     {logical / 1024 / 1024:8.1f} MiB")
+    print(f"  on disk      {on_disk / 1024 / 1024:8.1f} MiB")
+    print(f"  saved        {(logical - on_disk) / 1024 / 1024:8.1f} MiB ({(1 - on_disk / logical) * 100:.1f}%)")
+    print(f"  peak RSS     +{(rss_after - rss_before) / 1024:.1f} MiB during uploads")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--uploads', type=int, default=500)
+    parser.add_argument('--unique', type=int, default=50)
+    parser.add_argument('--size-kb', type=int, default=512)
+    parser.add_argument('--child', action='store_true')
+    args = parser.parse_args()
+
+    if args.child:
+        run(args.uploads, args.unique, args.size_kb)
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        env = dict(os.environ, DATABASE_URL=f"sqlite:///{os.path.join(tmp, 'bench.db')}",
+                   UPLOAD_FOLDER=os.path.join(tmp, 'uploads'))
+        subprocess.run([sys.executable, __file__, '--child', '--uploads', str(args.uploads),
+                        '--unique', str(args.unique), '--size-kb', str(args.size_kb)], env=env, check=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,87 @@
+# bench_validation.py - Document validation throughput by worker count
+#
+# Validates --documents generated files (a mix of multi-page PDFs and JPEG
+# photos) through DocumentValidator with 1, 2, 4, ... workers up to the
+# number of cores, and reports documents/sec for each pool size.
+#
+#   python bench_validation.py [--documents 400] [--max-workers N]
+import argparse
+import io
+import os
+import random
+import tempfile
+import threading
+import time
+
+from validation import DocumentValidator, Image
+
+
+def make_documents(directory, count):
+    rng = random.Random(42)
+    paths = []
+    for i in range(count):
+        path = os.path.join(directory, f'doc_{i}')
+        if Image is not None and i % 2:
+            buffer = io.BytesIO()
+            image = Image.effect_noise((1200, 1600), 64 + rng.randrange(64)).convert('RGB')
+            image.save(buffer, 'JPEG', quality=85)
+            data = buffer.getvalue()
+        else:
+            pages = rng.randint(1, 20)
+            data = b'%PDF-1.4\n' + b''.join(
+                b'%d 0 obj << /Type /Page /Contents ' % n + rng.randbytes(32 * 1024) + b' >> endobj\n'
+                for n in range(pages))
+        with open(path, 'wb') as f:
+            f.write(data)
+        paths.append(path)
+    return paths
+
+
+def run(paths, workers):
+    done = threading.Event()
+    lock = threading.Lock()
+
+    pending = {str(i): path for i, path in enumerate(paths)}
+
+    def on_result(digest, result):
+        with lock:
+            del pending[digest]
+            if not pending:
+                done.set()
+
+    def load_pending(limit, exclude=()):
+        # Stands in for the pending-status query against document_meta
+        with lock:
+            return [(d, p) for d, p in pending.items() if d not in exclude][:limit]
+
+    validator = DocumentValidator(on_result, load_pending=load_pending, max_workers=workers)
+    # Warm the pool so process start-up is not measured
+    validator._pool().submit(int).result()
+    start = time.perf_counter()
+    validator.refill()
+    while not done.wait(0.05):
+        validator.refill()
+    elapsed = time.perf_counter() - start
+    validator.shutdown()
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--documents', type=int, default=400)
+    parser.add_argument('--max-workers', type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = make_documents(tmp, args.documents)
+        print(f"{args.documents} documents, {os.cpu_count()} cores, Pillow {'available' if Image else 'missing'}")
+        workers, baseline = 1, None
+        while workers <= args.max_workers:
+            elapsed = run(paths, workers)
+            baseline = baseline or elapsed
+            print(f"  {workers:3d} workers  {args.documents / elapsed:8.1f} docs/sec  ({baseline / elapsed:.2f}x)")
+            workers *= 2
+
+
+if __name__ == '__main__':
+    main()
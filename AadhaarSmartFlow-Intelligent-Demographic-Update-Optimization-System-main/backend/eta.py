@@ -0,0 +1,124 @@
+# eta.py - Completion estimates from queue position and live throughput
+#
+# Throughput is an exponentially decayed count of officer reviews, kept per
+# officer and per center. On every review the count decays by
+# 2^(-elapsed / half-life) and grows by one. For a steady stream of rate r,
+# it settles at r * half_life / ln 2, so rate() reads it back in reviews per
+# hour. Updates and reads are O(1), and nothing needs a window of past
+# events. The counts are seeded from recent history at startup and re-seeded
+# every RESEED_SECONDS, to pick up reviews done by other workers.
+#
+# A request's ETA is the work ahead of it divided by the rate of whoever
+# will do it. That is its place in its officer's queue over the officer's
+# rate, plus the part of the center's unassigned pool ahead of it over the
+# center's rate. Pool requests use the pool position over the center rate.
+# Positions come from the ReviewScheduler heaps.
+import math
+import threading
+import time
+from datetime import datetime, timedelta
+
+# Long enough to average over a working day, so nights and shift ends do not swing ETAs
+HALF_LIFE_HOURS = 12.0
+RESEED_SECONDS = 900
+# Rates assumed before anything has been seen, in reviews per hour
+PRIOR_OFFICER_RATE = 2.0
+PRIOR_CENTER_RATE = 8.0
+# Decayed reviews needed before the measured rate replaces the prior
+MIN_SAMPLES = 3.0
+# Below this, an idle spell would turn into an ETA of weeks
+MIN_RATE = 0.25
+# Queue positions beyond this are not counted exactly
+MAX_POSITION = 5000
+
+
+class DecayedRate:
+    __slots__ = ('count', 'updated_at')
+
+    def __init__(self):
+        self.count = 0.0
+        self.updated_at = None
+
+    def add(self, at, half_life_seconds):
+        timestamp = at.timestamp()
+        if self.updated_at is not None and timestamp > self.updated_at:
+            self.count *= 2 ** (-(timestamp - self.updated_at) / half_life_seconds)
+            self.updated_at = timestamp
+        elif self.updated_at is None:
+            self.updated_at = timestamp
+        self.count += 1.0
+
+    def per_hour(self, now, half_life_seconds):
+        elapsed = max(0.0, now.timestamp() - self.updated_at)
+        count = self.count * 2 ** (-elapsed / half_life_seconds)
+        return count * math.log(2) / (half_life_seconds / 3600)
+
+
+class EtaEngine:
+    def __init__(self, scheduler, load_completions=None, half_life_hours=HALF_LIFE_HOURS):
+        # load_completions(since) -> rows of (processed_at, center_id, officer_pk)
+        self.scheduler = scheduler
+        self.load_completions = load_completions
+        self.half_life = half_life_hours * 3600
+        self._rates = {}
+        self._lock = threading.Lock()
+        self._seeded_at = None
+
+    def seed(self, completions):
+        rates = {}
+        for processed_at, center_id, officer_pk in sorted(
+                (row for row in completions if row[0] is not None), key=lambda row: row[0]):
+            for key in (('center', center_id), ('officer', officer_pk)):
+                if key[1] is not None:
+                    rates.setdefault(key, DecayedRate()).add(processed_at, self.half_life)
+        with self._lock:
+            self._rates = rates
+            self._seeded_at = time.monotonic()
+
+    def _ensure_seeded(self):
+        if self.load_completions is None:
+            return
+        if self._seeded_at is None or time.monotonic() - self._seeded_at >= RESEED_SECONDS:
+            # Older reviews have decayed below 1/16 of a review
+            self.seed(self.load_completions(datetime.utcnow() - timedelta(seconds=4 * self.half_life)))
+
+    def record_completion(self, center_id, officer_pk, at=None):
+        at = at or datetime.utcnow()
+        with self._lock:
+            for key in (('center', center_id), ('officer', officer_pk)):
+                if key[1] is not None:
+                    self._rates.setdefault(key, DecayedRate()).add(at, self.half_life)
+
+    def rate(self, kind, key, now=None):
+        stats = self._rates.get((kind, key))
+        if stats is None or stats.count < MIN_SAMPLES:
+            return PRIOR_OFFICER_RATE if kind == 'officer' else PRIOR_CENTER_RATE
+        return max(MIN_RATE, stats.per_hour(now or datetime.utcnow(), self.half_life))
+
+    def estimate(self, request_pk, now=None):
+        # {'hours', 'completion', 'queue_position'} for a queued request, else None
+        self._ensure_seeded()
+        now = now or datetime.utcnow()
+        position = self.scheduler.position(request_pk, MAX_POSITION)
+        if position is None:
+            return None
+        center_id, officer_pk, ahead, pool_ahead = position
+        center_rate = self.rate('center', center_id, now)
+        if officer_pk is None:
+            hours = (ahead + 1) / center_rate
+        else:
+            hours = (ahead + 1) / self.rate('officer', officer_pk, now) + pool_ahead / center_rate
+        return {'hours': hours, 'completion': now + timedelta(hours=hours), 'queue_position': ahead + pool_ahead + 1}
+
+    def stats(self):
+        with self._lock:
+            tracked = len(self._rates)
+        return {'tracked': tracked, 'half_life_hours': self.half_life / 3600}
+
+
+def format_eta(hours):
+    if hours < 1:
+        return 'Under 1 hour'
+    if hours < 36:
+        return f"About {round(hours)} hour{'s' if round(hours) != 1 else ''}"
+    return f'About {round(hours / 24)} days'
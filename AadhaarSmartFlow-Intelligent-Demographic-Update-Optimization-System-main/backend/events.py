@@ -0,0 +1,150 @@
+# events.py - In-process pub/sub for request state transitions
+#
+# EventHub fans messages out to subscribers of a channel ('user:<aadhaar_id>',
+# 'officer:<officer_id>'). Each subscriber has a bounded queue, so a slow
+# client cannot grow memory. When its queue is full, the oldest message is
+# dropped and the stream sends a 'resync' event telling the client to re-fetch.
+#
+# Publishing goes through a broker. LocalBroker delivers within this process.
+# RedisBroker (REDIS_URL set and redis installed) relays through Redis pub/sub
+# so every worker's hub receives every event.
+import json
+import logging
+import os
+import queue
+import threading
+
+logger = logging.getLogger(__name__)
+
+SUBSCRIBER_QUEUE_SIZE = 100
+HEARTBEAT_SECONDS = 15
+
+
+class Subscriber:
+    def __init__(self, channels, maxsize=SUBSCRIBER_QUEUE_SIZE):
+        self.channels = channels
+        self.queue = queue.Queue(maxsize=maxsize)
+        self.overflowed = False
+
+    def deliver(self, message):
+        try:
+            self.queue.put_nowait(message)
+        except queue.Full:
+            # Backpressure: keep the newest events and tell the client it missed some
+            self.overflowed = True
+            try:
+                self.queue.get_nowait()
+            except queue.Empty:
+                pass
+            try:
+                self.queue.put_nowait(message)
+            except queue.Full:
+                pass
+
+
+class EventHub:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._channels = {}
+        self.published = 0
+        self.dropped = 0
+
+    def subscribe(self, channels):
+        subscriber = Subscriber(tuple(channels))
+        with self._lock:
+            for channel in subscriber.channels:
+                self._channels.setdefault(channel, set()).add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber):
+        with self._lock:
+            for channel in subscriber.channels:
+                subscribers = self._channels.get(channel)
+                if subscribers:
+                    subscribers.discard(subscriber)
+                    if not subscribers:
+                        del self._channels[channel]
+
+    def dispatch(self, channel, message):
+        with self._lock:
+            subscribers = list(self._channels.get(channel, ()))
+        self.published += 1
+        for subscriber in subscribers:
+            was_overflowed = subscriber.overflowed
+            subscriber.deliver(message)
+            if subscriber.overflowed and not was_overflowed:
+                self.dropped += 1
+
+    def stats(self):
+        with self._lock:
+            return {
+                'channels': len(self._channels),
+                'subscribers': len({s for subs in self._channels.values() for s in subs}),
+                'published': self.published,
+                'dropped': self.dropped
+            }
+
+
+class LocalBroker:
+    def __init__(self, hub):
+        self.hub = hub
+
+    def publish(self, channel, message):
+        self.hub.dispatch(channel, message)
+
+
+class RedisBroker:
+    PATTERN = 'smartflow:events:*'
+
+    def __init__(self, hub, url):
+        import redis
+
+        self.hub = hub
+        self.client = redis.Redis.from_url(url)
+        self._pubsub = self.client.pubsub(ignore_subscribe_messages=True)
+        self._pubsub.psubscribe(**{self.PATTERN: self._on_message})
+        self._thread = self._pubsub.run_in_thread(sleep_time=1.0, daemon=True)
+
+    def _on_message(self, raw):
+        channel = raw['channel'].decode('utf-8').split(':', 2)[2]
+        self.hub.dispatch(channel, json.loads(raw['data']))
+
+    def publish(self, channel, message):
+        self.client.publish(f'smartflow:events:{channel}', json.dumps(message))
+
+
+def create_broker(hub):
+    url = os.getenv('REDIS_URL')
+    if url:
+        try:
+            return RedisBroker(hub, url)
+        except Exception as e:
+            logger.error(f"Redis broker unavailable, using local broker: {e}")
+    return LocalBroker(hub)
+
+
+def format_sse(data, event=None):
+    lines = []
+    if event:
+        lines.append(f'event: {event}')
+    lines.append(f'data: {json.dumps(data)}')
+    return '\n'.join(lines) + '\n\n'
+
+
+def sse_stream(hub, subscriber, heartbeat=HEARTBEAT_SECONDS):
+    try:
+        yield 'retry: 5000\n\n'
+        while True:
+            try:
+                message = subscriber.queue.get(timeout=heartbeat)
+            except queue.Empty:
+                yield ': heartbeat\n\n'
+                continue
+
+            if subscriber.overflowed:
+                subscriber.overflowed = False
+                yield format_sse({'reason': 'backpressure'}, event='resync')
+            yield format_sse(message, event=message.get('event', 'message'))
+    finally:
+        # Runs when the client disconnects and the server closes the generator
+        hub.unsubscribe(subscriber)
@@ -0,0 +1,355 @@
+# export.py - Background bulk export of requests and audit logs to CSV or Parquet
+#
+# An export job reads a dataset table by table (archived rows first, then
+# the hot table) in primary-key keyset chunks of EXPORT_CHUNK_ROWS. Each
+# chunk is one short read, so no transaction stays open and writers are
+# never held up, and the job holds one chunk in memory however large the
+# export. Filters (a submitted/timestamp range, status or action, center)
+# are applied in the chunk query, and aadhaar numbers are masked to their
+# last four digits before anything reaches the file.
+#
+# After every durable write the job records its offset (table index, last
+# id) in export_jobs. A job interrupted by a restart is resumed from there
+# by resume(). CSV files are truncated back to the last checkpointed byte
+# first. Parquet output goes to part files of PART_ROWS rows, each closed
+# before its offset is recorded, and the parts are merged row group by row
+# group into one file at the end. Parquet needs pyarrow; CSV works without.
+#
+# A process only works on a job it has claimed. The claim is one guarded
+# UPDATE that sets status 'running', this exporter as lease_owner and
+# lease_until EXPORT_LEASE_SECONDS ahead. It succeeds only for a queued
+# job or one whose lease has run out. The lease is renewed before every
+# chunk is written, and every job update is guarded by the owner. A process
+# that lost its lease stops before touching the file again. An idle worker
+# re-queues jobs whose lease expired with the process that held it.
+import csv
+import logging
+import os
+import queue
+import threading
+import uuid
+from datetime import datetime, timedelta
+
+from sqlalchemy import and_, or_
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = pq = None
+
+logger = logging.getLogger(__name__)
+
+EXPORT_CHUNK_ROWS = 5000
+PART_ROWS = 100000
+FORMATS = ('csv', 'parquet')
+OPEN_STATUSES = ('queued', 'running')
+EXPORT_LEASE_SECONDS = 300
+
+
+class LeaseLost(Exception):
+    # Another process claimed the job after this one's lease ran out
+    pass
+
+
+def mask_aadhaar(value):
+    # Only the last four digits are kept, as on masked Aadhaar letters
+    if not value:
+        return value
+    value = str(value)
+    return 'X' * max(0, len(value) - 4) + value[-4:]
+
+
+class ExportSource:
+    # One table of a dataset
+    def __init__(self, model, time_column, filter_columns, row_values):
+        # filter_columns: {filter name: column}; row_values(row) -> {dataset column: value}
+        self.model = model
+        self.time_column = time_column
+        self.filter_columns = filter_columns
+        self.row_values = row_values
+
+
+class ExportDataset:
+    def __init__(self, columns, sources):
+        # columns: [(name, kind)] with kind one of int, float, bool, str, datetime
+        self.columns = columns
+        self.sources = sources
+
+    @property
+    def filters(self):
+        return {name for source in self.sources for name in source.filter_columns}
+
+    def arrow_schema(self):
+        types = {'int': pa.int64(), 'float': pa.float64(), 'bool': pa.bool_(), 'str': pa.string(),
+                 'datetime': pa.timestamp('us')}
+        return pa.schema([(name, types[kind]) for name, kind in self.columns])
+
+
+class CsvOutput:
+    def __init__(self, path, dataset, resume_at):
+        exists = os.path.exists(path)
+        self.file = open(path, 'r+' if exists else 'w', newline='', encoding='utf-8')
+        # Anything past the checkpoint was written after the last recorded offset
+        self.file.truncate(resume_at if exists else 0)
+        self.file.seek(0, os.SEEK_END)
+        self.names = [name for name, _ in dataset.columns]
+        self.writer = csv.writer(self.file)
+        if self.file.tell() == 0:
+            self.writer.writerow(self.names)
+
+    def write(self, rows):
+        # True once the rows are on disk and the offset can be recorded
+        for row in rows:
+            self.writer.writerow([row[name].isoformat() if isinstance(row[name], datetime) else row[name]
+                                  for name in self.names])
+        self.file.flush()
+        os.fsync(self.file.fileno())
+        return True
+
+    def end_source(self):
+        pass
+
+    def checkpoint(self):
+        return self.file.tell()
+
+    def finish(self, path):
+        self.file.close()
+        return path
+
+    def close(self):
+        self.file.close()
+
+
+class ParquetOutput:
+    def __init__(self, path, dataset, resume_at):
+        self.base = path
+        self.schema = dataset.arrow_schema()
+        self.names = [name for name, _ in dataset.columns]
+        self.parts = resume_at
+        # Parts after the checkpoint were never recorded
+        part = self.parts
+        while os.path.exists(self._part_path(part)):
+            os.remove(self._part_path(part))
+            part += 1
+        self.writer = None
+        self.part_rows = 0
+
+    def _part_path(self, index):
+        return f'{self.base}.part{index:05d}'
+
+    def write(self, rows):
+        if self.writer is None:
+            self.writer = pq.ParquetWriter(self._part_path(self.parts), self.schema)
+        columns = {name: [row[name] for row in rows] for name in self.names}
+        self.writer.write_table(pa.table(columns, schema=self.schema))
+        self.part_rows += len(rows)
+        if self.part_rows < PART_ROWS:
+            return False
+        self.end_source()
+        return True
+
+    def end_source(self):
+        if self.writer is not None:
+            self.writer.close()
+            self.writer = None
+            self.parts += 1
+            self.part_rows = 0
+
+    def checkpoint(self):
+        return self.parts
+
+    def finish(self, path):
+        # Merges the parts into one file, one row group at a time
+        self.end_source()
+        with pq.ParquetWriter(path, self.schema) as writer:
+            for index in range(self.parts):
+                part = pq.ParquetFile(self._part_path(index))
+                for group in range(part.num_row_groups):
+                    writer.write_table(part.read_row_group(group))
+        for index in range(self.parts):
+            os.remove(self._part_path(index))
+        return path
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+            self.writer = None
+
+
+class Exporter:
+    def __init__(self, app, db, job_model, datasets, directory, chunk_rows=EXPORT_CHUNK_ROWS,
+                 lease_seconds=EXPORT_LEASE_SECONDS):
+        self.app = app
+        self.db = db
+        self.Job = job_model
+        self.datasets = datasets
+        self.directory = directory
+        self.chunk_rows = chunk_rows
+        self.lease = timedelta(seconds=lease_seconds)
+        self.owner = uuid.uuid4().hex
+        os.makedirs(directory, exist_ok=True)
+        self._queue = queue.Queue()
+        self._thread = None
+        self._start_lock = threading.Lock()
+        self.completed = 0
+        self.failed = 0
+
+    def formats(self):
+        return FORMATS if pa is not None else ('csv',)
+
+    def create(self, dataset, fmt, filters, requested_by):
+        # Queues a job and returns it; ValueError for an unknown dataset, format or filter
+        if dataset not in self.datasets:
+            raise ValueError(f"dataset must be one of {', '.join(self.datasets)}")
+        if fmt not in self.formats():
+            raise ValueError(f"format must be one of {', '.join(self.formats())}")
+        allowed = self.datasets[dataset].filters | {'start', 'end'}
+        unknown = set(filters) - allowed
+        if unknown:
+            raise ValueError(f"unknown filters: {', '.join(sorted(unknown))}")
+        for name in ('start', 'end'):
+            if filters.get(name):
+                filters[name] = datetime.fromisoformat(filters[name]).isoformat()
+        job = self.Job(id=uuid.uuid4().hex, dataset=dataset, format=fmt, filters=filters, status='queued',
+                       requested_by=requested_by, created_at=datetime.utcnow(), updated_at=datetime.utcnow())
+        self.db.session.add(job)
+        self.db.session.commit()
+        self._queue.put(job.id)
+        self._ensure_worker()
+        return job
+
+    def resume(self):
+        # Queues every unfinished job; call once, from the serving process. Jobs another
+        # process still holds a lease on are skipped by the claim and retried once it expires.
+        with self.app.app_context():
+            job_ids = [job_id for job_id, in self.db.session.query(self.Job.id).filter(
+                self.Job.status.in_(OPEN_STATUSES)).order_by(self.Job.created_at)]
+        for job_id in job_ids:
+            self._queue.put(job_id)
+        self._ensure_worker()
+        return len(job_ids)
+
+    def _claimable(self, now):
+        Job = self.Job
+        return or_(Job.status == 'queued',
+                   and_(Job.status == 'running', or_(Job.lease_until.is_(None), Job.lease_until < now)))
+
+    def _claim(self, job_id):
+        # True if this exporter now holds the job's lease
+        now = datetime.utcnow()
+        claimed = self.db.session.query(self.Job).filter(self.Job.id == job_id, self._claimable(now)).update(
+            {'status': 'running', 'lease_owner': self.owner, 'lease_until': now + self.lease, 'updated_at': now},
+            synchronize_session=False)
+        self.db.session.commit()
+        return claimed == 1
+
+    def _requeue_expired(self):
+        with self.app.app_context():
+            job_ids = [job_id for job_id, in self.db.session.query(self.Job.id).filter(
+                self.Job.status == 'running', self._claimable(datetime.utcnow()))]
+        for job_id in job_ids:
+            self._queue.put(job_id)
+
+    def path(self, job):
+        return os.path.join(self.directory, f'{job.id}.{job.format}')
+
+    def _ensure_worker(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._start_lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='exporter', daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            try:
+                job_id = self._queue.get(timeout=self.lease.total_seconds())
+            except queue.Empty:
+                try:
+                    self._requeue_expired()
+                except Exception as e:
+                    logger.error(f"Export requeue failed: {e}")
+                continue
+            try:
+                self.run_job(job_id)
+            except Exception as e:
+                logger.error(f"Export {job_id} failed: {e}")
+
+    def run_job(self, job_id):
+        with self.app.app_context():
+            session = self.db.session
+            if not self._claim(job_id):
+                return
+            job = session.get(self.Job, job_id)
+            dataset_name, fmt, filters, path = job.dataset, job.format, dict(job.filters or {}), self.path(job)
+            source_index, last_id, rows_written = job.source_index or 0, job.last_id or 0, job.rows_written or 0
+            dataset = self.datasets[dataset_name]
+            output = (CsvOutput if fmt == 'csv' else ParquetOutput)(path + '.partial', dataset, job.checkpoint or 0)
+            try:
+                while source_index < len(dataset.sources):
+                    rows = self._chunk(dataset.sources[source_index], filters, last_id)
+                    # Renewed before writing, so a process that lost the job never writes to its file again
+                    self._update(job_id)
+                    durable = False
+                    if rows:
+                        last_id = rows[-1][0]
+                        rows_written += len(rows)
+                        durable = output.write([values for _, values in rows])
+                    if len(rows) < self.chunk_rows:
+                        # The next table restarts its ids, so its offset must start from a durable point
+                        output.end_source()
+                        source_index, last_id, durable = source_index + 1, 0, True
+                    if durable:
+                        self._update(job_id, source_index=source_index, last_id=last_id, rows_written=rows_written,
+                                     checkpoint=output.checkpoint())
+                os.replace(output.finish(path + '.partial'), path)
+            except LeaseLost:
+                output.close()
+                session.rollback()
+                logger.warning(f"Export {job_id} was claimed by another process")
+                return
+            except Exception as e:
+                output.close()
+                session.rollback()
+                try:
+                    self._update(job_id, status='failed', error=str(e), lease_until=None)
+                except LeaseLost:
+                    pass
+                self.failed += 1
+                raise
+            self._update(job_id, status='done', rows_written=rows_written, finished_at=datetime.utcnow(),
+                         lease_until=None)
+            self.completed += 1
+            logger.info(f"Export {job_id} wrote {rows_written} {dataset_name} rows as {fmt}")
+
+    def _update(self, job_id, **values):
+        # Renews the lease along with the update; LeaseLost if another process holds the job now
+        now = datetime.utcnow()
+        Job = self.Job
+        updated = self.db.session.query(Job).filter(Job.id == job_id, Job.lease_owner == self.owner).update(
+            dict({'lease_until': now + self.lease}, **values, updated_at=now), synchronize_session=False)
+        self.db.session.commit()
+        if not updated:
+            raise LeaseLost(job_id)
+
+    def _chunk(self, source, filters, last_id):
+        # [(id, values)] for the next chunk; the read transaction ends before the rows are written out
+        model, session = source.model, self.db.session
+        query = session.query(model).filter(model.id > last_id)
+        if filters.get('start'):
+            query = query.filter(source.time_column >= datetime.fromisoformat(filters['start']))
+        if filters.get('end'):
+            query = query.filter(source.time_column < datetime.fromisoformat(filters['end']))
+        for name, column in source.filter_columns.items():
+            if filters.get(name) is not None:
+                query = query.filter(column == filters[name])
+        rows = [(row.id, source.row_values(row)) for row in query.order_by(model.id).limit(self.chunk_rows)]
+        session.rollback()
+        session.expunge_all()
+        return rows
+
+    def stats(self):
+        return {'queued': self._queue.qsize(), 'completed': self.completed, 'failed': self.failed,
+                'formats': list(self.formats())}
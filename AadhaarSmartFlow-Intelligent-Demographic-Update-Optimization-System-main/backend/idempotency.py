@@ -0,0 +1,158 @@
+# idempotency.py - Idempotency-Key support for non-idempotent POSTs
+#
+# A client that retries a POST sends the same Idempotency-Key header. The
+# first request claims (scope, key) with a placeholder row before the view
+# runs; the response is stored on that row once the view returns. A retry
+# with the same key gets the stored response back without the view running
+# again. A retry that arrives while the first is still running gets 409. The
+# same key with a different body gets 422. Rows expire after a TTL and are
+# purged in chunks.
+#
+# The claim is a unique-key insert (ON CONFLICT DO NOTHING on SQLite and
+# Postgres alike), so concurrent retries are safe across workers. 5xx and
+# 429 responses are not stored; the claim is released so the client can
+# retry for real.
+import hashlib
+import logging
+import time
+from datetime import datetime, timedelta
+from functools import wraps
+
+from flask import jsonify, make_response, request
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+logger = logging.getLogger(__name__)
+
+HEADER = 'Idempotency-Key'
+MAX_KEY_LENGTH = 255
+KEY_TTL_HOURS = 24
+# A claim with no response after this long belongs to a request that died
+IN_PROGRESS_TIMEOUT_SECONDS = 60
+PURGE_INTERVAL_SECONDS = 600
+PURGE_CHUNK_SIZE = 5000
+# The row can vanish between a failed insert and the read (purged or released); retry this often
+CLAIM_ATTEMPTS = 3
+
+
+class IdempotencyStore:
+    def __init__(self, db, model, ttl_hours=KEY_TTL_HOURS):
+        self.db = db
+        self.Key = model
+        self.ttl = timedelta(hours=ttl_hours)
+        self._last_purge = time.monotonic()
+        self.replayed = 0
+        self.conflicts = 0
+
+    def _claim(self, scope, key, fingerprint):
+        # True when this request now owns the key, otherwise the existing row
+        insert = postgresql_insert if self.db.engine.dialect.name == 'postgresql' else sqlite_insert
+        for _ in range(CLAIM_ATTEMPTS):
+            now = datetime.utcnow()
+            stmt = insert(self.Key.__table__).values(scope=scope, key=key, fingerprint=fingerprint, created_at=now)
+            result = self.db.session.execute(stmt.on_conflict_do_nothing(index_elements=['scope', 'key']))
+            self.db.session.commit()
+            if result.rowcount:
+                return True
+            row = self.Key.query.filter_by(scope=scope, key=key).first()
+            claimed = self._take_over(row, scope, key, fingerprint, now) if row is not None else None
+            if claimed is not None:
+                return claimed
+        raise RuntimeError(f"Could not claim idempotency key {key!r} after {CLAIM_ATTEMPTS} attempts")
+
+    def _take_over(self, row, scope, key, fingerprint, now):
+        # True, the row to replay, or None when it was deleted meanwhile
+        expired = row.created_at < now - self.ttl
+        abandoned = row.status_code is None and row.created_at < now - timedelta(seconds=IN_PROGRESS_TIMEOUT_SECONDS)
+        if expired or abandoned:
+            # Take the row over; the created_at check makes this a compare-and-swap
+            taken = self.Key.query.filter_by(id=row.id, created_at=row.created_at).update(
+                {'fingerprint': fingerprint, 'created_at': now, 'status_code': None, 'response': None},
+                synchronize_session=False)
+            self.db.session.commit()
+            if taken:
+                return True
+            return self.Key.query.filter_by(scope=scope, key=key).first()
+        return row
+
+    def _complete(self, scope, key, response):
+        self.Key.query.filter_by(scope=scope, key=key).update(
+            {'status_code': response.status_code, 'response': response.get_data(as_text=True)},
+            synchronize_session=False)
+        self.db.session.commit()
+
+    def _release(self, scope, key):
+        self.Key.query.filter_by(scope=scope, key=key).delete(synchronize_session=False)
+        self.db.session.commit()
+
+    def purge(self):
+        self._last_purge = time.monotonic()
+        cutoff = datetime.utcnow() - self.ttl
+        removed = 0
+        while True:
+            ids = [row.id for row in self.db.session.query(self.Key.id).filter(
+                self.Key.created_at < cutoff).limit(PURGE_CHUNK_SIZE)]
+            if not ids:
+                break
+            self.db.session.query(self.Key).filter(self.Key.id.in_(ids)).delete(synchronize_session=False)
+            self.db.session.commit()
+            removed += len(ids)
+        if removed:
+            logger.info(f"Purged {removed} expired idempotency keys")
+        return removed
+
+    def idempotent(self, scope_func):
+        # scope_func() names the caller, so two users can use the same key
+        def decorator(view):
+            @wraps(view)
+            def wrapper(*args, **kwargs):
+                key = request.headers.get(HEADER)
+                if not key:
+                    return view(*args, **kwargs)
+                if len(key) > MAX_KEY_LENGTH:
+                    return jsonify({'success': False, 'error': f'{HEADER} too long'}), 400
+
+                if time.monotonic() - self._last_purge >= PURGE_INTERVAL_SECONDS:
+                    try:
+                        self.purge()
+                    except Exception as e:
+                        self.db.session.rollback()
+                        logger.error(f"Idempotency purge error: {e}")
+
+                scope = str(scope_func())
+                fingerprint = hashlib.sha256(request.get_data()).hexdigest()
+                claimed = self._claim(scope, key, fingerprint)
+                if claimed is not True:
+                    return self._replay(claimed, fingerprint)
+
+                try:
+                    response = make_response(view(*args, **kwargs))
+                except Exception:
+                    self.db.session.rollback()
+                    self._release(scope, key)
+                    raise
+                if response.status_code >= 500 or response.status_code == 429:
+                    self._release(scope, key)
+                else:
+                    self._complete(scope, key, response)
+                return response
+            return wrapper
+        return decorator
+
+    def _replay(self, row, fingerprint):
+        if row.fingerprint != fingerprint:
+            self.conflicts += 1
+            return jsonify({'success': False, 'error': f'{HEADER} was already used with a different request'}), 422
+        if row.status_code is None:
+            self.conflicts += 1
+            response = jsonify({'success': False, 'error': 'A request with this key is still being processed'})
+            response.headers['Retry-After'] = '1'
+            return response, 409
+        self.replayed += 1
+        response = make_response(row.response, row.status_code)
+        response.mimetype = 'application/json'
+        response.headers['Idempotent-Replayed'] = 'true'
+        return response
+
+    def stats(self):
+        return {'replayed': self.replayed, 'conflicts': self.conflicts}
@@ -0,0 +1,83 @@
+# identity.py - Cached principals for JWT-protected endpoints
+#
+# A verified JWT names its subject by (user_type, id): ('user', aadhaar_id) or
+# ('officer', officer_id). IdentityCache keeps a read-only snapshot of that
+# row, so handlers get the caller without a query. Snapshots are built at
+# login or on the first miss, evicted LRU, and expire after a TTL. Write paths
+# that change a cached row call invalidate(). Each process keeps its own
+# cache, so the TTL bounds how stale another worker's copy can be.
+import threading
+import time
+from collections import OrderedDict
+
+DEFAULT_MAX_ENTRIES = 50000
+DEFAULT_TTL_SECONDS = 300
+
+
+class Principal:
+    # Column values of the row (minus secrets) plus its to_dict() payload
+    def __init__(self, user_type, identity, attributes, payload):
+        self.__dict__.update(attributes)
+        self.user_type = user_type
+        self.identity = identity
+        self._payload = payload
+
+    def to_dict(self):
+        return dict(self._payload)
+
+
+def snapshot(user_type, identity, row, exclude=('password_hash',)):
+    attributes = {column.key: getattr(row, column.key) for column in row.__table__.columns
+                  if column.key not in exclude}
+    return Principal(user_type, identity, attributes, row.to_dict())
+
+
+class IdentityCache:
+    def __init__(self, loader, max_entries=DEFAULT_MAX_ENTRIES, ttl=DEFAULT_TTL_SECONDS):
+        # loader(user_type, identity) -> Principal or None
+        self.loader = loader
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, user_type, identity):
+        key = (user_type, identity)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > now:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+
+        principal = self.loader(user_type, identity)
+        if principal is not None:
+            self.put(principal)
+        return principal
+
+    def put(self, principal):
+        key = (principal.user_type, principal.identity)
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, principal)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, *keys):
+        with self._lock:
+            for key in keys:
+                self._entries.pop(key, None)
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / total, 3) if total else 0.0
+            }
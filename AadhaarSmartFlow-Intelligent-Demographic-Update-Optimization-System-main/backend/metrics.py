@@ -0,0 +1,394 @@
+# metrics.py - Streaming officer and center performance scores
+#
+# Every officer review feeds three online statistics, kept per officer, per
+# center and overall:
+#
+#   turnaround  Welford mean/variance of submitted_at -> completed_at hours
+#               (ProcessingCenter.avg_processing_time)
+#   on_time     decayed share of reviews finished within the update type's
+#               SLA (ProcessingCenter.efficiency_score, dashboard efficiency)
+#   agreement   decayed share of decisions consistent with the risk model:
+#               approvals of requests not rated High and rejections of
+#               requests not rated Low. This is agreement with the heuristic
+#               risk band, not correctness, since there is no ground truth;
+#               the API reports it as risk_agreement. It is also written to
+#               the older Officer.accuracy_score column.
+#
+# All three merge exactly: Welford states by Chan's formula, decayed counts
+# by decaying both to the same instant. Each worker keeps a pending delta
+# per subject and a snapshot of the stored totals. Every FLUSH_INTERVAL a
+# background thread merges the deltas into metric_states in one transaction,
+# writes the derived scores onto officers/processing_centers, and refreshes
+# the snapshot. Reads combine snapshot and delta in memory and never query.
+# recompute() rebuilds every state from update_requests, and from
+# archived_requests when given, in keyset chunks.
+#
+# A recompute can run while workers are serving. Their pending deltas
+# describe reviews the rebuild has already counted, so recompute bumps an
+# epoch kept in metric_states under EPOCH_KEY, in the same transaction as the
+# new states. A flush that finds a different epoch from the one its deltas
+# were recorded under drops them and reloads its snapshot. A review recorded
+# after the rebuild read its row but before the worker's next flush is lost
+# until the next recompute; that beats counting every recent review twice.
+import logging
+import threading
+import time
+from datetime import datetime
+
+from scheduler import SLA_HOURS, DEFAULT_SLA_HOURS
+
+logger = logging.getLogger(__name__)
+
+FLUSH_INTERVAL_SECONDS = 30
+DECAY_HALF_LIFE_DAYS = 30
+RECOMPUTE_CHUNK_SIZE = 5000
+# Risk bands as shown to officers: Low <= 0.4 < Medium <= 0.7 < High
+LOW_RISK = 0.4
+HIGH_RISK = 0.7
+OVERALL = 'overall'
+EPOCH_KEY = 'epoch'
+
+
+class RunningStats:
+    # Welford's online mean and variance
+    __slots__ = ('n', 'mean', 'm2')
+
+    def __init__(self, n=0, mean=0.0, m2=0.0):
+        self.n, self.mean, self.m2 = n, mean, m2
+
+    def add(self, value):
+        self.n += 1
+        delta = value - self.mean
+        self.mean += delta / self.n
+        self.m2 += delta * (value - self.mean)
+
+    def merge(self, other):
+        if not other.n:
+            return
+        n = self.n + other.n
+        delta = other.mean - self.mean
+        self.mean += delta * other.n / n
+        self.m2 += other.m2 + delta * delta * self.n * other.n / n
+        self.n = n
+
+    def stddev(self):
+        return (self.m2 / (self.n - 1)) ** 0.5 if self.n > 1 else 0.0
+
+
+class DecayedRatio:
+    # hits / total with both counts halving every half-life
+    __slots__ = ('hits', 'total', 'updated_at')
+
+    def __init__(self, hits=0.0, total=0.0, updated_at=None):
+        self.hits, self.total, self.updated_at = hits, total, updated_at
+
+    def _decay_to(self, timestamp, half_life):
+        if self.updated_at is not None and timestamp > self.updated_at:
+            factor = 2 ** (-(timestamp - self.updated_at) / half_life)
+            self.hits *= factor
+            self.total *= factor
+        if self.updated_at is None or timestamp > self.updated_at:
+            self.updated_at = timestamp
+
+    def add(self, hit, timestamp, half_life):
+        # An event older than the last one counts at its decayed weight
+        weight = 2 ** (-(self.updated_at - timestamp) / half_life) \
+            if self.updated_at is not None and timestamp < self.updated_at else 1.0
+        self._decay_to(timestamp, half_life)
+        self.hits += weight if hit else 0.0
+        self.total += weight
+
+    def merge(self, other, half_life):
+        if other.updated_at is None:
+            return
+        other = DecayedRatio(other.hits, other.total, other.updated_at)
+        latest = max(other.updated_at, self.updated_at or other.updated_at)
+        self._decay_to(latest, half_life)
+        other._decay_to(latest, half_life)
+        self.hits += other.hits
+        self.total += other.total
+
+    def ratio(self):
+        # Decay cancels out of the ratio, so no clock is needed to read it
+        return self.hits / self.total if self.total else None
+
+
+class SubjectMetrics:
+    __slots__ = ('turnaround', 'on_time', 'agreement')
+
+    def __init__(self):
+        self.turnaround = RunningStats()
+        self.on_time = DecayedRatio()
+        self.agreement = DecayedRatio()
+
+    def add(self, hours, on_time, agrees, timestamp, half_life):
+        self.turnaround.add(hours)
+        self.on_time.add(on_time, timestamp, half_life)
+        self.agreement.add(agrees, timestamp, half_life)
+
+    def merge(self, other, half_life):
+        self.turnaround.merge(other.turnaround)
+        self.on_time.merge(other.on_time, half_life)
+        self.agreement.merge(other.agreement, half_life)
+
+    def copy(self, half_life):
+        copied = SubjectMetrics()
+        copied.merge(self, half_life)
+        return copied
+
+    def to_dict(self):
+        return {'n': self.turnaround.n, 'mean': self.turnaround.mean, 'm2': self.turnaround.m2,
+                'on_time': [self.on_time.hits, self.on_time.total, self.on_time.updated_at],
+                'agreement': [self.agreement.hits, self.agreement.total, self.agreement.updated_at]}
+
+    @classmethod
+    def from_dict(cls, data):
+        metrics = cls()
+        metrics.turnaround = RunningStats(data['n'], data['mean'], data['m2'])
+        metrics.on_time = DecayedRatio(*data['on_time'])
+        metrics.agreement = DecayedRatio(*data['agreement'])
+        return metrics
+
+
+def subject_keys(center_pk, officer_pk):
+    keys = [OVERALL]
+    if center_pk is not None:
+        keys.append(f'center:{center_pk}')
+    if officer_pk is not None:
+        keys.append(f'officer:{officer_pk}')
+    return keys
+
+
+def score(ratio):
+    return round(ratio * 100, 1) if ratio is not None else None
+
+
+class MetricsEngine:
+    def __init__(self, app, db, state_model, officer_model, center_model, request_model, archive_model=None,
+                 half_life_days=DECAY_HALF_LIFE_DAYS):
+        self.app = app
+        self.db = db
+        self.State = state_model
+        self.Officer = officer_model
+        self.Center = center_model
+        self.Request = request_model
+        self.Archive = archive_model
+        self.half_life = half_life_days * 86400
+        self._snapshot = {}
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._start_lock = threading.Lock()
+        self._thread = None
+        self.loaded = False
+        self.epoch = 0
+        self.flushes = 0
+        self.dropped = 0
+
+    def observe(self, submitted_at, completed_at, update_type, risk_score, decision):
+        # (turnaround hours, within SLA, agrees with the risk model) for one review
+        hours = max(0.0, (completed_at - submitted_at).total_seconds() / 3600) if submitted_at else 0.0
+        on_time = hours <= SLA_HOURS.get(update_type, DEFAULT_SLA_HOURS)
+        risk = risk_score or 0.0
+        agrees = risk <= HIGH_RISK if decision == 'approved' else risk > LOW_RISK
+        return hours, on_time, agrees
+
+    def record_review(self, update_request, officer_pk):
+        if not self.loaded:
+            # Deltas belong to the epoch they are recorded under, so it must be known first
+            self.load()
+        hours, on_time, agrees = self.observe(
+            update_request.submitted_at, update_request.completed_at or datetime.utcnow(),
+            update_request.update_type, update_request.risk_score, update_request.status)
+        timestamp = (update_request.completed_at or datetime.utcnow()).timestamp()
+        with self._lock:
+            for key in subject_keys(update_request.processing_center_id, officer_pk):
+                self._pending.setdefault(key, SubjectMetrics()).add(hours, on_time, agrees, timestamp, self.half_life)
+        self._ensure_worker()
+
+    def _current(self, key):
+        if not self.loaded:
+            self.load()
+        with self._lock:
+            stored, pending = self._snapshot.get(key), self._pending.get(key)
+            if pending is None:
+                return stored
+            merged = stored.copy(self.half_life) if stored else SubjectMetrics()
+            merged.merge(pending, self.half_life)
+            return merged
+
+    def officer(self, officer_pk):
+        metrics = self._current(f'officer:{officer_pk}')
+        if metrics is None:
+            return {'reviews': 0, 'risk_agreement': None, 'efficiency': None}
+        return {'reviews': metrics.turnaround.n, 'risk_agreement': score(metrics.agreement.ratio()),
+                'efficiency': score(metrics.on_time.ratio())}
+
+    def center(self, center_pk):
+        return self._summary(f'center:{center_pk}')
+
+    def overall(self):
+        return self._summary(OVERALL)
+
+    def _summary(self, key):
+        metrics = self._current(key)
+        if metrics is None:
+            return {'reviews': 0, 'efficiency_score': None, 'avg_processing_time': None,
+                    'processing_time_stddev': None}
+        return {'reviews': metrics.turnaround.n, 'efficiency_score': score(metrics.on_time.ratio()),
+                'avg_processing_time': round(metrics.turnaround.mean, 2),
+                'processing_time_stddev': round(metrics.turnaround.stddev(), 2)}
+
+    def load(self):
+        epoch, snapshot = 0, {}
+        with self.app.app_context():
+            for row in self.State.query.all():
+                if row.key == EPOCH_KEY:
+                    epoch = row.state['epoch']
+                else:
+                    snapshot[row.key] = SubjectMetrics.from_dict(row.state)
+        with self._lock:
+            self._snapshot = snapshot
+            self.epoch = epoch
+            self.loaded = True
+
+    def _stored_epoch(self):
+        # Locks the epoch row, so on Postgres a flush and a recompute cannot interleave
+        row = self.db.session.query(self.State).filter(self.State.key == EPOCH_KEY).with_for_update().first()
+        return row.state['epoch'] if row else 0
+
+    def _ensure_worker(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._start_lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='metrics-flush', daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            time.sleep(FLUSH_INTERVAL_SECONDS)
+            try:
+                self.flush()
+            except Exception as e:
+                logger.error(f"Metrics flush error: {e}")
+
+    def flush(self):
+        with self._flush_lock:
+            with self._lock:
+                pending, self._pending = self._pending, {}
+            if not pending:
+                return 0
+            stale = False
+            try:
+                with self.app.app_context():
+                    if self._stored_epoch() != self.epoch:
+                        # A recompute ran since these reviews were recorded and already counted them
+                        self.db.session.rollback()
+                        stale = True
+                    else:
+                        merged = self._merge(pending)
+                        self.db.session.commit()
+            except Exception:
+                # Put the deltas back so the next flush retries them
+                with self._lock:
+                    for key, delta in pending.items():
+                        current = self._pending.get(key)
+                        if current is not None:
+                            delta.merge(current, self.half_life)
+                        self._pending[key] = delta
+                raise
+            if stale:
+                self.dropped += len(pending)
+                logger.info(f"Dropped metric deltas for {len(pending)} subjects from before a recompute")
+                self.load()
+                return 0
+            with self._lock:
+                self._snapshot.update(merged)
+            self.flushes += 1
+            return len(merged)
+
+    def _merge(self, pending):
+        # Adds the deltas to the stored states and scores; the caller commits
+        stored = {row.key: row for row in self.State.query.filter(self.State.key.in_(list(pending)))}
+        merged = {}
+        for key, delta in pending.items():
+            row = stored.get(key)
+            metrics = SubjectMetrics.from_dict(row.state) if row else SubjectMetrics()
+            metrics.merge(delta, self.half_life)
+            merged[key] = metrics
+            if row:
+                row.state = metrics.to_dict()
+                row.updated_at = datetime.utcnow()
+            else:
+                self.db.session.add(self.State(key=key, state=metrics.to_dict(), updated_at=datetime.utcnow()))
+        self._write_scores(merged)
+        return merged
+
+    def _write_scores(self, merged):
+        officers, centers = [], []
+        for key, metrics in merged.items():
+            kind, _, pk = key.partition(':')
+            if kind == 'officer':
+                officers.append({'pk': int(pk), 'accuracy_score': score(metrics.agreement.ratio()) or 0.0})
+            elif kind == 'center':
+                centers.append({'pk': int(pk), 'efficiency_score': score(metrics.on_time.ratio()) or 0.0,
+                                'avg_processing_time': round(metrics.turnaround.mean, 2)})
+        session = self.db.session
+        for values in officers:
+            session.query(self.Officer).filter(self.Officer.id == values.pop('pk')).update(
+                values, synchronize_session=False)
+        for values in centers:
+            session.query(self.Center).filter(self.Center.id == values.pop('pk')).update(
+                values, synchronize_session=False)
+
+    def recompute(self, chunk_size=RECOMPUTE_CHUNK_SIZE):
+        # Rebuilds every state from reviewed requests, oldest first, in keyset chunks
+        with self._flush_lock, self.app.app_context():
+            with self._lock:
+                self._pending = {}
+            states = {}
+            reviewed = 0
+            for Request in (self.Archive, self.Request):
+                if Request is None:
+                    continue
+                # Archived rows keep completed_at only
+                processed_at = getattr(Request, 'processed_at', Request.completed_at)
+                last_id = 0
+                while True:
+                    rows = self.db.session.query(
+                        Request.id, Request.submitted_at, Request.completed_at, processed_at.label('processed_at'),
+                        Request.update_type, Request.risk_score, Request.status, Request.processing_center_id,
+                        Request.assigned_officer_id
+                    ).filter(Request.id > last_id, Request.status.in_(('approved', 'rejected')),
+                             Request.assigned_officer_id.isnot(None)).order_by(Request.id).limit(chunk_size).all()
+                    if not rows:
+                        break
+                    for row in rows:
+                        completed_at = row.completed_at or row.processed_at or row.submitted_at
+                        hours, on_time, agrees = self.observe(row.submitted_at, completed_at, row.update_type,
+                                                              row.risk_score, row.status)
+                        for key in subject_keys(row.processing_center_id, row.assigned_officer_id):
+                            states.setdefault(key, SubjectMetrics()).add(
+                                hours, on_time, agrees, completed_at.timestamp(), self.half_life)
+                    last_id = rows[-1].id
+                    reviewed += len(rows)
+
+            epoch = self._stored_epoch() + 1
+            self.db.session.query(self.State).delete(synchronize_session=False)
+            self.db.session.add_all([self.State(key=key, state=metrics.to_dict(), updated_at=datetime.utcnow())
+                                     for key, metrics in states.items()])
+            self.db.session.add(self.State(key=EPOCH_KEY, state={'epoch': epoch}, updated_at=datetime.utcnow()))
+            self._write_scores(states)
+            self.db.session.commit()
+            with self._lock:
+                self._snapshot = states
+                self.epoch = epoch
+                self.loaded = True
+        logger.info(f"Recomputed metrics from {reviewed} reviewed requests")
+        return reviewed
+
+    def stats(self):
+        with self._lock:
+            return {'subjects': len(self._snapshot), 'pending': len(self._pending), 'flushes': self.flushes,
+                    'epoch': self.epoch, 'dropped': self.dropped}
@@ -0,0 +1,150 @@
+# migrate.py - Schema upgrades and data backfills for existing databases
+#
+# db.create_all() only creates missing tables, so columns and indexes added to
+# tables that already exist are applied here. Every step is idempotent.
+# Run directly with `python migrate.py`; app.py also runs it at startup.
+import json
+import logging
+from sqlalchemy import inspect, text
+
+from search import create_search_index
+
+logger = logging.getLogger(__name__)
+
+BACKFILL_CHUNK_SIZE = 5000
+
+
+def add_missing_columns(db):
+    inspector = inspect(db.engine)
+    for table in db.metadata.sorted_tables:
+        if not inspector.has_table(table.name):
+            continue
+        existing = {c['name'] for c in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name in existing:
+                continue
+            col_type = column.type.compile(dialect=db.engine.dialect)
+            if column.computed is not None:
+                # SQLite can only add VIRTUAL generated columns to an existing table; Postgres only has STORED
+                kind = 'STORED' if db.engine.dialect.name == 'postgresql' else 'VIRTUAL'
+                col_type += f' GENERATED ALWAYS AS ({column.computed.sqltext}) {kind}'
+            with db.engine.begin() as conn:
+                conn.execute(text(f'ALTER TABLE {table.name} ADD COLUMN {column.name} {col_type}'))
+            logger.info(f"Added column {table.name}.{column.name}")
+
+
+def create_missing_indexes(db):
+    for table in db.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=db.engine, checkfirst=True)
+
+
+# Resolve the legacy officer/center name columns into their id columns
+def backfill_reference_ids(db, chunk_size=BACKFILL_CHUNK_SIZE):
+    with db.engine.begin() as conn:
+        # Names are not unique; the lowest id wins, matching the old first() lookups
+        centers = dict(conn.execute(text('SELECT name, id FROM processing_centers ORDER BY id DESC')).all())
+        officers = dict(conn.execute(text('SELECT name, id FROM officers ORDER BY id DESC')).all())
+
+        officer_rows = conn.execute(text(
+            'SELECT id, processing_center FROM officers WHERE processing_center_id IS NULL')).all()
+        params = [{'id': row.id, 'center_id': centers[row.processing_center]}
+                  for row in officer_rows if row.processing_center in centers]
+        if params:
+            conn.execute(text('UPDATE officers SET processing_center_id = :center_id WHERE id = :id'), params)
+
+    # Stream update_requests in primary-key chunks so each transaction stays short
+    last_id = 0
+    backfilled = 0
+    while True:
+        with db.engine.begin() as conn:
+            rows = conn.execute(text(
+                'SELECT id, assigned_officer, processing_center FROM update_requests '
+                'WHERE id > :last_id AND ('
+                '(assigned_officer IS NOT NULL AND assigned_officer_id IS NULL) OR '
+                '(processing_center IS NOT NULL AND processing_center_id IS NULL)) '
+                'ORDER BY id LIMIT :limit'), {'last_id': last_id, 'limit': chunk_size}).all()
+            if not rows:
+                break
+
+            params = [{
+                'id': row.id,
+                'officer_id': officers.get(row.assigned_officer),
+                'center_id': centers.get(row.processing_center)
+            } for row in rows]
+            conn.execute(text(
+                'UPDATE update_requests SET '
+                'assigned_officer_id = COALESCE(assigned_officer_id, :officer_id), '
+                'processing_center_id = COALESCE(processing_center_id, :center_id) '
+                'WHERE id = :id'), params)
+
+        last_id = rows[-1].id
+        backfilled += len(rows)
+
+    if backfilled:
+        logger.info(f"Backfilled officer/center ids on {backfilled} update requests")
+
+
+# Move request details out of the legacy old_data text into the JSON column
+def backfill_request_details(db, chunk_size=BACKFILL_CHUNK_SIZE):
+    # The JSON columns used to be free text on SQLite; anything that isn't valid JSON becomes an empty
+    # list. Databases that enforce JSON types (JSONB on Postgres) never held free text.
+    if db.engine.dialect.name == 'sqlite':
+        with db.engine.begin() as conn:
+            for column in ('documents', 'document_types'):
+                conn.execute(text(f"UPDATE update_requests SET {column} = '[]' "
+                                  f"WHERE {column} IS NOT NULL AND NOT json_valid({column})"))
+
+    last_id = 0
+    backfilled = 0
+    while True:
+        with db.engine.begin() as conn:
+            rows = conn.execute(text(
+                'SELECT id, update_type, old_data, new_data FROM update_requests '
+                'WHERE id > :last_id AND details IS NULL ORDER BY id LIMIT :limit'),
+                {'last_id': last_id, 'limit': chunk_size}).all()
+            if not rows:
+                break
+
+            params = []
+            for row in rows:
+                details = None
+                if row.old_data and row.old_data.startswith('['):
+                    try:
+                        details = json.loads(row.old_data)
+                    except ValueError:
+                        pass
+                if details is None:
+                    details = [{'field': row.update_type, 'oldValue': row.old_data, 'newValue': row.new_data}]
+                params.append({'id': row.id, 'details': json.dumps(details)})
+            conn.execute(text('UPDATE update_requests SET details = :details WHERE id = :id'), params)
+
+        last_id = rows[-1].id
+        backfilled += len(rows)
+
+    if backfilled:
+        logger.info(f"Backfilled details on {backfilled} update requests")
+
+
+MIGRATIONS = [
+    add_missing_columns,
+    create_missing_indexes,
+    backfill_reference_ids,
+    backfill_request_details,
+    create_search_index,
+]
+
+
+def run_migrations(db):
+    for migration in MIGRATIONS:
+        migration(db)
+
+
+if __name__ == '__main__':
+    from app import app, db
+
+    logging.basicConfig(level=logging.INFO)
+    with app.app_context():
+        db.create_all()
+        run_migrations(db)
+        print("Migrations complete")
@@ -0,0 +1,279 @@
+# notifications.py - Batched per-user notification inboxes
+#
+# State transitions are queued in memory and written by one background thread
+# as a bulk insert per batch. Unread counts are read from
+# notification_counters with a primary-key read and cached for
+# COUNTER_CACHE_SECONDS, so reads never aggregate the notifications table.
+# Each worker adds its own changes to the cache and keeps them as pending
+# deltas. The deltas are flushed periodically as unread = unread + delta, so
+# workers never overwrite each other's counts. Marking everything read sets
+# the count to zero and stamps reset_at. Deltas other workers recorded
+# before that describe notifications that are now read, so each delta keeps
+# the time it was recorded and the flush only adds those newer than
+# reset_at, in the same UPDATE. Rows older than the TTL are compacted away
+# in chunks.
+import logging
+import queue
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+
+from sqlalchemy import and_, case, or_
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 500
+FLUSH_INTERVAL_SECONDS = 0.5
+COUNTER_FLUSH_INTERVAL_SECONDS = 5
+# Cached counts are re-read after this long, to pick up other workers' flushed deltas
+COUNTER_CACHE_SECONDS = 30
+COMPACT_INTERVAL_SECONDS = 3600
+COMPACT_CHUNK_SIZE = 5000
+NOTIFICATION_TTL_DAYS = 90
+MAX_CACHED_COUNTERS = 200000
+
+
+class UnreadCounters:
+    def __init__(self, load, max_entries=MAX_CACHED_COUNTERS, max_age=COUNTER_CACHE_SECONDS):
+        self._load = load
+        # aadhaar_id -> (count, monotonic time loaded)
+        self._counts = OrderedDict()
+        # aadhaar_id -> [(recorded at, change)] not yet flushed to notification_counters
+        self._deltas = {}
+        self._lock = threading.Lock()
+        self.max_entries = max_entries
+        self.max_age = max_age
+
+    def get(self, aadhaar_id):
+        with self._lock:
+            cached = self._counts.get(aadhaar_id)
+            if cached is not None and time.monotonic() - cached[1] < self.max_age:
+                self._counts.move_to_end(aadhaar_id)
+                return cached[0]
+        count = self._load(aadhaar_id)
+        with self._lock:
+            # The stored count plus this worker's changes that are not flushed yet
+            count = max(0, count + sum(delta for _, delta in self._deltas.get(aadhaar_id, ())))
+            self._counts[aadhaar_id] = (count, time.monotonic())
+            self._counts.move_to_end(aadhaar_id)
+            self._evict()
+            return count
+
+    def add(self, aadhaar_id, delta):
+        with self._lock:
+            self._deltas.setdefault(aadhaar_id, []).append((datetime.utcnow(), delta))
+            cached = self._counts.get(aadhaar_id)
+            if cached is not None:
+                self._counts[aadhaar_id] = (max(0, cached[0] + delta), cached[1])
+
+    def reset(self, aadhaar_id):
+        # After the stored count was set to zero; changes already pending are covered by it
+        with self._lock:
+            self._deltas.pop(aadhaar_id, None)
+            self._counts[aadhaar_id] = (0, time.monotonic())
+            self._counts.move_to_end(aadhaar_id)
+            self._evict()
+
+    def _evict(self):
+        # Pending deltas are kept apart, so any cached count can go
+        while len(self._counts) > self.max_entries:
+            self._counts.popitem(last=False)
+
+    def take_deltas(self):
+        with self._lock:
+            deltas, self._deltas = self._deltas, {}
+            return deltas
+
+    def restore(self, deltas):
+        # Puts back deltas whose flush failed, so the next flush retries them
+        with self._lock:
+            for key, changes in deltas.items():
+                self._deltas[key] = changes + self._deltas.get(key, [])
+
+
+class NotificationService:
+    def __init__(self, app, db, notification_model, counter_model, on_delivered=None):
+        self.app = app
+        self.db = db
+        self.Notification = notification_model
+        self.Counter = counter_model
+        self.on_delivered = on_delivered
+        self.counters = UnreadCounters(self._load_counter)
+        self._queue = queue.Queue()
+        self._thread = None
+        self._start_lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._last_counter_flush = time.monotonic()
+        self._last_compaction = time.monotonic()
+
+    def _load_counter(self, aadhaar_id):
+        with self.app.app_context():
+            row = self.db.session.get(self.Counter, aadhaar_id)
+            return row.unread if row else 0
+
+    def enqueue(self, aadhaar_id, title, message, kind='info', request_id=None):
+        self._queue.put({
+            'aadhaar_id': aadhaar_id,
+            'request_id': request_id,
+            'type': kind,
+            'title': title,
+            'message': message,
+            'created_at': datetime.utcnow()
+        })
+        self._ensure_worker()
+
+    def close(self):
+        self.flush()
+        self.flush_counters()
+
+    def _ensure_worker(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._start_lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='notification-writer', daemon=True)
+                self._thread.start()
+
+    def _drain(self, block):
+        rows = []
+        try:
+            rows.append(self._queue.get(timeout=FLUSH_INTERVAL_SECONDS) if block else self._queue.get_nowait())
+            while len(rows) < BATCH_SIZE:
+                rows.append(self._queue.get_nowait())
+        except queue.Empty:
+            pass
+        return rows
+
+    def _run(self):
+        while True:
+            try:
+                self.flush(block=True)
+                now = time.monotonic()
+                if now - self._last_counter_flush >= COUNTER_FLUSH_INTERVAL_SECONDS:
+                    self.flush_counters()
+                if now - self._last_compaction >= COMPACT_INTERVAL_SECONDS:
+                    self.compact()
+            except Exception as e:
+                logger.error(f"Notification writer error: {e}")
+                time.sleep(1)
+
+    def flush(self, block=False):
+        with self._flush_lock:
+            written = 0
+            while True:
+                rows = self._drain(block and written == 0)
+                if not rows:
+                    return written
+                with self.app.app_context():
+                    self.db.session.execute(self.Notification.__table__.insert(), rows)
+                    self.db.session.commit()
+
+                per_user = {}
+                for row in rows:
+                    per_user[row['aadhaar_id']] = per_user.get(row['aadhaar_id'], 0) + 1
+                for aadhaar_id, count in per_user.items():
+                    self.counters.add(aadhaar_id, count)
+                if self.on_delivered:
+                    self.on_delivered(per_user.keys())
+                written += len(rows)
+
+    def flush_counters(self):
+        self._last_counter_flush = time.monotonic()
+        deltas = self.counters.take_deltas()
+        if not deltas:
+            return
+        Counter, session = self.Counter, self.db.session
+        try:
+            with self.app.app_context():
+                try:
+                    for aadhaar_id, changes in deltas.items():
+                        # Only changes recorded after the last mark-all still apply
+                        delta = sum(case((or_(Counter.reset_at.is_(None), Counter.reset_at < at), change), else_=0)
+                                    for at, change in changes)
+                        updated = session.query(Counter).filter(Counter.aadhaar_id == aadhaar_id).update(
+                            {'unread': case((Counter.unread + delta > 0, Counter.unread + delta), else_=0)},
+                            synchronize_session=False)
+                        if not updated:
+                            session.add(Counter(aadhaar_id=aadhaar_id,
+                                                unread=max(0, sum(change for _, change in changes))))
+                    session.commit()
+                except Exception:
+                    session.rollback()
+                    raise
+        except Exception:
+            self.counters.restore(deltas)
+            raise
+
+    def compact(self, ttl_days=NOTIFICATION_TTL_DAYS):
+        self._last_compaction = time.monotonic()
+        cutoff = datetime.utcnow() - timedelta(days=ttl_days)
+        Notification = self.Notification
+        removed = 0
+        with self.app.app_context():
+            while True:
+                rows = self.db.session.query(Notification.id, Notification.aadhaar_id, Notification.read_at).filter(
+                    Notification.created_at < cutoff).limit(COMPACT_CHUNK_SIZE).all()
+                if not rows:
+                    break
+                self.db.session.query(Notification).filter(Notification.id.in_([r.id for r in rows])).delete(
+                    synchronize_session=False)
+                self.db.session.commit()
+
+                unread = {}
+                for row in rows:
+                    if row.read_at is None:
+                        unread[row.aadhaar_id] = unread.get(row.aadhaar_id, 0) + 1
+                for aadhaar_id, count in unread.items():
+                    self.counters.add(aadhaar_id, -count)
+                removed += len(rows)
+        if removed:
+            logger.info(f"Compacted {removed} expired notifications")
+        return removed
+
+    def inbox(self, aadhaar_id, cursor=None, limit=20):
+        # Keyset paging on (created_at, id), newest first
+        Notification = self.Notification
+        query = Notification.query.filter(Notification.aadhaar_id == aadhaar_id)
+        if cursor:
+            created_at, last_id = cursor
+            query = query.filter(or_(Notification.created_at < created_at,
+                                     and_(Notification.created_at == created_at, Notification.id < last_id)))
+        items = query.order_by(Notification.created_at.desc(), Notification.id.desc()).limit(limit + 1).all()
+        next_cursor = None
+        if len(items) > limit:
+            items = items[:limit]
+            next_cursor = encode_cursor(items[-1])
+        return items, next_cursor
+
+    def mark_read(self, aadhaar_id, ids=None):
+        Notification = self.Notification
+        # Taken before the UPDATE, so no notification it leaves unread can be older than reset_at
+        now = datetime.utcnow()
+        query = Notification.query.filter(Notification.aadhaar_id == aadhaar_id, Notification.read_at.is_(None))
+        if ids is not None:
+            query = query.filter(Notification.id.in_(ids))
+        updated = query.update({'read_at': now}, synchronize_session=False)
+        if ids is None:
+            Counter = self.Counter
+            if not self.db.session.query(Counter).filter(Counter.aadhaar_id == aadhaar_id).update(
+                    {'unread': 0, 'reset_at': now}, synchronize_session=False):
+                self.db.session.add(Counter(aadhaar_id=aadhaar_id, unread=0, reset_at=now))
+        self.db.session.commit()
+        if ids is None:
+            self.counters.reset(aadhaar_id)
+        elif updated:
+            self.counters.add(aadhaar_id, -updated)
+        return updated
+
+
+def encode_cursor(notification):
+    return f"{notification.created_at.isoformat()}_{notification.id}"
+
+
+def decode_cursor(cursor):
+    try:
+        created_at, last_id = cursor.rsplit('_', 1)
+        return datetime.fromisoformat(created_at), int(last_id)
+    except (ValueError, AttributeError):
+        return None
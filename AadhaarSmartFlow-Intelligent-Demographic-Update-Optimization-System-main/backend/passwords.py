@@ -0,0 +1,107 @@
+# passwords.py - bcrypt hashing off the request threads
+#
+# bcrypt is deliberately slow (~100-300 ms of CPU per call at cost 12), so it
+# runs on a small process pool instead of the thread serving the request.
+# Admission is bounded: at most max_pending calls may be queued or running,
+# and a caller that cannot get a slot within queue_timeout gets
+# PasswordHasherBusy straight away, so a login storm cannot tie up every
+# request thread. Hashes stay in the standard $2b$ format, and hashes made at
+# an old cost factor are flagged by needs_rehash so login can upgrade them.
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeoutError
+
+import bcrypt
+
+DEFAULT_ROUNDS = 12
+DEFAULT_QUEUE_TIMEOUT_SECONDS = 0.1
+DEFAULT_TIMEOUT_SECONDS = 5.0
+
+
+class PasswordHasherBusy(Exception):
+    pass
+
+
+def _hash(password, rounds):
+    return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt(rounds)).decode('utf-8')
+
+
+def _verify(password, password_hash):
+    try:
+        return bcrypt.checkpw(password.encode('utf-8'), password_hash.encode('utf-8'))
+    except ValueError:
+        # Malformed or empty stored hash
+        return False
+
+
+def hash_rounds(password_hash):
+    # '$2b$12$<salt+hash>' -> 12
+    try:
+        return int(password_hash.split('$')[2])
+    except (AttributeError, IndexError, ValueError):
+        return None
+
+
+class PasswordHasher:
+    def __init__(self, rounds=DEFAULT_ROUNDS, max_workers=None, max_pending=None,
+                 queue_timeout=DEFAULT_QUEUE_TIMEOUT_SECONDS, timeout=DEFAULT_TIMEOUT_SECONDS):
+        self.rounds = rounds
+        # max_workers=0 hashes inline on the calling thread (development, benchmarks)
+        self.max_workers = (os.cpu_count() or 1) if max_workers is None else max_workers
+        self.max_pending = max_pending or max(self.max_workers, 1) * 4
+        self.queue_timeout = queue_timeout
+        self.timeout = timeout
+        self._slots = threading.BoundedSemaphore(self.max_pending)
+        self._executor = None
+        self._lock = threading.Lock()
+        self.rejected = 0
+        self.timed_out = 0
+
+    def _pool(self):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+            return self._executor
+
+    def _run(self, fn, *args):
+        if not self._slots.acquire(timeout=self.queue_timeout):
+            self.rejected += 1
+            raise PasswordHasherBusy('password hashing queue is full')
+        try:
+            if self.max_workers == 0:
+                return fn(*args)
+            future = self._pool().submit(fn, *args)
+            try:
+                return future.result(timeout=self.timeout)
+            except FutureTimeoutError:
+                future.cancel()
+                self.timed_out += 1
+                raise PasswordHasherBusy('password hashing timed out')
+        finally:
+            self._slots.release()
+
+    def hash(self, password):
+        return self._run(_hash, password, self.rounds)
+
+    def verify(self, password, password_hash):
+        if not password_hash:
+            return False
+        return self._run(_verify, password, password_hash)
+
+    def needs_rehash(self, password_hash):
+        return hash_rounds(password_hash) != self.rounds
+
+    def stats(self):
+        return {
+            'rounds': self.rounds,
+            'workers': self.max_workers,
+            'max_pending': self.max_pending,
+            'rejected': self.rejected,
+            'timed_out': self.timed_out
+        }
+
+    def shutdown(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor:
+            executor.shutdown(wait=False, cancel_futures=True)
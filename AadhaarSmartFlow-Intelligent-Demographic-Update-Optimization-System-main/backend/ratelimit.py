@@ -0,0 +1,169 @@
+# ratelimit.py - Token-bucket rate limiting per endpoint and identity
+#
+# Each endpoint has a list of policies. A policy names a scope (e.g. 'ip',
+# 'identity', 'account'), a refill rate and a burst size. A request takes one
+# token from the bucket for every scope that applies to it; when any bucket
+# is empty it gets 429 with a Retry-After for the time until the next token.
+#
+# LocalBackend keeps buckets in a dict of (tokens, updated_at, full_at)
+# tuples. A bucket that has refilled to its burst is the same as no bucket,
+# so those are swept away as the dict grows. RedisBackend (REDIS_URL set and
+# redis installed) runs the same arithmetic in a Lua script so all workers
+# share buckets. If Redis errors, requests are let through and the error is
+# logged.
+import logging
+import math
+import os
+import threading
+import time
+from functools import wraps
+
+from flask import jsonify
+
+logger = logging.getLogger(__name__)
+
+SWEEP_THRESHOLD = 10000
+
+
+class Policy:
+    __slots__ = ('scope', 'rate', 'burst')
+
+    def __init__(self, scope, per_minute, burst):
+        self.scope = scope
+        self.rate = per_minute / 60.0
+        self.burst = burst
+
+
+class LocalBackend:
+    def __init__(self):
+        self._buckets = {}
+        self._lock = threading.Lock()
+        self._next_sweep = SWEEP_THRESHOLD
+
+    def hit(self, key, rate, burst):
+        # Returns 0 when allowed, otherwise seconds until a token is available
+        now = time.monotonic()
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                tokens = burst
+                if len(self._buckets) >= self._next_sweep:
+                    self._sweep(now)
+            else:
+                tokens = min(burst, bucket[0] + (now - bucket[1]) * rate)
+
+            if tokens >= 1:
+                tokens -= 1
+                self._buckets[key] = (tokens, now, now + (burst - tokens) / rate)
+                return 0
+            self._buckets[key] = (tokens, now, now + (burst - tokens) / rate)
+            return (1 - tokens) / rate
+
+    def _sweep(self, now):
+        self._buckets = {key: bucket for key, bucket in self._buckets.items() if bucket[2] > now}
+        self._next_sweep = max(SWEEP_THRESHOLD, len(self._buckets) * 2)
+
+    def size(self):
+        return len(self._buckets)
+
+
+class RedisBackend:
+    PREFIX = 'smartflow:ratelimit:'
+    # KEYS[1] bucket; ARGV rate (tokens/s), burst. Returns milliseconds to wait (0 = allowed)
+    SCRIPT = """
+local now = redis.call('TIME')
+now = tonumber(now[1]) + tonumber(now[2]) / 1000000
+local rate = tonumber(ARGV[1])
+local burst = tonumber(ARGV[2])
+local bucket = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(bucket[1])
+if tokens == nil then
+    tokens = burst
+else
+    tokens = math.min(burst, tokens + (now - tonumber(bucket[2])) * rate)
+end
+local wait = 0
+if tokens >= 1 then
+    tokens = tokens - 1
+else
+    wait = math.ceil((1 - tokens) / rate * 1000)
+end
+redis.call('HSET', KEYS[1], 'tokens', tokens, 'ts', now)
+redis.call('PEXPIRE', KEYS[1], math.ceil((burst - tokens) / rate * 1000) + 1000)
+return wait
+"""
+
+    def __init__(self, url):
+        import redis
+
+        self.client = redis.Redis.from_url(url)
+        self.client.ping()
+        self._script = self.client.register_script(self.SCRIPT)
+
+    def hit(self, key, rate, burst):
+        try:
+            return self._script(keys=[self.PREFIX + key], args=[rate, burst]) / 1000.0
+        except Exception as e:
+            logger.error(f"Rate limit backend error, allowing request: {e}")
+            return 0
+
+    def size(self):
+        return None
+
+
+def create_backend():
+    url = os.getenv('REDIS_URL')
+    if url:
+        try:
+            return RedisBackend(url)
+        except Exception as e:
+            logger.error(f"Redis rate limit backend unavailable, using local buckets: {e}")
+    return LocalBackend()
+
+
+class RateLimiter:
+    def __init__(self, backend, policies, scopes, enabled=True):
+        # policies: endpoint -> [Policy]; scopes: scope name -> callable returning the key or None
+        self.backend = backend
+        self.policies = policies
+        self.scopes = scopes
+        self.enabled = enabled
+        self.allowed = 0
+        self.limited = 0
+
+    def check(self, endpoint):
+        # Returns 0 when the request may proceed, otherwise seconds to wait
+        wait = 0
+        for policy in self.policies.get(endpoint, ()):
+            value = self.scopes[policy.scope]()
+            if value is None:
+                continue
+            wait = max(wait, self.backend.hit(f'{endpoint}:{policy.scope}:{value}', policy.rate, policy.burst))
+        if wait:
+            self.limited += 1
+        else:
+            self.allowed += 1
+        return wait
+
+    def limit(self, endpoint):
+        def decorator(view):
+            @wraps(view)
+            def wrapper(*args, **kwargs):
+                if self.enabled:
+                    wait = self.check(endpoint)
+                    if wait:
+                        response = jsonify({'success': False, 'error': 'Too many requests, please retry later'})
+                        response.headers['Retry-After'] = str(max(1, math.ceil(wait)))
+                        return response, 429
+                return view(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def stats(self):
+        return {
+            'enabled': self.enabled,
+            'backend': type(self.backend).__name__,
+            'buckets': self.backend.size(),
+            'allowed': self.allowed,
+            'limited': self.limited
+        }
@@ -0,0 +1,354 @@
+# rebalance.py - Periodic work stealing between officers and centers
+#
+# assign_to_processing_center/assign_to_officer pick a center and officer
+# once, at submit time. A request then stays where it landed, even when its
+# officer goes inactive or the center backs up. Every REBALANCE_INTERVAL the
+# Rebalancer takes a snapshot of each officer's backlog (open requests not
+# yet reviewed) and throughput (reviews in the last THROUGHPUT_WINDOW), and
+# moves unstarted requests:
+#
+#   1. within a center, off inactive officers and off officers whose drain
+#      time (backlog / throughput) is over HIGH_WATER x the center's, onto
+#      officers under LOW_WATER x;
+#   2. across centers, the same test on center drain times against the
+#      overall one, for centers holding at least MIN_DONOR_BACKLOG requests
+#      and MIN_CENTER_EXCESS more than their share. Work stays in its state
+#      unless no center in the state can take it, and receivers are tried
+#      nearest first when a nearness function is given.
+#
+# Moves stop once the donor reaches the target, not the threshold that made
+# it a donor. Together with the per-request cooldown, this stops requests
+# from bouncing between two officers. Moves come off the back of the donor's
+# queue (largest priority_key), since those would wait longest where they
+# are. They are applied in batches, one transaction each. Every UPDATE checks
+# the request is still open, unstarted and with the same officer, and every
+# move writes an AuditLog row and a request_transitions entry in the same
+# transaction. Runs are capped by
+# MAX_MOVES_PER_RUN and MAX_MOVES_PER_HOUR.
+import heapq
+import logging
+import threading
+import time
+from collections import deque
+from datetime import datetime, timedelta
+
+from sqlalchemy import case, func
+
+from scheduler import OPEN_STATUSES, priority_key
+from transitions import entry
+
+logger = logging.getLogger(__name__)
+
+REBALANCE_INTERVAL_SECONDS = 300
+THROUGHPUT_WINDOW_HOURS = 6
+# Officers with little history are assumed to review this many requests per hour
+PRIOR_REVIEWS_PER_HOUR = 2.0
+PRIOR_HOURS = 1.0
+HIGH_WATER = 1.5
+LOW_WATER = 0.75
+# Officers below this backlog are never donors, whatever their drain time
+MIN_DONOR_BACKLOG = 3
+# A center must hold this many requests beyond its share of the total before any leave it
+MIN_CENTER_EXCESS = 10
+MAX_MOVES_PER_RUN = 200
+MAX_MOVES_PER_HOUR = 1000
+MOVE_BATCH_SIZE = 50
+MOVE_COOLDOWN_SECONDS = 6 * 3600
+
+
+class Worker:
+    # One officer, or a center's unassigned pool (officer_pk None), in a snapshot
+    __slots__ = ('center_id', 'officer_pk', 'backlog', 'rate', 'capacity', 'active')
+
+    def __init__(self, center_id, officer_pk, backlog, rate=0.0, capacity=0, active=False):
+        self.center_id = center_id
+        self.officer_pk = officer_pk
+        self.backlog = backlog
+        self.rate = rate
+        self.capacity = capacity
+        self.active = active
+
+    def drain(self):
+        # Hours to clear the backlog; inactive officers and pools never clear it themselves
+        if not self.active or self.rate <= 0:
+            return float('inf') if self.backlog else 0.0
+        return self.backlog / self.rate
+
+
+def _move(transfers, donor, receiver):
+    donor.backlog -= 1
+    receiver.backlog += 1
+    receiver.capacity -= 1
+    key = ((donor.center_id, donor.officer_pk), receiver.officer_pk)
+    transfers[key] = transfers.get(key, 0) + 1
+
+
+def _receivers(workers, ceiling):
+    heap = [(w.drain(), w.officer_pk, w) for w in workers
+            if w.active and w.capacity > 0 and w.drain() < ceiling]
+    heapq.heapify(heap)
+    return heap
+
+
+def plan_transfers(workers, high_water=HIGH_WATER, low_water=LOW_WATER, limit=MAX_MOVES_PER_RUN, states=None,
+                   nearness=None):
+    # Returns {((center_id, donor officer_pk), receiver officer_pk): count}. Mutates the snapshot.
+    # states maps center_id -> state; nearness(from center, to center) sorts receiving centers.
+    transfers = {}
+    centers = {}
+    for worker in workers:
+        centers.setdefault(worker.center_id, []).append(worker)
+    budget = limit
+
+    # 1. Within each center; unassigned pools are already served by every officer there
+    for members in centers.values():
+        rate = sum(w.rate for w in members if w.active)
+        if not rate:
+            continue
+        target = sum(w.backlog for w in members if w.officer_pk is not None) / rate
+        donors = sorted((w for w in members if w.officer_pk is not None and w.backlog >= (
+            1 if not w.active else MIN_DONOR_BACKLOG) and w.drain() > high_water * target),
+            key=lambda w: w.drain(), reverse=True)
+        receivers = _receivers(members, low_water * target)
+        for donor in donors:
+            while budget and receivers and donor.drain() > target:
+                _, _, receiver = heapq.heappop(receivers)
+                _move(transfers, donor, receiver)
+                budget -= 1
+                if receiver.capacity > 0 and receiver.drain() < target:
+                    heapq.heappush(receivers, (receiver.drain(), receiver.officer_pk, receiver))
+
+    # 2. Across centers, on whole-center drain times
+    def center_drain(members):
+        rate = sum(w.rate for w in members if w.active)
+        backlog = sum(w.backlog for w in members)
+        return backlog / rate if rate else (float('inf') if backlog else 0.0)
+
+    total_rate = sum(w.rate for w in workers if w.active)
+    if not total_rate:
+        return transfers
+    target = sum(w.backlog for w in workers) / total_rate
+    states = states or {}
+
+    def excess(members):
+        # Requests beyond what the center would hold at the overall drain time
+        return sum(w.backlog for w in members) - target * sum(w.rate for w in members if w.active)
+
+    donors = sorted((m for m in centers.values() if center_drain(m) > high_water * target
+                     and sum(w.backlog for w in m) >= MIN_DONOR_BACKLOG and excess(m) >= MIN_CENTER_EXCESS),
+                    key=center_drain, reverse=True)
+    receiving = [m for m in centers.values() if center_drain(m) < low_water * target]
+    for donor_members in donors:
+        center_id = donor_members[0].center_id
+        state = states.get(center_id)
+        local = [m for m in receiving if state and states.get(m[0].center_id) == state]
+        candidates = local or receiving
+        if nearness:
+            candidates = sorted(candidates, key=lambda m: nearness(center_id, m[0].center_id))
+        for receiver_members in candidates:
+            receivers = _receivers(receiver_members, target)
+            while budget and receivers and center_drain(donor_members) > target \
+                    and center_drain(receiver_members) < target:
+                # The pool first, then the officer furthest behind
+                donor = max((w for w in donor_members if w.backlog), key=lambda w: (w.officer_pk is None, w.drain()))
+                _, _, receiver = heapq.heappop(receivers)
+                _move(transfers, donor, receiver)
+                budget -= 1
+                if receiver.capacity > 0:
+                    heapq.heappush(receivers, (receiver.drain(), receiver.officer_pk, receiver))
+    return transfers
+
+
+class Rebalancer:
+    def __init__(self, app, db, request_model, officer_model, center_model, audit_model, on_moved=None,
+                 interval=REBALANCE_INTERVAL_SECONDS, transitions=None, nearness=None):
+        self.app = app
+        self.db = db
+        self.Request = request_model
+        self.Officer = officer_model
+        self.Center = center_model
+        self.Audit = audit_model
+        self.on_moved = on_moved
+        self.interval = interval
+        self.transitions = transitions
+        self.nearness = nearness
+        self._recent_moves = deque()
+        self._cooldown = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self.runs = 0
+        self.moved = 0
+        self.conflicts = 0
+        self.last_run = None
+
+    def start(self):
+        if not self.interval or (self._thread is not None and self._thread.is_alive()):
+            return
+        self._thread = threading.Thread(target=self._run, name='rebalancer', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.run()
+            except Exception as e:
+                logger.error(f"Rebalancer error: {e}")
+
+    def snapshot(self, now=None):
+        # One Worker per active/inactive officer and per center pool, from two grouped queries
+        Request, Officer = self.Request, self.Officer
+        now = now or datetime.utcnow()
+        session = self.db.session
+        backlog = dict(((center_id, officer_pk), count) for center_id, officer_pk, count in session.query(
+            Request.processing_center_id, Request.assigned_officer_id, func.count(Request.id)
+        ).filter(Request.status.in_(OPEN_STATUSES), Request.processed_at.is_(None),
+                 Request.processing_center_id.isnot(None)
+                 ).group_by(Request.processing_center_id, Request.assigned_officer_id))
+        reviews = dict(session.query(Request.assigned_officer_id, func.count(Request.id)).filter(
+            Request.processed_at >= now - timedelta(hours=THROUGHPUT_WINDOW_HOURS),
+            Request.assigned_officer_id.isnot(None), Request.auto_approved.isnot(True)
+        ).group_by(Request.assigned_officer_id))
+
+        workers = []
+        for officer in session.query(Officer.id, Officer.processing_center_id, Officer.is_active,
+                                     Officer.current_workload, Officer.max_workload):
+            rate = (reviews.get(officer.id, 0) + PRIOR_REVIEWS_PER_HOUR * PRIOR_HOURS) / (
+                THROUGHPUT_WINDOW_HOURS + PRIOR_HOURS)
+            workers.append(Worker(officer.processing_center_id, officer.id,
+                                  backlog.pop((officer.processing_center_id, officer.id), 0), rate,
+                                  max(0, (officer.max_workload or 0) - (officer.current_workload or 0)),
+                                  bool(officer.is_active)))
+        # Pools, plus requests whose officer has since moved center
+        for (center_id, officer_pk), count in backlog.items():
+            workers.append(Worker(center_id, officer_pk, count))
+        return workers
+
+    def _budget(self):
+        now = time.monotonic()
+        while self._recent_moves and self._recent_moves[0] < now - 3600:
+            self._recent_moves.popleft()
+        for request_pk, moved_at in list(self._cooldown.items()):
+            if moved_at < now - MOVE_COOLDOWN_SECONDS:
+                del self._cooldown[request_pk]
+        return min(MAX_MOVES_PER_RUN, MAX_MOVES_PER_HOUR - len(self._recent_moves))
+
+    def _pick(self, center_id, officer_pk, count):
+        # The donor's `count` unstarted requests with the latest virtual deadlines
+        Request = self.Request
+        owner = Request.assigned_officer_id.is_(None) if officer_pk is None \
+            else Request.assigned_officer_id == officer_pk
+        rows = self.db.session.query(
+            Request.id, Request.request_id, Request.status, Request.submitted_at, Request.update_type,
+            Request.risk_score
+        ).filter(Request.processing_center_id == center_id, owner, Request.status.in_(OPEN_STATUSES),
+                 Request.processed_at.is_(None))
+        rows = [row for row in rows if row.id not in self._cooldown]
+        return heapq.nlargest(count, rows, key=lambda r: priority_key(
+            r.submitted_at or datetime.utcnow(), r.update_type, r.risk_score))
+
+    def run(self, dry_run=False):
+        with self._lock, self.app.app_context():
+            budget = self._budget()
+            if budget <= 0:
+                return []
+            workers = self.snapshot()
+            centers = {c.id: c for c in self.db.session.query(self.Center.id, self.Center.name, self.Center.state)}
+            states = {center_id: (c.state or '').strip().lower() or None for center_id, c in centers.items()}
+            transfers = plan_transfers(workers, limit=budget, states=states, nearness=self.nearness)
+            if not transfers:
+                self.runs += 1
+                self.last_run = datetime.utcnow()
+                return []
+
+            officers = {o.id: o for o in self.db.session.query(
+                self.Officer.id, self.Officer.officer_id, self.Officer.name, self.Officer.processing_center_id)}
+            by_donor = {}
+            for (donor, to_pk), count in transfers.items():
+                by_donor.setdefault(donor, []).extend([to_pk] * count)
+            moves = []
+            for (center_id, from_pk), receivers in by_donor.items():
+                for row, to_pk in zip(self._pick(center_id, from_pk, len(receivers)), receivers):
+                    moves.append({'id': row.id, 'request_id': row.request_id, 'from_status': row.status,
+                                  'from_center': center_id,
+                                  'from_officer': from_pk, 'to_center': officers[to_pk].processing_center_id,
+                                  'to_officer': to_pk})
+            if dry_run:
+                return moves
+
+            applied = []
+            for start in range(0, len(moves), MOVE_BATCH_SIZE):
+                applied.extend(self._apply(moves[start:start + MOVE_BATCH_SIZE], officers, centers))
+            now = time.monotonic()
+            for move in applied:
+                self._recent_moves.append(now)
+                self._cooldown[move['id']] = now
+            self.runs += 1
+            self.moved += len(applied)
+            self.last_run = datetime.utcnow()
+        if applied:
+            logger.info(f"Rebalanced {len(applied)} requests")
+            if self.on_moved:
+                self.on_moved(applied)
+        return applied
+
+    def _apply(self, batch, officers, centers):
+        Request, Officer, Center = self.Request, self.Officer, self.Center
+        session = self.db.session
+        applied, entries = [], []
+        workload, load = {}, {}
+        try:
+            for move in batch:
+                owner = Request.assigned_officer_id.is_(None) if move['from_officer'] is None \
+                    else Request.assigned_officer_id == move['from_officer']
+                officer = officers[move['to_officer']]
+                # Compare-and-swap: a review or another move since the snapshot wins
+                updated = session.query(Request).filter(
+                    Request.id == move['id'], owner, Request.processing_center_id == move['from_center'],
+                    Request.status.in_(OPEN_STATUSES), Request.processed_at.is_(None)
+                ).update({'assigned_officer_id': officer.id, 'assigned_officer': officer.name,
+                          'processing_center_id': move['to_center'],
+                          'processing_center': centers[move['to_center']].name if move['to_center'] in centers else None,
+                          'status': 'processing'}, synchronize_session=False)
+                if not updated:
+                    self.conflicts += 1
+                    continue
+                for officer_pk, delta in ((move['from_officer'], -1), (move['to_officer'], 1)):
+                    if officer_pk is not None:
+                        workload[officer_pk] = workload.get(officer_pk, 0) + delta
+                if move['from_center'] != move['to_center']:
+                    load[move['from_center']] = load.get(move['from_center'], 0) - 1
+                    load[move['to_center']] = load.get(move['to_center'], 0) + 1
+                from_officer = officers.get(move['from_officer'])
+                session.add(self.Audit(
+                    action='REQUEST_REASSIGNED', user_id='rebalancer', user_type='system', ip_address='0.0.0.0',
+                    details=f"Request {move['request_id']}: Center={move['from_center']}->{move['to_center']}, "
+                            f"Officer={from_officer.officer_id if from_officer else None}->{officer.officer_id}"))
+                entries.append(entry(move['id'], move['from_status'], 'processing', move['to_center'], officer.id))
+                applied.append(move)
+            for officer_pk, delta in workload.items():
+                if delta:
+                    session.query(Officer).filter(Officer.id == officer_pk).update(
+                        {'current_workload': case((Officer.current_workload + delta > 0, Officer.current_workload + delta),
+                                                  else_=0)}, synchronize_session=False)
+            for center_id, delta in load.items():
+                if delta:
+                    session.query(Center).filter(Center.id == center_id).update(
+                        {'current_load': case((Center.current_load + delta > 0, Center.current_load + delta), else_=0)},
+                        synchronize_session=False)
+            if self.transitions:
+                # A bulk UPDATE skips the ORM hooks that log other changes
+                self.transitions.append(session, entries)
+            session.commit()
+        except Exception:
+            session.rollback()
+            raise
+        return applied
+
+    def stats(self):
+        return {'runs': self.runs, 'moved': self.moved, 'conflicts': self.conflicts,
+                'moves_last_hour': len(self._recent_moves),
+                'last_run': self.last_run.isoformat() if self.last_run else None}
@@ -0,0 +1,14 @@
+# recompute_metrics.py - Rebuild officer and center scores from review history
+#
+#   python recompute_metrics.py
+#
+# Safe to run while the server is up: the rebuild bumps the metrics epoch, and
+# running workers drop the deltas they recorded before it (see metrics.py).
+from app import app, db, metrics_engine
+
+with app.app_context():
+    db.create_all()
+
+reviewed = metrics_engine.recompute()
+print(f"Recomputed metrics from {reviewed} reviewed requests")
+print(f"Overall: {metrics_engine.overall()}")
@@ -0,0 +1,145 @@
+# response_cache.py - Versioned ETags and cached bodies for read endpoints
+#
+# Write paths bump change counters for the things they touched, e.g.
+# ('request', request_id) or ('user', aadhaar_id). A cached response records
+# the counter values it was built from and stays valid until one of them moves.
+# A matching If-None-Match therefore returns 304 without running the view.
+# Counters live in process memory, so each worker keeps its own cache.
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from functools import wraps
+
+from flask import g, make_response, request
+from flask_jwt_extended import get_jwt_identity
+
+# Salts ETags so a restarted process never reuses an ETag for different content
+BOOT_ID = os.urandom(8).hex()
+
+
+class ChangeCounters:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counts = {}
+
+    def bump(self, *keys):
+        with self._lock:
+            for key in keys:
+                self._counts[key] = self._counts.get(key, 0) + 1
+
+    def version(self, key):
+        return self._counts.get(key, 0)
+
+
+class CacheEntry:
+    __slots__ = ('etag', 'body', 'mimetype', 'versions')
+
+    def __init__(self, etag, body, mimetype, versions):
+        self.etag = etag
+        self.body = body
+        self.mimetype = mimetype
+        self.versions = versions
+
+
+class ResponseCache:
+    def __init__(self, counters, max_entries=10000):
+        self.counters = counters
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.not_modified = 0
+        self.bytes_saved = 0
+
+    def depends_on(self, *keys):
+        # Called from a view to add dependencies only known after a lookup
+        deps = g.setdefault('cache_dependencies', {})
+        for key in keys:
+            deps[key] = self.counters.version(key)
+
+    def _is_fresh(self, entry):
+        return all(self.counters.version(key) == version for key, version in entry.versions)
+
+    def _etag(self, cache_key, versions):
+        raw = f"{BOOT_ID}:{cache_key!r}:{versions!r}".encode('utf-8')
+        return hashlib.sha1(raw).hexdigest()[:24]
+
+    def _get(self, cache_key):
+        with self._lock:
+            entry = self._entries.get(cache_key)
+            if entry is not None:
+                self._entries.move_to_end(cache_key)
+            return entry
+
+    def _put(self, cache_key, entry):
+        with self._lock:
+            self._entries[cache_key] = entry
+            self._entries.move_to_end(cache_key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def _not_modified(self, etag, size):
+        self.not_modified += 1
+        self.bytes_saved += size
+        response = make_response('', 304)
+        response.set_etag(etag)
+        response.headers['Cache-Control'] = 'private, no-cache'
+        return response
+
+    def cached(self, *dependencies, per_identity=True, vary=None):
+        # dependencies: callables taking the view's kwargs and returning a counter key
+        def decorator(view):
+            @wraps(view)
+            def wrapper(*args, **kwargs):
+                if request.args.get('stream'):
+                    return view(*args, **kwargs)
+
+                identity = get_jwt_identity() if per_identity else None
+                cache_key = (request.endpoint, identity, tuple(sorted(kwargs.items())),
+                             tuple(sorted(request.args.items(multi=True))), vary() if vary else None)
+
+                entry = self._get(cache_key)
+                if entry is not None and self._is_fresh(entry):
+                    self.hits += 1
+                    if request.if_none_match.contains(entry.etag):
+                        return self._not_modified(entry.etag, len(entry.body))
+                    response = make_response(entry.body)
+                    response.mimetype = entry.mimetype
+                    response.set_etag(entry.etag)
+                    response.headers['Cache-Control'] = 'private, no-cache'
+                    return response
+
+                self.misses += 1
+                # Snapshot versions before the view reads, so a concurrent write marks the entry stale
+                g.cache_dependencies = {}
+                self.depends_on(*(dep(**kwargs) for dep in dependencies))
+
+                response = make_response(view(*args, **kwargs))
+                if response.status_code != 200 or response.is_streamed:
+                    return response
+
+                versions = tuple(sorted(g.cache_dependencies.items()))
+                etag = self._etag(cache_key, versions)
+                body = response.get_data()
+                self._put(cache_key, CacheEntry(etag, body, response.mimetype, versions))
+
+                if request.if_none_match.contains(etag):
+                    return self._not_modified(etag, len(body))
+                response.set_etag(etag)
+                response.headers['Cache-Control'] = 'private, no-cache'
+                return response
+            return wrapper
+        return decorator
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'entries': len(self._entries),
+            'hits': self.hits,
+            'misses': self.misses,
+            'not_modified': self.not_modified,
+            'hit_ratio': round(self.hits / lookups, 4) if lookups else 0.0,
+            'bytes_saved': self.bytes_saved
+        }
@@ -0,0 +1,149 @@
+# routing.py - Locality-aware processing center routing
+#
+# A request is routed by the applicant's PIN code, taken from the new
+# address for address changes and otherwise from the address on file. The
+# candidate centers widen in tiers:
+#
+#   district  centers whose PIN shares the first 3 digits (sorting district)
+#   state     centers in the state of the first 2 digits (postal circle), or
+#             of a state named in the address when there is no PIN
+#   zone      centers whose PIN shares the first digit (postal zone)
+#   national  every active center
+#
+# The tiers are precomputed into dicts from the processing_centers table,
+# so a lookup is at most four dict reads whatever the size of the table. The
+# caller tries each tier in turn and takes its least-loaded center that is
+# under total_capacity. The index is rebuilt when a center's routing fields
+# change in this process, and every REFRESH_SECONDS for changes made by
+# other workers. Each route is counted by tier, and a route that lands
+# outside the applicant's state counts as a cross-state overflow. tier()
+# grades two centers on the same scale, and the Rebalancer uses it to move
+# work to the nearest center that can take it.
+import re
+import threading
+import time
+
+REFRESH_SECONDS = 60
+TIERS = ('district', 'state', 'zone', 'national')
+# Six digits, optionally written '560 001', not part of a longer number
+PIN_PATTERN = re.compile(r'(?<!\d)([1-9]\d{2})\s?(\d{3})(?!\d)')
+
+
+def extract_pin(text):
+    # The last PIN-shaped number in an address, which is where Indian addresses put it
+    matches = PIN_PATTERN.findall(text or '')
+    return ''.join(matches[-1]) if matches else None
+
+
+class CenterRouter:
+    def __init__(self, load_centers, refresh_seconds=REFRESH_SECONDS):
+        # load_centers() -> rows of (id, state, district, pin_code), active centers only
+        self.load_centers = load_centers
+        self.refresh_seconds = refresh_seconds
+        self._lock = threading.Lock()
+        self._loaded_at = None
+        self._by_prefix = {}
+        self._by_state = {}
+        self._state_of_circle = {}
+        self._state_of_center = {}
+        self._pin_of_center = {}
+        self._states = ()
+        self._all = ()
+        self.routed = {tier: 0 for tier in TIERS}
+        self.over_capacity = 0
+        self.cross_state = 0
+        self.unlocated = 0
+
+    def invalidate(self):
+        self._loaded_at = None
+
+    def refresh(self):
+        by_prefix, by_state, circles, state_of_center, pin_of_center = {}, {}, {}, {}, {}
+        rows = list(self.load_centers())
+        for center_pk, state, district, pin_code in rows:
+            state = (state or '').strip().lower() or None
+            state_of_center[center_pk] = state
+            if state:
+                by_state.setdefault(state, []).append(center_pk)
+            pin = extract_pin(pin_code)
+            pin_of_center[center_pk] = pin
+            if pin:
+                for length in (3, 1):
+                    by_prefix.setdefault(pin[:length], []).append(center_pk)
+                if state:
+                    circles.setdefault(pin[:2], {}).setdefault(state, 0)
+                    circles[pin[:2]][state] += 1
+        with self._lock:
+            self._by_prefix = {k: tuple(v) for k, v in by_prefix.items()}
+            self._by_state = {k: tuple(v) for k, v in by_state.items()}
+            # A circle spanning states (e.g. shared UT circles) maps to its most common one
+            self._state_of_circle = {k: max(v, key=v.get) for k, v in circles.items()}
+            self._state_of_center = state_of_center
+            self._pin_of_center = pin_of_center
+            # Longest first, so 'west bengal' is found before 'bengal'
+            self._states = tuple(sorted(by_state, key=len, reverse=True))
+            self._all = tuple(center_pk for center_pk, *_ in rows)
+            self._loaded_at = time.monotonic()
+
+    def _ensure_fresh(self):
+        if self._loaded_at is None or time.monotonic() - self._loaded_at >= self.refresh_seconds:
+            self.refresh()
+
+    def home_state(self, address):
+        pin = extract_pin(address)
+        if pin:
+            state = self._state_of_circle.get(pin[:2])
+            if state:
+                return pin, state
+        text = (address or '').lower()
+        for state in self._states:
+            if state in text:
+                return pin, state
+        return pin, None
+
+    def candidates(self, address):
+        # [(tier, center ids)], nearest first; empty tiers are left out
+        self._ensure_fresh()
+        pin, state = self.home_state(address)
+        tiers = []
+        if pin:
+            tiers.append(('district', self._by_prefix.get(pin[:3], ())))
+        if state:
+            tiers.append(('state', self._by_state.get(state, ())))
+        if pin:
+            tiers.append(('zone', self._by_prefix.get(pin[:1], ())))
+        tiers.append(('national', self._all))
+        if not pin and not state:
+            self.unlocated += 1
+        return state, [(tier, ids) for tier, ids in tiers if ids]
+
+    def tier(self, from_pk, to_pk):
+        # Index into TIERS of the nearest tier that holds both centers
+        self._ensure_fresh()
+        pins, states = self._pin_of_center, self._state_of_center
+        from_pin, to_pin = pins.get(from_pk), pins.get(to_pk)
+        if from_pin and to_pin and from_pin[:3] == to_pin[:3]:
+            return 0
+        if states.get(from_pk) and states.get(from_pk) == states.get(to_pk):
+            return 1
+        if from_pin and to_pin and from_pin[0] == to_pin[0]:
+            return 2
+        return 3
+
+    def record(self, tier, home_state, center_pk, over_capacity=False):
+        self.routed[tier] += 1
+        if over_capacity:
+            self.over_capacity += 1
+        if home_state and self._state_of_center.get(center_pk) != home_state:
+            self.cross_state += 1
+
+    def stats(self):
+        routed = sum(self.routed.values())
+        return {
+            'centers': len(self._all),
+            'routed': dict(self.routed),
+            'unlocated': self.unlocated,
+            'over_capacity': self.over_capacity,
+            'cross_state': self.cross_state,
+            'cross_state_rate': round(self.cross_state / routed, 4) if routed else 0.0
+        }
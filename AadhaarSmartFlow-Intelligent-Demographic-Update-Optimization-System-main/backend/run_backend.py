@@ -5,6 +5,9 @@ import traceback
 try:
     import app
     print("App module loaded successfully")
+    app.initialize_database()
+    app.app.debug = True
+    app.start_background_services()
     print("Starting Flask server...")
     app.app.run(host='0.0.0.0', port=5000, debug=True)
 except Exception as e:
@@ -0,0 +1,249 @@
+# scheduler.py - Review order for open update requests
+#
+# Each open request (pending/processing) gets a virtual deadline:
+#
+#     key = submitted_at + SLA(update_type) - RISK_LEAD * risk_score
+#
+# and officers review in ascending key order. The SLA term gives earliest-
+# deadline-first across update types. Risk pulls a request forward by up to
+# RISK_LEAD. Age is built in: the key never changes, so every request
+# overtakes newer ones once it is old enough, and nothing starves the way
+# low-risk requests did under ORDER BY risk_score DESC, submitted_at DESC.
+# Because the key is fixed when a request is submitted, heaps never have to
+# be re-keyed as time passes.
+#
+# Requests sit in one IndexedHeap per (center, officer). Unassigned requests
+# use officer None. One more heap holds every open request, for officers
+# without a center, who review from all queues. The position index makes
+# remove/update O(log n), and next-N reads a heap without popping it.
+import heapq
+import threading
+from datetime import datetime
+
+HOUR = 3600.0
+DEFAULT_SLA_HOURS = 48
+SLA_HOURS = {
+    'phone_change': 24,
+    'email_change': 24,
+    'address_change': 48,
+    'marital_status': 72,
+    'name_change': 72,
+    'photo_update': 72,
+    'biometric_update': 96,
+}
+# A risk score of 1.0 moves a request this far ahead of its SLA deadline
+RISK_LEAD_SECONDS = 24 * HOUR
+OPEN_STATUSES = ('pending', 'processing')
+
+
+def sla_deadline(submitted_at, update_type):
+    return submitted_at.timestamp() + SLA_HOURS.get(update_type, DEFAULT_SLA_HOURS) * HOUR
+
+
+def priority_key(submitted_at, update_type, risk_score):
+    return sla_deadline(submitted_at, update_type) - RISK_LEAD_SECONDS * (risk_score or 0.0)
+
+
+class IndexedHeap:
+    # Binary min-heap of (key, item) with an item -> position index
+    def __init__(self):
+        self._heap = []
+        self._pos = {}
+
+    def __len__(self):
+        return len(self._heap)
+
+    def __contains__(self, item):
+        return item in self._pos
+
+    def key(self, item):
+        return self._heap[self._pos[item]][0]
+
+    def push(self, item, key):
+        if item in self._pos:
+            self.update(item, key)
+            return
+        self._heap.append((key, item))
+        self._pos[item] = len(self._heap) - 1
+        self._sift_up(len(self._heap) - 1)
+
+    def update(self, item, key):
+        index = self._pos[item]
+        old_key = self._heap[index][0]
+        self._heap[index] = (key, item)
+        if key < old_key:
+            self._sift_up(index)
+        else:
+            self._sift_down(index)
+
+    def remove(self, item):
+        index = self._pos.pop(item, None)
+        if index is None:
+            return False
+        last = self._heap.pop()
+        if index < len(self._heap):
+            self._heap[index] = last
+            self._pos[last[1]] = index
+            self._sift_down(index)
+            self._sift_up(index)
+        return True
+
+    def pop(self):
+        key, item = self._heap[0]
+        self.remove(item)
+        return item, key
+
+    def top(self, n):
+        # Smallest n without popping: walk the heap with a frontier of candidate positions
+        heap = self._heap
+        result = []
+        frontier = [(heap[0], 0)] if heap else []
+        while frontier and len(result) < n:
+            (key, item), index = heapq.heappop(frontier)
+            result.append((key, item))
+            for child in (2 * index + 1, 2 * index + 2):
+                if child < len(heap):
+                    heapq.heappush(frontier, (heap[child], child))
+        return result
+
+    def count_below(self, key, limit=None):
+        # Entries with a smaller key. A subtree whose root is not smaller holds none, so
+        # this visits O(result) nodes; limit caps the walk for very deep queues.
+        heap = self._heap
+        count = 0
+        stack = [0] if heap else []
+        while stack:
+            index = stack.pop()
+            if index >= len(heap) or heap[index][0] >= key:
+                continue
+            count += 1
+            if limit and count >= limit:
+                break
+            stack.append(2 * index + 1)
+            stack.append(2 * index + 2)
+        return count
+
+    def _sift_up(self, index):
+        heap, pos = self._heap, self._pos
+        entry = heap[index]
+        while index > 0:
+            parent = (index - 1) >> 1
+            if heap[parent] <= entry:
+                break
+            heap[index] = heap[parent]
+            pos[heap[index][1]] = index
+            index = parent
+        heap[index] = entry
+        pos[entry[1]] = index
+
+    def _sift_down(self, index):
+        heap, pos = self._heap, self._pos
+        size = len(heap)
+        entry = heap[index]
+        while True:
+            child = 2 * index + 1
+            if child >= size:
+                break
+            if child + 1 < size and heap[child + 1] < heap[child]:
+                child += 1
+            if entry <= heap[child]:
+                break
+            heap[index] = heap[child]
+            pos[heap[index][1]] = index
+            index = child
+        heap[index] = entry
+        pos[entry[1]] = index
+
+
+class ReviewScheduler:
+    def __init__(self):
+        self._queues = {}
+        self._location = {}
+        self._all = IndexedHeap()
+        self._lock = threading.Lock()
+        self.loaded = False
+
+    def rebuild(self, rows):
+        # rows: (id, submitted_at, update_type, risk_score, processing_center_id, assigned_officer_id)
+        queues, location, everything = {}, {}, IndexedHeap()
+        for row_id, submitted_at, update_type, risk_score, center_id, officer_id in rows:
+            queue_key = (center_id, officer_id)
+            key = priority_key(submitted_at or datetime.utcnow(), update_type, risk_score)
+            queues.setdefault(queue_key, IndexedHeap()).push(row_id, key)
+            everything.push(row_id, key)
+            location[row_id] = queue_key
+        with self._lock:
+            self._queues, self._location, self._all = queues, location, everything
+            self.loaded = True
+
+    def upsert(self, update_request):
+        # Places an open request in its (center, officer) queue; closed requests are dropped
+        if update_request.status not in OPEN_STATUSES:
+            self.remove(update_request.id)
+            return
+        queue_key = (update_request.processing_center_id, update_request.assigned_officer_id)
+        key = priority_key(update_request.submitted_at or datetime.utcnow(), update_request.update_type,
+                           update_request.risk_score)
+        with self._lock:
+            previous = self._location.get(update_request.id)
+            if previous is not None and previous != queue_key:
+                self._queues[previous].remove(update_request.id)
+            self._queues.setdefault(queue_key, IndexedHeap()).push(update_request.id, key)
+            self._all.push(update_request.id, key)
+            self._location[update_request.id] = queue_key
+
+    def reassign(self, request_pk, center_id, officer_pk):
+        # Moves a queued request to another (center, officer) queue, keeping its key
+        with self._lock:
+            previous = self._location.get(request_pk)
+            if previous is None or previous == (center_id, officer_pk):
+                return
+            queue = self._queues[previous]
+            key = queue.key(request_pk)
+            queue.remove(request_pk)
+            self._queues.setdefault((center_id, officer_pk), IndexedHeap()).push(request_pk, key)
+            self._location[request_pk] = (center_id, officer_pk)
+
+    def remove(self, request_pk):
+        with self._lock:
+            queue_key = self._location.pop(request_pk, None)
+            if queue_key is not None:
+                self._queues[queue_key].remove(request_pk)
+                self._all.remove(request_pk)
+
+    def position(self, request_pk, limit=None):
+        # (center_id, officer_pk, ahead in own queue, ahead in the center pool), or None
+        with self._lock:
+            queue_key = self._location.get(request_pk)
+            if queue_key is None:
+                return None
+            queue = self._queues[queue_key]
+            key = queue.key(request_pk)
+            ahead = queue.count_below(key, limit)
+            pool_ahead = 0
+            if queue_key[1] is not None:
+                pool = self._queues.get((queue_key[0], None))
+                if pool:
+                    pool_ahead = pool.count_below(key, limit)
+            return queue_key[0], queue_key[1], ahead, pool_ahead
+
+    def next_for_officer(self, officer_pk, center_id, n=10):
+        # The officer's own queue merged with the center's unassigned queue, best first.
+        # Officers without a center (registered to an unknown one) see every open request.
+        with self._lock:
+            if center_id is None:
+                return [item for _, item in self._all.top(n)]
+            candidates = []
+            for queue_key in ((center_id, officer_pk), (center_id, None)):
+                queue = self._queues.get(queue_key)
+                if queue:
+                    candidates.extend(queue.top(n))
+        return [item for _, item in heapq.nsmallest(n, candidates)]
+
+    def stats(self):
+        with self._lock:
+            return {
+                'loaded': self.loaded,
+                'open_requests': len(self._location),
+                'queues': sum(1 for queue in self._queues.values() if len(queue))
+            }
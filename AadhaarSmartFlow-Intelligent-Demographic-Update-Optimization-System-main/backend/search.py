@@ -0,0 +1,158 @@
+# search.py - Full-text search over update requests (SQLite FTS5)
+#
+# request_search is an FTS5 table whose rowid is update_requests.id. It holds
+# the request_id, the applicant's name and the new/old values and rejection
+# reason. Triggers on update_requests and users keep it current, so every
+# write path is covered, including set-based UPDATEs. Queries are ranked by
+# bm25 (stored as the table's rank function) with request_id and name
+# weighted highest. Every search term is matched as a prefix, so 'REQ2026'
+# or 'Kuma' find what an officer expects. By default ranking is bounded to
+# the newest MAX_RANKED_CANDIDATES matches so very common words stay fast on
+# large tables. Callers are told when older matches were left out, and can
+# rank every match instead (candidates=None).
+import logging
+import re
+
+from sqlalchemy import text
+
+logger = logging.getLogger(__name__)
+
+BACKFILL_CHUNK_SIZE = 5000
+MAX_TERMS = 8
+MAX_RANKED_CANDIDATES = 2000
+# bm25 weights, in column order
+COLUMN_WEIGHTS = (10.0, 5.0, 2.0, 1.0, 1.0)
+
+CREATE_TABLE = """
+CREATE VIRTUAL TABLE request_search USING fts5(
+    request_id, applicant_name, new_data, old_data, rejection_reason,
+    tokenize = 'unicode61 remove_diacritics 2',
+    prefix = '2 3 4'
+)
+"""
+
+TRIGGERS = [
+    """
+    CREATE TRIGGER IF NOT EXISTS request_search_insert AFTER INSERT ON update_requests BEGIN
+        INSERT INTO request_search (rowid, request_id, applicant_name, new_data, old_data, rejection_reason)
+        VALUES (new.id, new.request_id, (SELECT name FROM users WHERE aadhaar_id = new.aadhaar_id),
+                new.new_data, new.old_data, new.rejection_reason);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS request_search_update
+    AFTER UPDATE OF request_id, aadhaar_id, new_data, old_data, rejection_reason ON update_requests BEGIN
+        UPDATE request_search SET
+            request_id = new.request_id,
+            applicant_name = (SELECT name FROM users WHERE aadhaar_id = new.aadhaar_id),
+            new_data = new.new_data,
+            old_data = new.old_data,
+            rejection_reason = new.rejection_reason
+        WHERE rowid = new.id;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS request_search_delete AFTER DELETE ON update_requests BEGIN
+        DELETE FROM request_search WHERE rowid = old.id;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS request_search_user_name AFTER UPDATE OF name ON users
+    WHEN old.name IS NOT new.name BEGIN
+        UPDATE request_search SET applicant_name = new.name
+        WHERE rowid IN (SELECT id FROM update_requests WHERE aadhaar_id = new.aadhaar_id);
+    END
+    """,
+]
+
+
+def search_supported(db):
+    # The index is an FTS5 table, so search only exists on SQLite
+    return db.engine.dialect.name == 'sqlite'
+
+
+def create_search_index(db, chunk_size=BACKFILL_CHUNK_SIZE):
+    if not search_supported(db):
+        logger.warning("Full-text search needs SQLite FTS5; skipping search index")
+        return
+
+    with db.engine.begin() as conn:
+        exists = conn.execute(text(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'request_search'")).first()
+        if not exists:
+            conn.execute(text(CREATE_TABLE))
+            weights = ', '.join(str(w) for w in COLUMN_WEIGHTS)
+            conn.execute(text(f"INSERT INTO request_search (request_search, rank) VALUES ('rank', 'bm25({weights})')"))
+        for trigger in TRIGGERS:
+            conn.execute(text(trigger))
+    if exists:
+        return
+
+    # New index: load existing requests in keyset chunks
+    last_id = 0
+    indexed = 0
+    while True:
+        with db.engine.begin() as conn:
+            ids = conn.execute(text(
+                'SELECT id FROM update_requests WHERE id > :last_id ORDER BY id LIMIT :limit'),
+                {'last_id': last_id, 'limit': chunk_size}).scalars().all()
+            if not ids:
+                break
+            conn.execute(text("""
+                INSERT INTO request_search (rowid, request_id, applicant_name, new_data, old_data, rejection_reason)
+                SELECT r.id, r.request_id, u.name, r.new_data, r.old_data, r.rejection_reason
+                FROM update_requests r LEFT JOIN users u ON u.aadhaar_id = r.aadhaar_id
+                WHERE r.id > :last_id AND r.id <= :max_id
+            """), {'last_id': last_id, 'max_id': ids[-1]})
+        last_id = ids[-1]
+        indexed += len(ids)
+    if indexed:
+        logger.info(f"Indexed {indexed} update requests for search")
+
+
+def build_match_query(query):
+    # Free text -> FTS5 query: every word quoted (so AND/OR/NOT are literal) and prefix-matched
+    terms = re.findall(r'\w+', query or '')[:MAX_TERMS]
+    if not terms:
+        return None
+    return ' '.join(f'"{term}"*' for term in terms)
+
+
+def search_requests(db, query, statuses=None, limit=20, offset=0, candidates=MAX_RANKED_CANDIDATES):
+    # Returns ([(update_request_id, score, snippet)] best match first, truncated). Only the
+    # newest `candidates` matches are ranked, or all of them for None: FTS5 streams matches
+    # in rowid order cheaply, but bm25 ranking costs time for every row it scores.
+    # truncated is True when older matches were left out of the ranking.
+    match = build_match_query(query)
+    if match is None:
+        return [], False
+    params = {'match': match, 'limit': limit, 'offset': offset}
+    status_join = status_filter = ''
+    if statuses:
+        status_join = ' JOIN update_requests r ON r.id = request_search.rowid'
+        placeholders = ', '.join(f':status_{i}' for i in range(len(statuses)))
+        status_filter = f' AND r.status IN ({placeholders})'
+        params.update({f'status_{i}': status for i, status in enumerate(statuses)})
+
+    window = ''
+    truncated = False
+    if candidates is not None:
+        # One row past the window tells whether it left any match out
+        newest = db.session.execute(text(f"""
+            SELECT request_search.rowid AS id FROM request_search{status_join}
+            WHERE request_search MATCH :match{status_filter}
+            ORDER BY request_search.rowid DESC LIMIT :window
+        """), dict(params, window=candidates + 1)).scalars().all()
+        if len(newest) > candidates:
+            truncated = True
+            # A rowid range is a constraint FTS5 applies while scanning, so only the candidates get scored
+            window = ' AND request_search.rowid >= :lowest'
+            params['lowest'] = newest[candidates - 1]
+    sql = f"""
+        SELECT request_search.rowid AS id, request_search.rank AS score,
+               snippet(request_search, -1, '[', ']', '...', 12) AS snippet
+        FROM request_search{status_join}
+        WHERE request_search MATCH :match{status_filter}{window}
+        ORDER BY request_search.rank LIMIT :limit OFFSET :offset
+    """
+    return [(row.id, row.score, row.snippet) for row in db.session.execute(text(sql), params)], truncated
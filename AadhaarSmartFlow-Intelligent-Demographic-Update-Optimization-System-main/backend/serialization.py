@@ -0,0 +1,102 @@
+# serialization.py - JSON encoding for API responses
+#
+# FastJSONProvider replaces Flask's stdlib encoder with orjson when it is
+# installed and falls back to the default provider otherwise. stream_json_list
+# encodes large result sets row by row instead of building the whole body.
+import json
+import logging
+from flask import Response, stream_with_context
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+logger = logging.getLogger(__name__)
+
+# Rows encoded per yielded chunk when streaming
+STREAM_CHUNK_ROWS = 200
+# Rows fetched per round trip from the database cursor
+STREAM_FETCH_ROWS = 1000
+
+
+def _stdlib_default(obj):
+    if hasattr(obj, 'isoformat'):
+        return obj.isoformat()
+    return DefaultJSONProvider.default(obj)
+
+
+def encode_json(obj, sort_keys=False, indent=False):
+    if orjson is not None:
+        option = orjson.OPT_NON_STR_KEYS
+        if sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        return orjson.dumps(obj, default=DefaultJSONProvider.default, option=option)
+
+    separators = None if indent else (',', ':')
+    return json.dumps(obj, default=_stdlib_default, sort_keys=sort_keys, indent=2 if indent else None,
+                      separators=separators).encode('utf-8')
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    def dumps(self, obj, **kwargs):
+        if orjson is None:
+            return super().dumps(obj, **kwargs)
+        return encode_json(obj, sort_keys=kwargs.get('sort_keys', self.sort_keys),
+                           indent=bool(kwargs.get('indent'))).decode('utf-8')
+
+    def loads(self, s, **kwargs):
+        if orjson is None or kwargs:
+            return super().loads(s, **kwargs)
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        if orjson is None:
+            return super().response(*args, **kwargs)
+
+        obj = self._prepare_response_obj(args, kwargs)
+        indent = (self.compact is None and self._app.debug) or self.compact is False
+        # Hand the encoded bytes straight to the response, skipping the str round trip
+        body = encode_json(obj, sort_keys=self.sort_keys, indent=indent)
+        return self._app.response_class(body + b'\n', mimetype=self.mimetype)
+
+
+def stream_json_list(key, rows, serialize, extra=None):
+    # Yields {"<key>": [...], "count": n, "success": true} in chunks.
+    # success goes last so a failure part-way through can still be reported.
+    def generate():
+        yield b'{"' + key.encode('utf-8') + b'":['
+        written = 0
+        chunk = []
+        tail = None
+        try:
+            for row in rows:
+                chunk.append(encode_json(serialize(row)))
+                if len(chunk) >= STREAM_CHUNK_ROWS:
+                    yield (b',' if written else b'') + b','.join(chunk)
+                    written += len(chunk)
+                    chunk = []
+        except Exception as e:
+            logger.error(f"Streaming {key} error: {e}")
+            tail = {'success': False, 'error': 'Internal server error'}
+
+        if chunk:
+            yield (b',' if written else b'') + b','.join(chunk)
+            written += len(chunk)
+
+        if tail is None:
+            tail = dict(extra or {}, success=True)
+        tail['count'] = written
+        yield b'],' + encode_json(tail)[1:]
+
+    return generate()
+
+
+def streaming_response(key, query, serialize, extra=None):
+    # query: a Query, fetched STREAM_FETCH_ROWS at a time, or an iterable of rows fetched that way
+    rows = query.yield_per(STREAM_FETCH_ROWS) if hasattr(query, 'yield_per') else query
+    body = stream_json_list(key, rows, serialize, extra)
+    return Response(stream_with_context(body), mimetype='application/json')
@@ -0,0 +1,72 @@
+# serving.py - File responses for stored documents and frontend assets
+#
+# Content-addressed documents never change, so they get a strong ETag (their
+# SHA-256) and a one-year immutable Cache-Control. The bytes can be handed to
+# the front proxy instead of streamed by Python: with DOCUMENT_ACCEL_PREFIX set,
+# nginx serves them via X-Accel-Redirect; with USE_X_SENDFILE, Apache/lighttpd
+# via X-Sendfile. Otherwise send_file uses the server's wsgi.file_wrapper
+# (sendfile where supported). Range requests are honoured on every path.
+import mimetypes
+import os
+
+from flask import current_app, make_response, request, send_file
+
+IMMUTABLE_MAX_AGE = 31536000
+# Precompressed variants tried in order of preference
+PRECOMPRESSED = (('br', '.br'), ('gzip', '.gz'))
+
+
+def send_document(store, digest, download_name):
+    path = store.path(digest)
+    if not os.path.exists(path):
+        return None
+
+    mimetype = mimetypes.guess_type(download_name)[0] or 'application/octet-stream'
+    accel_prefix = current_app.config.get('DOCUMENT_ACCEL_PREFIX')
+
+    if accel_prefix:
+        if request.if_none_match.contains(digest):
+            response = make_response('', 304)
+        else:
+            # nginx maps the prefix onto the store's objects directory and handles Range itself
+            response = make_response('')
+            response.headers['X-Accel-Redirect'] = accel_prefix.rstrip('/') + '/' + os.path.relpath(
+                path, store.objects_dir).replace(os.sep, '/')
+            response.mimetype = mimetype
+        response.set_etag(digest)
+    else:
+        response = send_file(path, mimetype=mimetype, download_name=download_name, etag=digest,
+                             max_age=IMMUTABLE_MAX_AGE, conditional=True)
+
+    # Proofs are personal documents: browsers may keep them, shared caches may not
+    response.cache_control.public = False
+    response.cache_control.private = True
+    response.cache_control.max_age = IMMUTABLE_MAX_AGE
+    response.cache_control.immutable = True
+    return response
+
+
+def send_static_asset(folder, path, immutable=False):
+    full_path = os.path.realpath(os.path.join(folder, path))
+    if not full_path.startswith(os.path.realpath(folder) + os.sep) or not os.path.isfile(full_path):
+        return None
+
+    max_age = IMMUTABLE_MAX_AGE if immutable else 0
+    mimetype = mimetypes.guess_type(path)[0] or 'application/octet-stream'
+    accepted = request.accept_encodings
+
+    for encoding, suffix in PRECOMPRESSED:
+        variant = full_path + suffix
+        if accepted[encoding] and os.path.isfile(variant):
+            response = send_file(variant, mimetype=mimetype, max_age=max_age, conditional=True)
+            response.headers['Content-Encoding'] = encoding
+            break
+    else:
+        response = send_file(full_path, mimetype=mimetype, max_age=max_age, conditional=True)
+
+    response.vary.add('Accept-Encoding')
+    if immutable:
+        response.cache_control.immutable = True
+    else:
+        response.cache_control.no_cache = True
+    return response
@@ -0,0 +1,313 @@
+# simulate.py - Discrete-event capacity simulation of centers and officers
+#
+# Replays synthetic arrivals through the code the submit and review paths
+# run: MLModelManager duplicate and life-event detection, risk scoring and
+# auto-approval, CenterRouter tiers with least-loaded-under-capacity center
+# choice, least-loaded officer assignment, and ReviewScheduler queues that
+# officers serve with next_for_officer. The database is replaced by a stub
+# store of centers, officers and each applicant's recent requests. It holds
+# the same counters the app keeps in processing_centers and officers.
+#
+# Arrivals follow an hourly profile around --daily. Officers work 09:00-18:00,
+# taking reviews with exponential service times around --review-minutes.
+# Every combination of --officers (per center) and --review-minutes is one
+# scenario. Scenarios run in parallel processes with the same seed, so they
+# see the same arrivals. Each reports its queue lengths, wait percentiles,
+# SLA misses and officer utilization.
+#
+#   python simulate.py [--days 30] [--daily 50000] [--centers 200] [--officers 3 4 5]
+import argparse
+import heapq
+import itertools
+import random
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, datetime, timedelta
+from types import SimpleNamespace
+
+from bench_routing import make_address, make_centers
+from routing import CenterRouter
+from scheduler import DEFAULT_SLA_HOURS, HOUR, SLA_HOURS, ReviewScheduler
+
+START = datetime(2026, 1, 5)
+DAY = 24 * HOUR
+SHIFT_HOURS = (9, 18)
+# Share of daily arrivals submitted in each hour of the day
+HOURLY_PROFILE = [1, 1, 1, 1, 1, 2, 3, 5, 7, 9, 10, 10, 9, 9, 9, 8, 7, 6, 5, 4, 3, 2, 2, 1]
+UPDATE_MIX = {
+    'address_change': 45, 'phone_change': 20, 'name_change': 12, 'email_change': 8,
+    'marital_status': 7, 'photo_update': 5, 'biometric_update': 3,
+}
+# Applicants seen recently enough to resubmit, kept for duplicate detection
+RECENT_APPLICANTS = 100000
+RECENT_DAYS = 30
+
+# Event kinds, in the order they run at the same instant
+DONE, SHIFT_START, SHIFT_END, ARRIVAL, SAMPLE = range(5)
+
+
+def new_data_for(rng, update_type):
+    if update_type == 'address_change':
+        return make_address(rng)
+    if update_type == 'marital_status':
+        return rng.choice(['Married', 'Divorced', 'Widowed'])
+    if update_type == 'phone_change':
+        return f'9{rng.randrange(10 ** 9):09d}'
+    if update_type == 'email_change':
+        return f'user{rng.randrange(10 ** 7)}@example.com'
+    if update_type == 'name_change':
+        return rng.choice(['Asha', 'Ravi', 'Meena', 'Arjun', 'Priya']) + ' ' + rng.choice(['Kumar', 'Sharma', 'Rao', 'Iyer'])
+    return f'{update_type} {rng.randrange(10 ** 6)}'
+
+
+def date_of_birth(rng):
+    age = rng.choices([rng.randint(5, 17), rng.randint(18, 60), rng.randint(61, 90)], [10, 75, 15])[0]
+    return date(START.year - age, rng.randint(1, 12), rng.randint(1, 28))
+
+
+class StubStore:
+    # In-memory stand-in for the processing_centers, officers and update_requests rows the submit path reads
+    def __init__(self, rng, centers, officers_per_center, capacity, review_minutes):
+        self.centers = {pk: SimpleNamespace(id=pk, state=state, current_load=0, total_capacity=capacity)
+                        for pk, state, _, _ in centers}
+        self.officers = {}
+        self.staff = {}
+        officer_pk = itertools.count(1)
+        for center_pk in self.centers:
+            for _ in range(officers_per_center):
+                officer = SimpleNamespace(
+                    id=next(officer_pk), center=center_pk, current_workload=0, max_workload=100,
+                    # Officers differ in speed, the way the seeded sample officers do
+                    mean_seconds=review_minutes * 60 * rng.uniform(0.7, 1.4),
+                    on_shift=False, busy=False, busy_seconds=0.0)
+                self.officers[officer.id] = officer
+                self.staff.setdefault(center_pk, []).append(officer)
+        self.idle = {center_pk: set() for center_pk in self.centers}
+        self.recent = {}
+        self.recent_order = deque()
+
+    def recent_requests(self, aadhaar_id, now):
+        # The applicant's requests from the last 30 days, like the existing_requests query
+        history = self.recent.get(aadhaar_id)
+        if not history:
+            return []
+        cutoff = now - RECENT_DAYS * DAY
+        history[:] = [r for r in history if r.at >= cutoff]
+        return history
+
+    def remember(self, update_request):
+        history = self.recent.setdefault(update_request.aadhaar_id, [])
+        if not history:
+            self.recent_order.append(update_request.aadhaar_id)
+            if len(self.recent_order) > RECENT_APPLICANTS:
+                self.recent.pop(self.recent_order.popleft(), None)
+        history.append(update_request)
+
+    def assign_center(self, router, address):
+        # assign_to_processing_center against the stub rows
+        home_state, tiers = router.candidates(address)
+        for tier, center_pks in tiers:
+            open_centers = [self.centers[pk] for pk in center_pks
+                            if self.centers[pk].current_load < self.centers[pk].total_capacity]
+            if open_centers:
+                center = min(open_centers, key=lambda c: c.current_load / c.total_capacity)
+                center.current_load += 1
+                router.record(tier, home_state, center.id)
+                return center
+        center = min(self.centers.values(), key=lambda c: c.current_load)
+        center.current_load += 1
+        router.record('national', home_state, center.id, over_capacity=True)
+        return center
+
+    def assign_officer(self, center):
+        # assign_to_officer: least current_workload under max_workload
+        officers = [o for o in self.staff.get(center.id, ()) if o.current_workload < o.max_workload]
+        if not officers:
+            return None
+        officer = min(officers, key=lambda o: o.current_workload)
+        officer.current_workload += 1
+        return officer
+
+
+def percentile(values, q):
+    return values[min(len(values) - 1, int(q * len(values)))] if values else 0.0
+
+
+def run_scenario(scenario):
+    from app import MLModelManager, routing_address
+
+    # Arrivals and staffing draw from separate streams, so every scenario sees the same arrivals
+    rng, staff_rng = random.Random(scenario['seed']), random.Random(scenario['seed'] + 1)
+    centers = make_centers(rng, scenario['centers'])
+    store = StubStore(staff_rng, centers, scenario['officers'], scenario['capacity'], scenario['review_minutes'])
+    router = CenterRouter(lambda: centers, refresh_seconds=float('inf'))
+    scheduler = ReviewScheduler()
+    scheduler.loaded = True
+    ml = MLModelManager()
+    update_types, update_weights = list(UPDATE_MIX), list(UPDATE_MIX.values())
+    hourly_rate = [scenario['daily'] * w / sum(HOURLY_PROFILE) / HOUR for w in HOURLY_PROFILE]
+
+    end = scenario['days'] * DAY
+    events, sequence = [], itertools.count()
+
+    def schedule(at, kind, payload=None):
+        heapq.heappush(events, (at, kind, next(sequence), payload))
+
+    for day in range(scenario['days']):
+        schedule(day * DAY + SHIFT_HOURS[0] * HOUR, SHIFT_START)
+        schedule(day * DAY + SHIFT_HOURS[1] * HOUR, SHIFT_END)
+    for hour in range(scenario['days'] * 24):
+        schedule(hour * HOUR, SAMPLE)
+    schedule(rng.expovariate(hourly_rate[0]), ARRIVAL)
+
+    open_requests, applicants, request_pk = {}, itertools.count(1), itertools.count(1)
+    counts = dict.fromkeys(('arrivals', 'duplicates', 'auto_approved', 'reviewed', 'sla_missed'), 0)
+    waits, queue_samples, shift_seconds = [], [], 0.0
+
+    def start_review(officer, now):
+        if not officer.on_shift or officer.busy:
+            return
+        picks = scheduler.next_for_officer(officer.id, officer.center, 1)
+        if not picks:
+            store.idle[officer.center].add(officer.id)
+            return
+        scheduler.remove(picks[0])
+        update_request = open_requests.pop(picks[0])
+        duration = staff_rng.expovariate(1 / officer.mean_seconds)
+        officer.busy = True
+        officer.busy_seconds += duration
+        waits.append((now - update_request.at) / HOUR)
+        schedule(now + duration, DONE, (officer, update_request))
+
+    def wake(center_pk, officer, now):
+        # An idle officer picks up work that landed in their queue or the center pool
+        idle = store.idle[center_pk]
+        if officer is not None:
+            if officer.id in idle:
+                idle.discard(officer.id)
+                start_review(officer, now)
+        elif idle:
+            start_review(store.officers[idle.pop()], now)
+
+    while events:
+        now, kind, _, payload = heapq.heappop(events)
+        if kind == ARRIVAL:
+            if now >= end:
+                continue
+            schedule(now + rng.expovariate(hourly_rate[int(now // HOUR) % 24]), ARRIVAL)
+            counts['arrivals'] += 1
+            if store.recent_order and rng.random() < scenario['repeat_rate']:
+                aadhaar_id = store.recent_order[rng.randrange(len(store.recent_order))]
+            else:
+                aadhaar_id = f'{next(applicants):012d}'
+            existing_requests = store.recent_requests(aadhaar_id, now)
+            update_type = rng.choices(update_types, update_weights)[0]
+            if existing_requests and rng.random() < 0.5:
+                update_type, new_data = existing_requests[-1].update_type, existing_requests[-1].new_data
+            else:
+                new_data = new_data_for(rng, update_type)
+            has_documents = rng.random() < scenario['document_rate']
+            update_request = SimpleNamespace(
+                id=next(request_pk), aadhaar_id=aadhaar_id, update_type=update_type, new_data=new_data,
+                documents=['proof.pdf'] if has_documents or rng.random() < 0.5 else [], status='pending',
+                submitted_at=START + timedelta(seconds=now), at=now, risk_score=0.0,
+                processing_center_id=None, assigned_officer_id=None)
+            user = SimpleNamespace(date_of_birth=date_of_birth(rng), address=make_address(rng))
+
+            duplicate = ml.detect_duplicate_rule_based(update_request, existing_requests)['is_duplicate']
+            life_event = ml.detect_life_event(update_request, user)
+            update_request.risk_score = ml.calculate_risk_score(update_request, user, life_event,
+                                                                len(existing_requests))
+            store.remember(update_request)
+            counts['duplicates'] += duplicate
+            if ml.should_auto_approve(update_request.risk_score, life_event, has_documents) and not duplicate:
+                counts['auto_approved'] += 1
+                continue
+
+            center = store.assign_center(router, routing_address(update_request, user))
+            officer = store.assign_officer(center)
+            update_request.processing_center_id = center.id
+            if officer:
+                update_request.assigned_officer_id = officer.id
+                update_request.status = 'processing'
+            open_requests[update_request.id] = update_request
+            scheduler.upsert(update_request)
+            wake(center.id, officer, now)
+        elif kind == DONE:
+            officer, update_request = payload
+            officer.busy = False
+            # The review path decrements the reviewer and releases the center slot
+            officer.current_workload = max(0, officer.current_workload - 1)
+            center = store.centers[update_request.processing_center_id]
+            center.current_load = max(0, center.current_load - 1)
+            counts['reviewed'] += 1
+            turnaround = (now - update_request.at) / HOUR
+            counts['sla_missed'] += turnaround > SLA_HOURS.get(update_request.update_type, DEFAULT_SLA_HOURS)
+            start_review(officer, now)
+        elif kind == SHIFT_START:
+            shift_seconds += (SHIFT_HOURS[1] - SHIFT_HOURS[0]) * HOUR * len(store.officers)
+            for officer in store.officers.values():
+                officer.on_shift = True
+                start_review(officer, now)
+        elif kind == SHIFT_END:
+            for officer in store.officers.values():
+                officer.on_shift = False
+            for idle in store.idle.values():
+                idle.clear()
+        elif kind == SAMPLE:
+            queue_samples.append(len(open_requests))
+
+    waits.sort()
+    routing = router.stats()
+    return {
+        **{key: scenario[key] for key in ('officers', 'review_minutes')},
+        **counts,
+        'open_at_end': len(open_requests),
+        'wait_p50': percentile(waits, 0.5), 'wait_p95': percentile(waits, 0.95), 'wait_p99': percentile(waits, 0.99),
+        'queue_mean': sum(queue_samples) / max(1, len(queue_samples)), 'queue_max': max(queue_samples, default=0),
+        # Reviews started before the end of a shift finish after it, so saturated centers pass 100%
+        'utilization': sum(o.busy_seconds for o in store.officers.values()) / max(1.0, shift_seconds),
+        'over_capacity': routing['over_capacity'], 'cross_state_rate': routing['cross_state_rate'],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--days', type=int, default=30)
+    parser.add_argument('--daily', type=int, default=50000, help='arrivals per day, nationally')
+    parser.add_argument('--centers', type=int, default=200)
+    parser.add_argument('--capacity', type=int, default=1000, help='total_capacity of each center')
+    parser.add_argument('--officers', type=int, nargs='+', default=[3, 4, 5], help='officers per center')
+    parser.add_argument('--review-minutes', type=float, nargs='+', default=[12.0])
+    parser.add_argument('--document-rate', type=float, default=0.7, help='share of requests with verified documents')
+    parser.add_argument('--repeat-rate', type=float, default=0.03, help='share of arrivals from recent applicants')
+    parser.add_argument('--workers', type=int, default=None, help='parallel scenario processes')
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    scenarios = [{
+        'days': args.days, 'daily': args.daily, 'centers': args.centers, 'capacity': args.capacity,
+        'officers': officers, 'review_minutes': minutes, 'document_rate': args.document_rate,
+        'repeat_rate': args.repeat_rate, 'seed': args.seed,
+    } for officers, minutes in itertools.product(args.officers, args.review_minutes)]
+
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=args.workers) as executor:
+        results = list(executor.map(run_scenario, scenarios))
+    print(f"{len(scenarios)} scenarios of {args.days} days at {args.daily}/day over {args.centers} centers "
+          f"in {time.perf_counter() - start:.0f}s")
+
+    for r in results:
+        print(f"\n{r['officers']} officers/center, {r['review_minutes']:g} min/review")
+        print(f"  arrivals {r['arrivals']}  auto-approved {r['auto_approved'] / max(1, r['arrivals']):.1%}  "
+              f"duplicates {r['duplicates']}  reviewed {r['reviewed']}  open at end {r['open_at_end']}")
+        print(f"  wait p50 {r['wait_p50']:.1f}h  p95 {r['wait_p95']:.1f}h  p99 {r['wait_p99']:.1f}h  "
+              f"SLA missed {r['sla_missed'] / max(1, r['reviewed']):.1%}")
+        print(f"  open queue mean {r['queue_mean']:.0f}  max {r['queue_max']}  "
+              f"officer utilization {r['utilization']:.1%}")
+        print(f"  routed over capacity {r['over_capacity']}  cross-state {r['cross_state_rate']:.1%}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,105 @@
+# storage.py - Content-addressed document storage
+#
+# Uploaded bytes are hashed (SHA-256) while Werkzeug writes them to a temp
+# file in the store, so each upload is read exactly once and never held in
+# memory. Committing renames the temp file to objects/<ab>/<cd>/<sha256>.
+# The rename is atomic; if that object already exists, the temp file is
+# discarded and the stored copy is shared.
+import hashlib
+import os
+import re
+import tempfile
+
+from flask import Request
+
+CHUNK_SIZE = 64 * 1024
+DIGEST_PATTERN = re.compile(r'^[0-9a-f]{64}$')
+
+
+class HashingTempFile:
+    def __init__(self, directory):
+        fd, self.path = tempfile.mkstemp(dir=directory, prefix='upload-')
+        self._file = os.fdopen(fd, 'w+b')
+        self._hash = hashlib.sha256()
+        self.size = 0
+        self.committed = False
+
+    def write(self, data):
+        self._hash.update(data)
+        self.size += len(data)
+        return self._file.write(data)
+
+    def hexdigest(self):
+        return self._hash.hexdigest()
+
+    def close(self):
+        if not self._file.closed:
+            self._file.close()
+        if not self.committed:
+            try:
+                os.unlink(self.path)
+            except FileNotFoundError:
+                pass
+
+    def __getattr__(self, name):
+        return getattr(self._file, name)
+
+    def __iter__(self):
+        return iter(self._file)
+
+
+class ContentStore:
+    def __init__(self, root):
+        self.root = root
+        self.objects_dir = os.path.join(root, 'objects')
+        self.tmp_dir = os.path.join(root, 'tmp')
+        os.makedirs(self.objects_dir, exist_ok=True)
+        os.makedirs(self.tmp_dir, exist_ok=True)
+
+    def path(self, digest):
+        return os.path.join(self.objects_dir, digest[:2], digest[2:4], digest)
+
+    def exists(self, digest):
+        return os.path.exists(self.path(digest))
+
+    def temp_file(self):
+        return HashingTempFile(self.tmp_dir)
+
+    def write_stream(self, stream):
+        # For bodies that did not come through the multipart parser
+        temp = self.temp_file()
+        try:
+            while True:
+                chunk = stream.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                temp.write(chunk)
+            return self.commit(temp)
+        finally:
+            temp.close()
+
+    def commit(self, temp):
+        # Returns (digest, size, created); created is False when the content was already stored
+        temp.flush()
+        os.fsync(temp.fileno())
+        digest = temp.hexdigest()
+        target = self.path(digest)
+
+        if os.path.exists(target):
+            return digest, temp.size, False
+
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        temp._file.close()
+        os.replace(temp.path, target)
+        temp.committed = True
+        return digest, temp.size, True
+
+
+class StoreRequest(Request):
+    # Multipart file parts are spooled straight into the content store's temp dir
+    content_store = None
+
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        if self.content_store is None:
+            return super()._get_file_stream(total_content_length, content_type, filename, content_length)
+        return self.content_store.temp_file()
@@ -0,0 +1,5 @@
+# Backend modules are imported top-level (python app.py runs from backend/)
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
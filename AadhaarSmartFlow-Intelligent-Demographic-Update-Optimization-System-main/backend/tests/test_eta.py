@@ -0,0 +1,36 @@
+import math
+from datetime import datetime, timedelta
+
+import pytest
+
+from eta import DecayedRate
+
+HALF_LIFE = 12 * 3600.0
+
+
+def test_decayed_rate_settles_at_stream_rate():
+    rate = DecayedRate()
+    start = datetime(2024, 1, 1)
+    # Four reviews an hour for long enough that the start-up transient is gone
+    for i in range(4 * 24 * 10):
+        rate.add(start + timedelta(minutes=15 * i), HALF_LIFE)
+    now = start + timedelta(minutes=15 * (4 * 24 * 10 - 1))
+    assert rate.per_hour(now, HALF_LIFE) == pytest.approx(4.0, rel=0.02)
+
+
+def test_decayed_rate_decays_while_idle():
+    rate = DecayedRate()
+    at = datetime(2024, 1, 1)
+    rate.add(at, HALF_LIFE)
+    fresh = rate.per_hour(at, HALF_LIFE)
+    assert fresh == pytest.approx(math.log(2) / 12)
+    assert rate.per_hour(at + timedelta(hours=12), HALF_LIFE) == pytest.approx(fresh / 2)
+
+
+def test_decayed_rate_counts_late_events_without_going_back():
+    rate = DecayedRate()
+    at = datetime(2024, 1, 1)
+    rate.add(at, HALF_LIFE)
+    rate.add(at - timedelta(hours=1), HALF_LIFE)
+    assert rate.count == 2.0
+    assert rate.updated_at == at.timestamp()
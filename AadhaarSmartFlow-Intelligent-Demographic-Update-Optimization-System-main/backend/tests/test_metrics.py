@@ -0,0 +1,58 @@
+import random
+import statistics
+
+import pytest
+
+from metrics import DecayedRatio, RunningStats
+
+HALF_LIFE = 3600.0
+
+
+def test_running_stats_merge_matches_single_pass():
+    rng = random.Random(3)
+    values = [rng.uniform(0, 200) for _ in range(500)]
+    single = RunningStats()
+    for value in values:
+        single.add(value)
+    merged = RunningStats()
+    for start in range(0, len(values), 37):
+        part = RunningStats()
+        for value in values[start:start + 37]:
+            part.add(value)
+        merged.merge(part)
+    assert merged.n == single.n == len(values)
+    assert merged.mean == pytest.approx(statistics.mean(values))
+    assert merged.m2 == pytest.approx(single.m2)
+    assert merged.stddev() == pytest.approx(statistics.stdev(values))
+
+
+def test_running_stats_merge_with_empty():
+    stats = RunningStats()
+    stats.merge(RunningStats())
+    assert stats.n == 0 and stats.stddev() == 0.0
+    other = RunningStats()
+    other.add(4.0)
+    stats.merge(other)
+    assert (stats.n, stats.mean) == (1, 4.0)
+
+
+def test_decayed_ratio_halves_per_half_life():
+    ratio = DecayedRatio()
+    ratio.add(True, 0.0, HALF_LIFE)
+    ratio.add(False, HALF_LIFE, HALF_LIFE)
+    # The hit is one half-life old: 0.5 / (0.5 + 1)
+    assert ratio.ratio() == pytest.approx(1 / 3)
+    assert DecayedRatio().ratio() is None
+
+
+def test_decayed_ratio_merge_matches_single_stream():
+    events = [(i % 3 != 0, i * 900.0) for i in range(40)]
+    single = DecayedRatio()
+    for hit, at in events:
+        single.add(hit, at, HALF_LIFE)
+    first, second = DecayedRatio(), DecayedRatio()
+    for hit, at in events:
+        (first if at % 1800 else second).add(hit, at, HALF_LIFE)
+    first.merge(second, HALF_LIFE)
+    assert first.total == pytest.approx(single.total)
+    assert first.ratio() == pytest.approx(single.ratio())
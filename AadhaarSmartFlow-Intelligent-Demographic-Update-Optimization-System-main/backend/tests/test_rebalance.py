@@ -0,0 +1,69 @@
+from rebalance import Worker, plan_transfers
+
+
+def moved(transfers, donor, receiver):
+    return sum(count for (source, target), count in transfers.items() if source == donor and target == receiver)
+
+
+def test_moves_work_off_an_overloaded_officer():
+    workers = [Worker(1, 10, backlog=30, rate=1.0, capacity=50, active=True),
+               Worker(1, 11, backlog=0, rate=1.0, capacity=50, active=True)]
+    transfers = plan_transfers(workers)
+    assert moved(transfers, (1, 10), 11) == 15
+    assert workers[0].backlog == workers[1].backlog == 15
+
+
+def test_inactive_officer_is_drained_and_balanced_center_untouched():
+    workers = [Worker(1, 10, backlog=2, rate=0.0, capacity=50, active=False),
+               Worker(1, 11, backlog=1, rate=1.0, capacity=50, active=True),
+               Worker(1, 12, backlog=1, rate=1.0, capacity=50, active=True)]
+    transfers = plan_transfers(workers)
+    assert sum(transfers.values()) == 2
+    assert workers[0].backlog == 0
+    assert plan_transfers([Worker(1, 11, 4, 1.0, 50, True), Worker(1, 12, 4, 1.0, 50, True)]) == {}
+
+
+def test_respects_capacity_and_limit():
+    workers = [Worker(1, 10, backlog=100, rate=1.0, capacity=0, active=True),
+               Worker(1, 11, backlog=0, rate=1.0, capacity=3, active=True)]
+    assert moved(plan_transfers(workers), (1, 10), 11) == 3
+    workers = [Worker(1, 10, backlog=100, rate=1.0, capacity=0, active=True),
+               Worker(1, 11, backlog=0, rate=1.0, capacity=100, active=True)]
+    assert sum(plan_transfers(workers, limit=5).values()) == 5
+
+
+def test_moves_across_centers():
+    workers = [Worker(1, None, backlog=40, rate=0.0, capacity=0, active=False),
+               Worker(1, 10, backlog=0, rate=1.0, capacity=50, active=True),
+               Worker(2, 20, backlog=0, rate=1.0, capacity=50, active=True)]
+    transfers = plan_transfers(workers)
+    assert moved(transfers, (1, None), 20) > 0
+
+
+def test_lightly_loaded_center_keeps_its_work():
+    # A Delhi officer with a short queue next to an idle Mumbai officer
+    workers = [Worker(1, 10, backlog=3, rate=1.0, capacity=97, active=True),
+               Worker(2, 20, backlog=0, rate=1.0, capacity=100, active=True)]
+    assert plan_transfers(workers, states={1: 'delhi', 2: 'maharashtra'}) == {}
+
+
+def test_cross_center_moves_stay_in_state():
+    def workers():
+        return [Worker(1, None, backlog=40, rate=0.0, capacity=0, active=False),
+                Worker(1, 10, backlog=0, rate=1.0, capacity=0, active=True),
+                Worker(2, 20, backlog=0, rate=1.0, capacity=50, active=True),
+                Worker(3, 30, backlog=0, rate=1.0, capacity=50, active=True)]
+    transfers = plan_transfers(workers(), states={1: 'karnataka', 2: 'delhi', 3: 'karnataka'})
+    assert moved(transfers, (1, None), 30) > 0 and moved(transfers, (1, None), 20) == 0
+    # With no receiver in the state, work may leave it
+    transfers = plan_transfers(workers(), states={1: 'karnataka', 2: 'delhi', 3: 'kerala'})
+    assert moved(transfers, (1, None), 20) + moved(transfers, (1, None), 30) > 0
+
+
+def test_cross_center_receivers_nearest_first():
+    workers = [Worker(1, None, backlog=40, rate=0.0, capacity=0, active=False),
+               Worker(1, 10, backlog=0, rate=1.0, capacity=0, active=True),
+               Worker(2, 20, backlog=0, rate=1.0, capacity=50, active=True),
+               Worker(3, 30, backlog=0, rate=1.0, capacity=50, active=True)]
+    transfers = plan_transfers(workers, nearness=lambda source, target: {2: 3, 3: 0}[target])
+    assert moved(transfers, (1, None), 30) >= moved(transfers, (1, None), 20) > 0
@@ -0,0 +1,45 @@
+import pytest
+
+from routing import CenterRouter, extract_pin
+
+
+@pytest.mark.parametrize('text, pin', [
+    ('12 MG Road, Bengaluru 560001', '560001'),
+    ('Flat 4, Sector 5, Delhi - 110 017', '110017'),
+    ('PIN 400001, old 560001', '560001'),
+    ('Phone 9876543210', None),
+    ('Plot 012345', None),
+    ('', None),
+    (None, None),
+])
+def test_extract_pin(text, pin):
+    assert extract_pin(text) == pin
+
+
+CENTERS = [
+    (1, 'Karnataka', 'Bengaluru', '560001'),
+    (2, 'Karnataka', 'Mysuru', '570001'),
+    (3, 'Tamil Nadu', 'Chennai', '600001'),
+    (4, 'Delhi', 'New Delhi', '110001'),
+]
+
+
+def test_candidates_widen_by_tier():
+    router = CenterRouter(lambda: CENTERS)
+    state, tiers = router.candidates('5 Residency Road, Bengaluru 560025')
+    assert state == 'karnataka'
+    assert tiers == [('district', (1,)), ('state', (1, 2)), ('zone', (1, 2)), ('national', (1, 2, 3, 4))]
+
+
+def test_candidates_by_state_name_and_unlocated():
+    router = CenterRouter(lambda: CENTERS)
+    assert router.candidates('Anna Nagar, Chennai, Tamil Nadu') == \
+        ('tamil nadu', [('state', (3,)), ('national', (1, 2, 3, 4))])
+    assert router.candidates('somewhere') == (None, [('national', (1, 2, 3, 4))])
+    assert router.unlocated == 1
+
+
+def test_tier_between_centers():
+    router = CenterRouter(lambda: CENTERS + [(5, 'Karnataka', 'Bengaluru', '560100'),
+                                             (6, 'Andhra Pradesh', 'Anantapur', '515001')])
+    assert [router.tier(1, other) for other in (5, 2, 6, 3)] == [0, 1, 2, 3]
@@ -0,0 +1,60 @@
+import random
+
+from scheduler import IndexedHeap
+
+
+def build(keys):
+    heap = IndexedHeap()
+    for item, key in enumerate(keys):
+        heap.push(item, key)
+    return heap
+
+
+def test_count_below_matches_brute_force():
+    rng = random.Random(7)
+    keys = [rng.randint(0, 50) for _ in range(300)]
+    heap = build(keys)
+    # Updates and removals must keep the heap property count_below relies on
+    for item in rng.sample(range(300), 60):
+        keys[item] = rng.randint(0, 50)
+        heap.update(item, keys[item])
+    for item in rng.sample(range(300), 40):
+        heap.remove(item)
+        keys[item] = None
+    live = [key for key in keys if key is not None]
+    for probe in range(-1, 53):
+        assert heap.count_below(probe) == sum(1 for key in live if key < probe)
+
+
+def test_count_below_limit_and_empty():
+    heap = build(range(100))
+    assert heap.count_below(50, limit=10) == 10
+    assert heap.count_below(5, limit=10) == 5
+    assert IndexedHeap().count_below(10) == 0
+
+
+def test_top_is_sorted_without_popping():
+    keys = [5, 3, 9, 1, 7]
+    heap = build(keys)
+    assert [key for key, _ in heap.top(3)] == [1, 3, 5]
+    assert len(heap) == 5
+
+
+def test_officer_without_center_reviews_from_every_queue():
+    from datetime import datetime, timedelta
+    from types import SimpleNamespace
+
+    from scheduler import ReviewScheduler
+
+    scheduler = ReviewScheduler()
+    start = datetime(2024, 1, 1)
+    rows = [(pk, start + timedelta(hours=pk), 'address_change', 0.0, pk % 3, pk % 2 or None) for pk in range(1, 13)]
+    scheduler.rebuild(rows)
+    assert scheduler.next_for_officer(99, None, 4) == [1, 2, 3, 4]
+    scheduler.remove(2)
+    scheduler.upsert(SimpleNamespace(id=12, status='pending', processing_center_id=0, assigned_officer_id=None,
+                                     submitted_at=start - timedelta(hours=1), update_type='address_change',
+                                     risk_score=0.0))
+    scheduler.reassign(3, 1, 5)
+    assert scheduler.next_for_officer(99, None, 4) == [12, 1, 3, 4]
+    assert scheduler.next_for_officer(5, 1, 2) == [3, 4]
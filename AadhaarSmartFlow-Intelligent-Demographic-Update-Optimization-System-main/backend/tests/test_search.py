@@ -0,0 +1,16 @@
+from search import MAX_TERMS, build_match_query
+
+
+def test_terms_are_quoted_and_prefix_matched():
+    assert build_match_query('ravi kumar') == '"ravi"* "kumar"*'
+
+
+def test_operators_and_punctuation_are_literal():
+    assert build_match_query('NOT "x" OR y-z') == '"NOT"* "x"* "OR"* "y"* "z"*'
+
+
+def test_empty_and_long_queries():
+    assert build_match_query('') is None
+    assert build_match_query('  ?! ') is None
+    assert build_match_query(None) is None
+    assert build_match_query(' '.join(f'w{i}' for i in range(20))).count('*') == MAX_TERMS
@@ -0,0 +1,263 @@
+# timeseries.py - Hourly, daily and monthly request counts for analytics charts
+#
+# request_rollups counts request events in time buckets. There is one row
+# per (tier, event, bucket, update_type, status, center, auto_approved,
+# is_duplicate). The events are:
+#
+#   submitted  a request arrived; status is where submission left it
+#              (auto_approved, duplicate, processing or pending)
+#   completed  a request was closed; status is approved, rejected or
+#              auto_approved
+#
+# Each event is counted into its hour, day and month bucket together, so a
+# chart at any granularity is one range scan of the primary key, which
+# leads with (tier, event, bucket). compact() drops hour buckets after
+# HOURLY_RETENTION_DAYS and day buckets after DAILY_RETENTION_DAYS. Month
+# buckets are kept for good. The day tier keeps just over two years.
+#
+# As in MetricsEngine, each worker keeps pending deltas in memory. A
+# background thread adds them to the table every FLUSH_INTERVAL_SECONDS as
+# count = count + delta, so workers never overwrite each other. Reads add
+# the pending deltas, so a worker sees its own events at once. rebuild()
+# recomputes every tier from update_requests and archived_requests.
+import logging
+import threading
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import func, insert
+
+logger = logging.getLogger(__name__)
+
+TIERS = ('hour', 'day', 'month')
+EVENTS = ('submitted', 'completed')
+GROUPABLE = ('update_type', 'status', 'center_id', 'auto_approved', 'is_duplicate')
+KEY_FIELDS = ('tier', 'event', 'bucket') + GROUPABLE
+CLOSED_STATUSES = ('approved', 'rejected', 'auto_approved')
+FLUSH_INTERVAL_SECONDS = 30
+COMPACT_INTERVAL_SECONDS = 3600
+HOURLY_RETENTION_DAYS = 31
+DAILY_RETENTION_DAYS = 800
+REBUILD_CHUNK_SIZE = 5000
+RETENTION_DAYS = {'hour': HOURLY_RETENTION_DAYS, 'day': DAILY_RETENTION_DAYS, 'month': None}
+
+
+def bucket_start(tier, at):
+    if tier == 'hour':
+        return at.replace(minute=0, second=0, microsecond=0)
+    if tier == 'day':
+        return at.replace(hour=0, minute=0, second=0, microsecond=0)
+    return at.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+
+
+def submitted_status(status, auto_approved, processing_center_id, assigned_officer_id):
+    # Where submission left a request, for rows whose status has moved on since
+    if auto_approved:
+        return 'auto_approved'
+    if status == 'duplicate':
+        return 'duplicate'
+    return 'processing' if assigned_officer_id else 'pending'
+
+
+class RollupStore:
+    def __init__(self, app, db, rollup_model, request_model, archive_model=None):
+        self.app = app
+        self.db = db
+        self.Rollup = rollup_model
+        self.Request = request_model
+        self.Archive = archive_model
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._start_lock = threading.Lock()
+        self._thread = None
+        self._compacted_at = None
+        self.flushes = 0
+        self.compacted = 0
+
+    @staticmethod
+    def keys(event, at, update_type, status, center_id, auto_approved, is_duplicate):
+        return [(tier, event, bucket_start(tier, at), update_type, status or '', center_id or 0,
+                 bool(auto_approved), bool(is_duplicate)) for tier in TIERS]
+
+    def record(self, event, at, update_type, status, center_id=None, auto_approved=False, is_duplicate=False):
+        keys = self.keys(event, at, update_type, status, center_id, auto_approved, is_duplicate)
+        with self._lock:
+            for key in keys:
+                self._pending[key] = self._pending.get(key, 0) + 1
+        self._ensure_worker()
+
+    def record_request(self, update_request, event):
+        # Call after commit, with the request as submitted or as closed
+        at = (update_request.submitted_at if event == 'submitted' else update_request.completed_at) \
+            or datetime.utcnow()
+        self.record(event, at, update_request.update_type, update_request.status,
+                    update_request.processing_center_id, update_request.auto_approved, update_request.is_duplicate)
+
+    def _ensure_worker(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._start_lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='rollup-flush', daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            time.sleep(FLUSH_INTERVAL_SECONDS)
+            try:
+                self.flush()
+                if self._compacted_at is None or time.monotonic() - self._compacted_at >= COMPACT_INTERVAL_SECONDS:
+                    self.compact()
+            except Exception as e:
+                logger.error(f"Rollup flush error: {e}")
+
+    def flush(self):
+        with self._flush_lock:
+            with self._lock:
+                pending, self._pending = self._pending, {}
+            if not pending:
+                return 0
+            try:
+                with self.app.app_context():
+                    try:
+                        self._add(pending)
+                        self.db.session.commit()
+                    except Exception:
+                        self.db.session.rollback()
+                        raise
+            except Exception:
+                # Put the deltas back so the next flush retries them
+                with self._lock:
+                    for key, count in pending.items():
+                        self._pending[key] = self._pending.get(key, 0) + count
+                raise
+            self.flushes += 1
+            return len(pending)
+
+    def _add(self, counts):
+        Rollup, session = self.Rollup, self.db.session
+        for key, count in counts.items():
+            tier, event, bucket, update_type, status, center_id, auto_approved, is_duplicate = key
+            updated = session.query(Rollup).filter(
+                Rollup.tier == tier, Rollup.event == event, Rollup.bucket == bucket,
+                Rollup.update_type == update_type, Rollup.status == status, Rollup.center_id == center_id,
+                Rollup.auto_approved.is_(auto_approved), Rollup.is_duplicate.is_(is_duplicate)
+            ).update({'count': Rollup.count + count}, synchronize_session=False)
+            if not updated:
+                session.add(Rollup(tier=tier, event=event, bucket=bucket, update_type=update_type, status=status,
+                                   center_id=center_id, auto_approved=auto_approved, is_duplicate=is_duplicate,
+                                   count=count))
+
+    def compact(self, now=None):
+        # Deletes hour and day buckets past their retention; returns the rows removed
+        now = now or datetime.utcnow()
+        removed = 0
+        with self._flush_lock, self.app.app_context():
+            for tier, days in RETENTION_DAYS.items():
+                if days is None:
+                    continue
+                removed += self.db.session.query(self.Rollup).filter(
+                    self.Rollup.tier == tier, self.Rollup.bucket < bucket_start(tier, now - timedelta(days=days))
+                ).delete(synchronize_session=False)
+            self.db.session.commit()
+        self._compacted_at = time.monotonic()
+        self.compacted += removed
+        return removed
+
+    def query(self, tier, start, end, event='completed', group_by=None, **filters):
+        # [{'bucket', group_by value if grouped, 'count'}] for buckets in [start, end), oldest first
+        Rollup = self.Rollup
+        start = bucket_start(tier, start)
+        columns = [Rollup.bucket] + ([getattr(Rollup, group_by)] if group_by else [])
+        query = self.db.session.query(*columns, func.sum(Rollup.count)).filter(
+            Rollup.tier == tier, Rollup.event == event, Rollup.bucket >= start, Rollup.bucket < end)
+        for name, value in filters.items():
+            query = query.filter(getattr(Rollup, name) == value)
+        counts = {tuple(row[:-1]): row[-1] for row in query.group_by(*columns)}
+
+        with self._lock:
+            pending = list(self._pending.items())
+        for key, count in pending:
+            values = dict(zip(KEY_FIELDS, key))
+            if values['tier'] != tier or values['event'] != event or not start <= values['bucket'] < end:
+                continue
+            if any(values[name] != value for name, value in filters.items()):
+                continue
+            point = (values['bucket'],) + ((values[group_by],) if group_by else ())
+            counts[point] = counts.get(point, 0) + count
+
+        series = []
+        for point in sorted(counts, key=lambda p: (p[0], str(p[1:]))):
+            entry = {'bucket': point[0].isoformat(), 'count': counts[point]}
+            if group_by:
+                entry[group_by] = point[1]
+            series.append(entry)
+        return series
+
+    def rebuild(self, chunk_size=REBUILD_CHUNK_SIZE):
+        # Recomputes every tier from the request tables; returns the requests counted
+        now = datetime.utcnow()
+        cutoffs = {tier: bucket_start(tier, now - timedelta(days=days)) if days else None
+                   for tier, days in RETENTION_DAYS.items()}
+        counts, total = {}, 0
+
+        def count(event, at, *dimensions):
+            for key in self.keys(event, at, *dimensions):
+                if cutoffs[key[0]] is None or key[2] >= cutoffs[key[0]]:
+                    counts[key] = counts.get(key, 0) + 1
+
+        with self._flush_lock, self.app.app_context():
+            with self._lock:
+                self._pending = {}
+            Request = self.Request
+            last_id = 0
+            while True:
+                rows = self.db.session.query(
+                    Request.id, Request.submitted_at, Request.completed_at, Request.update_type, Request.status,
+                    Request.processing_center_id, Request.assigned_officer_id, Request.auto_approved,
+                    Request.is_duplicate
+                ).filter(Request.id > last_id).order_by(Request.id).limit(chunk_size).all()
+                if not rows:
+                    break
+                for row in rows:
+                    self._count_row(count, row, row.auto_approved, row.is_duplicate)
+                last_id = rows[-1].id
+                total += len(rows)
+
+            Archive = self.Archive
+            last_id = 0
+            while Archive is not None:
+                rows = self.db.session.query(
+                    Archive.id, Archive.submitted_at, Archive.completed_at, Archive.update_type, Archive.status,
+                    Archive.processing_center_id, Archive.assigned_officer_id, Archive.record
+                ).filter(Archive.id > last_id).order_by(Archive.id).limit(chunk_size).all()
+                if not rows:
+                    break
+                for row in rows:
+                    self._count_row(count, row, row.record.get('auto_approved'), row.record.get('is_duplicate'))
+                last_id = rows[-1].id
+                total += len(rows)
+
+            self.db.session.query(self.Rollup).delete(synchronize_session=False)
+            rows = [dict(zip(KEY_FIELDS, key), count=n) for key, n in counts.items()]
+            for start in range(0, len(rows), chunk_size):
+                self.db.session.execute(insert(self.Rollup), rows[start:start + chunk_size])
+            self.db.session.commit()
+        logger.info(f"Rebuilt request rollups from {total} requests")
+        return total
+
+    @staticmethod
+    def _count_row(count, row, auto_approved, is_duplicate):
+        if row.submitted_at:
+            status = submitted_status(row.status, auto_approved, row.processing_center_id, row.assigned_officer_id)
+            count('submitted', row.submitted_at, row.update_type, status, row.processing_center_id,
+                  auto_approved, is_duplicate)
+        if row.completed_at and row.status in CLOSED_STATUSES:
+            count('completed', row.completed_at, row.update_type, row.status, row.processing_center_id,
+                  auto_approved, is_duplicate)
+
+    def stats(self):
+        with self._lock:
+            pending = len(self._pending)
+        return {'pending': pending, 'flushes': self.flushes, 'compacted': self.compacted}
@@ -0,0 +1,232 @@
+# transitions.py - Append-only change log of request state transitions
+#
+# update_requests is overwritten in place, so the only history of a request
+# is free-text audit details. TransitionLog appends one row to
+# request_transitions whenever a request's status, center or officer
+# changes. Rows are written in the same transaction as the change, so the
+# log holds a committed change exactly when the table does. Each row is a
+# few integers: seq, the request's primary key, the from and to status as
+# STATUS_CODES, the center and officer after the change, and a timestamp.
+#
+# seq comes from an AUTOINCREMENT key. SQLite has a single writer, so seq
+# order is commit order and ids are never reused after a delete. A consumer
+# that has read up to seq N has seen every change up to N. ORM flushes are
+# captured by mapper events on UpdateRequest. Bulk UPDATEs bypass those, so
+# they call append() themselves (the Rebalancer does).
+#
+# Consumers read with read(after=seq). Durable consumers keep their offset
+# in transition_offsets and advance it with consume(), which is
+# at-least-once: handlers must be idempotent. Followers registered with
+# follow() keep their offset in memory, start from the head and are polled
+# by a background thread. Each worker uses one to apply other workers'
+# changes to its own caches and review queues.
+#
+# compact() keeps only the newest entry of each request among entries
+# older than COMPACT_AFTER_DAYS that every durable consumer has passed.
+# replay() from 0 therefore still yields every request's latest state, and
+# the full history of the recent window.
+import logging
+import threading
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import event, exists, func, insert
+from sqlalchemy.orm import aliased
+
+logger = logging.getLogger(__name__)
+
+# Codes are stored, so existing codes must never change; add new statuses at the end
+STATUS_CODES = {None: 0, 'pending': 1, 'processing': 2, 'review': 3, 'auto_approved': 4, 'approved': 5,
+                'rejected': 6, 'duplicate': 7}
+STATUSES = {code: status for status, code in STATUS_CODES.items()}
+TRACKED_FIELDS = ('status', 'processing_center_id', 'assigned_officer_id')
+READ_LIMIT = 1000
+TAIL_INTERVAL_SECONDS = 1
+COMPACT_INTERVAL_SECONDS = 3600
+COMPACT_AFTER_DAYS = 30
+COMPACT_BATCH_SIZE = 5000
+
+
+def entry(request_pk, from_status, to_status, center_id=None, officer_id=None, at=None):
+    # A row for request_transitions
+    return {'request_pk': request_pk, 'from_status': STATUS_CODES[from_status],
+            'to_status': STATUS_CODES[to_status], 'center_id': center_id, 'officer_id': officer_id,
+            'at': at or datetime.utcnow()}
+
+
+def decode(row):
+    return {'seq': row.seq, 'request_pk': row.request_pk, 'from_status': STATUSES.get(row.from_status),
+            'to_status': STATUSES.get(row.to_status), 'center_id': row.center_id, 'officer_id': row.officer_id,
+            'at': row.at.isoformat() if row.at else None}
+
+
+class TransitionLog:
+    def __init__(self, app, db, transition_model, offset_model, request_model, interval=TAIL_INTERVAL_SECONDS,
+                 compact_after_days=COMPACT_AFTER_DAYS):
+        self.app = app
+        self.db = db
+        self.Transition = transition_model
+        self.Offset = offset_model
+        self.Request = request_model
+        self.interval = interval
+        self.compact_after_days = compact_after_days
+        self._followers = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self._compacted_at = None
+        self.captured = 0
+        self.delivered = 0
+        self.compacted = 0
+
+    def capture(self):
+        # Logs every flushed change to a request's status or assignment; call once at import
+        table = self.Transition.__table__
+
+        @event.listens_for(self.Request, 'after_insert')
+        def request_inserted(mapper, connection, target):
+            connection.execute(insert(table).values(entry(
+                target.id, None, target.status, target.processing_center_id, target.assigned_officer_id)))
+            self.captured += 1
+
+        @event.listens_for(self.Request, 'after_update')
+        def request_updated(mapper, connection, target):
+            state = self.db.inspect(target)
+            if not any(state.attrs[field].history.has_changes() for field in TRACKED_FIELDS):
+                return
+            history = state.attrs.status.history
+            previous = history.deleted[0] if history.deleted else target.status
+            connection.execute(insert(table).values(entry(
+                target.id, previous, target.status, target.processing_center_id, target.assigned_officer_id)))
+            self.captured += 1
+
+    def append(self, session, entries):
+        # For writes that bypass the ORM; runs in the caller's transaction, which commits it
+        if entries:
+            session.execute(insert(self.Transition), entries)
+            self.captured += len(entries)
+
+    def head(self):
+        return self.db.session.query(func.max(self.Transition.seq)).scalar() or 0
+
+    def read(self, after=0, limit=READ_LIMIT, request_pk=None):
+        # Entries with seq > after, oldest first
+        Transition = self.Transition
+        query = self.db.session.query(Transition).filter(Transition.seq > after)
+        if request_pk is not None:
+            query = query.filter(Transition.request_pk == request_pk)
+        return [decode(row) for row in query.order_by(Transition.seq).limit(limit)]
+
+    def offset(self, consumer):
+        row = self.db.session.get(self.Offset, consumer)
+        return row.seq if row else 0
+
+    def consume(self, consumer, handler, limit=READ_LIMIT):
+        # Hands the next entries past the consumer's stored offset to handler, then stores the new offset
+        entries = self.read(self.offset(consumer), limit)
+        if not entries:
+            return 0
+        handler(entries)
+        row = self.db.session.get(self.Offset, consumer)
+        if row is None:
+            row = self.Offset(consumer=consumer)
+            self.db.session.add(row)
+        row.seq = entries[-1]['seq']
+        row.updated_at = datetime.utcnow()
+        self.db.session.commit()
+        return len(entries)
+
+    def replay(self, handler, after=0, limit=READ_LIMIT):
+        # Feeds every entry past after to handler in batches; returns the entries replayed
+        replayed = 0
+        while True:
+            entries = self.read(after, limit)
+            if not entries:
+                return replayed
+            handler(entries)
+            replayed += len(entries)
+            after = entries[-1]['seq']
+
+    def follow(self, name, handler):
+        # handler(entries) is called from the background thread with every new entry
+        with self._lock:
+            self._followers[name] = [handler, None]
+
+    def start(self):
+        if not self.interval or (self._thread is not None and self._thread.is_alive()):
+            return
+        with self.app.app_context():
+            head = self.head()
+        with self._lock:
+            for follower in self._followers.values():
+                if follower[1] is None:
+                    follower[1] = head
+        self._thread = threading.Thread(target=self._run, name='transition-log', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.poll()
+                if self._compacted_at is None or time.monotonic() - self._compacted_at >= COMPACT_INTERVAL_SECONDS:
+                    self.compact()
+            except Exception as e:
+                logger.error(f"Transition log error: {e}")
+
+    def poll(self):
+        # Delivers new entries to each follower; returns the entries delivered
+        delivered = 0
+        with self.app.app_context():
+            with self._lock:
+                followers = list(self._followers.values())
+            for follower in followers:
+                handler, after = follower
+                if after is None:
+                    # Followers see changes from when they start, not history
+                    follower[1] = self.head()
+                    continue
+                while True:
+                    entries = self.read(after)
+                    self.db.session.rollback()
+                    if not entries:
+                        break
+                    handler(entries)
+                    after = follower[1] = entries[-1]['seq']
+                    delivered += len(entries)
+        self.delivered += delivered
+        return delivered
+
+    def compact(self, now=None):
+        # Deletes superseded entries every durable consumer has read; returns the entries removed
+        Transition, session = self.Transition, self.db.session
+        newer = aliased(Transition)
+        cutoff = (now or datetime.utcnow()) - timedelta(days=self.compact_after_days)
+        removed = 0
+        with self.app.app_context():
+            limit = session.query(func.min(self.Offset.seq)).scalar()
+            if limit is None:
+                limit = self.head()
+            start = session.query(func.min(Transition.seq)).scalar() or 0
+            # Seq windows keep each delete's transaction short
+            while start <= limit:
+                end = min(start + COMPACT_BATCH_SIZE, limit + 1)
+                removed += session.query(Transition).filter(
+                    Transition.seq >= start, Transition.seq < end, Transition.at < cutoff,
+                    exists().where(newer.request_pk == Transition.request_pk, newer.seq > Transition.seq)
+                ).delete(synchronize_session=False)
+                session.commit()
+                start = end
+        self._compacted_at = time.monotonic()
+        self.compacted += removed
+        if removed:
+            logger.info(f"Compacted {removed} request transitions")
+        return removed
+
+    def stats(self):
+        with self._lock:
+            followers = {name: after for name, (_, after) in self._followers.items()}
+        return {'captured': self.captured, 'delivered': self.delivered, 'compacted': self.compacted,
+                'followers': followers}
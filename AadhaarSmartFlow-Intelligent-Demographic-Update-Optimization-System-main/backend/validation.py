@@ -0,0 +1,208 @@
+# validation.py - Background validation of uploaded documents
+#
+# Each stored document is validated once per content hash on a bounded
+# process pool: magic-byte type detection, size and PDF page-count checks,
+# image dimension checks and a perceptual hash (dHash) for spotting re-used
+# photos. The perceptual hash needs Pillow; without it the field stays empty.
+# Results are handed back to the app through on_result; when the pool is
+# saturated, documents stay pending and are picked up through load_pending.
+import logging
+import os
+import re
+import struct
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
+
+logger = logging.getLogger(__name__)
+
+MAX_IN_FLIGHT = 64
+MIN_DOCUMENT_BYTES = 1024
+MAX_DOCUMENT_BYTES = 16 * 1024 * 1024
+MAX_PDF_PAGES = 50
+MIN_IMAGE_SIDE = 200
+MAX_IMAGE_SIDE = 12000
+SCAN_CHUNK_SIZE = 256 * 1024
+
+MAGIC_TYPES = (
+    (b'%PDF-', 'application/pdf'),
+    (b'\x89PNG\r\n\x1a\n', 'image/png'),
+    (b'\xff\xd8\xff', 'image/jpeg'),
+)
+PDF_PAGE_PATTERN = re.compile(rb'/Type\s*/Page(?![a-zA-Z])')
+
+
+def detect_type(header):
+    for magic, mimetype in MAGIC_TYPES:
+        if header.startswith(magic):
+            return mimetype
+    return None
+
+
+def count_pdf_pages(path):
+    # Scans in chunks; the last few bytes of each chunk are carried over so a
+    # marker split across a chunk boundary is counted exactly once
+    pages = 0
+    carry = b''
+    with open(path, 'rb') as f:
+        while True:
+            chunk = f.read(SCAN_CHUNK_SIZE)
+            data = carry + chunk
+            cut = len(data) - 16 if chunk else len(data)
+            pages += sum(1 for match in PDF_PAGE_PATTERN.finditer(data) if match.start() < cut)
+            if not chunk:
+                return pages
+            carry = data[cut:]
+
+
+def png_dimensions(header):
+    if len(header) < 24:
+        return None
+    return struct.unpack('>II', header[16:24])
+
+
+def jpeg_dimensions(path):
+    with open(path, 'rb') as f:
+        f.read(2)
+        while True:
+            marker = f.read(2)
+            if len(marker) < 2 or marker[0] != 0xFF:
+                return None
+            if marker[1] in (0xD8, 0x01) or 0xD0 <= marker[1] <= 0xD7:
+                continue
+            length_bytes = f.read(2)
+            if len(length_bytes) < 2:
+                return None
+            length = struct.unpack('>H', length_bytes)[0]
+            # SOF0-SOF15 except DHT (C4), JPG (C8) and DAC (CC) carry the frame size
+            if 0xC0 <= marker[1] <= 0xCF and marker[1] not in (0xC4, 0xC8, 0xCC):
+                height, width = struct.unpack('>xHH', f.read(5))
+                return width, height
+            f.seek(length - 2, os.SEEK_CUR)
+
+
+def perceptual_hash(path):
+    if Image is None:
+        return None
+    with Image.open(path) as image:
+        pixels = list(image.convert('L').resize((9, 8)).getdata())
+    bits = 0
+    for row in range(8):
+        for col in range(8):
+            bits = (bits << 1) | (pixels[row * 9 + col] > pixels[row * 9 + col + 1])
+    return f'{bits:016x}'
+
+
+def validate_document(path):
+    # Runs in a worker process; must only touch the file system
+    result = {'detected_type': None, 'page_count': None, 'width': None, 'height': None,
+              'phash': None, 'errors': []}
+    errors = result['errors']
+    try:
+        size = os.path.getsize(path)
+        with open(path, 'rb') as f:
+            header = f.read(32)
+
+        if size < MIN_DOCUMENT_BYTES:
+            errors.append('file too small')
+        elif size > MAX_DOCUMENT_BYTES:
+            errors.append('file too large')
+
+        mimetype = detect_type(header)
+        result['detected_type'] = mimetype
+        if mimetype is None:
+            errors.append('unsupported file type')
+        elif mimetype == 'application/pdf':
+            pages = count_pdf_pages(path)
+            result['page_count'] = pages
+            if not 1 <= pages <= MAX_PDF_PAGES:
+                errors.append(f'unexpected page count {pages}')
+        else:
+            dimensions = png_dimensions(header) if mimetype == 'image/png' else jpeg_dimensions(path)
+            if dimensions is None:
+                errors.append('unreadable image header')
+            else:
+                result['width'], result['height'] = dimensions
+                if min(dimensions) < MIN_IMAGE_SIDE or max(dimensions) > MAX_IMAGE_SIDE:
+                    errors.append(f'image dimensions {dimensions[0]}x{dimensions[1]} out of range')
+            try:
+                result['phash'] = perceptual_hash(path)
+            except Exception as e:
+                errors.append(f'image decode failed: {e}')
+    except OSError as e:
+        errors.append(f'unreadable: {e}')
+    return result
+
+
+class DocumentValidator:
+    def __init__(self, on_result, load_pending=None, max_workers=None, max_in_flight=MAX_IN_FLIGHT):
+        self.on_result = on_result
+        self.load_pending = load_pending
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.max_in_flight = max_in_flight
+        self._slots = threading.BoundedSemaphore(max_in_flight)
+        self._executor = None
+        self._lock = threading.Lock()
+        self._in_flight = set()
+
+    def _pool(self):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+            return self._executor
+
+    def submit(self, digest, path):
+        # False when saturated or already queued; the document then stays pending
+        with self._lock:
+            if digest in self._in_flight:
+                return False
+        if not self._slots.acquire(blocking=False):
+            return False
+        with self._lock:
+            self._in_flight.add(digest)
+        try:
+            future = self._pool().submit(validate_document, path)
+        except Exception:
+            self._release(digest)
+            raise
+        future.add_done_callback(lambda f: self._done(digest, f))
+        return True
+
+    def _release(self, digest):
+        with self._lock:
+            self._in_flight.discard(digest)
+        self._slots.release()
+
+    def _done(self, digest, future):
+        self._release(digest)
+        try:
+            self.on_result(digest, future.result())
+        except Exception as e:
+            logger.error(f"Document validation error for {digest}: {e}")
+        self.refill()
+
+    def refill(self):
+        # Picks up documents left pending (pool saturated, or a restart mid-validation)
+        if not self.load_pending:
+            return
+        with self._lock:
+            exclude = set(self._in_flight)
+        free = self.max_in_flight - len(exclude)
+        if free <= 0:
+            return
+        try:
+            for digest, path in self.load_pending(limit=free, exclude=exclude):
+                if not self.submit(digest, path):
+                    break
+        except Exception as e:
+            logger.error(f"Document validation refill error: {e}")
+
+    def shutdown(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor:
+            executor.shutdown(wait=True)
@@ -1,6 +1,7 @@
-import { useState } from "react";
+import { useEffect, useState } from "react";
 import { useNavigate } from "react-router-dom";
-import { ArrowLeft, CheckCircle, AlertCircle, XCircle, Info, Bell, Check } from "lucide-react";
+import { formatDistanceToNow } from "date-fns";
+import { ArrowLeft, CheckCircle, AlertCircle, XCircle, Info, Bell, Check, Loader2 } from "lucide-react";
 import { Button } from "@/components/ui/button";
 import Navbar from "@/components/Navbar";
 import { cn } from "@/lib/utils";
@@ -10,70 +11,97 @@ interface Notification {
   type: "success" | "warning" | "error" | "info";
   title: string;
   message: string;
-  time: string;
+  time?: string;
+  created_at: string | null;
   read: boolean;
   requestId?: string;
 }
 
+const API_BASE = "/api";
+
 const Notifications = () => {
   const navigate = useNavigate();
-  const [notifications, setNotifications] = useState<Notification[]>([
-    {
-      id: 1,
-      type: "success",
-      title: "Update Auto-Approved",
-      message: "Your address update request (REQ-2024-001) has been automatically approved. Changes will reflect within 24 hours.",
-      time: "2 hours ago",
-      read: false,
-      requestId: "REQ-2024-001",
-    },
-    {
-      id: 2,
-      type: "info",
-      title: "Under Officer Review",
-      message: "Your name correction request (REQ-2024-002) has been flagged for manual review due to medium risk assessment.",
-      time: "1 day ago",
-      read: false,
-      requestId: "REQ-2024-002",
-    },
-    {
-      id: 3,
-      type: "warning",
-      title: "Additional Documents Required",
-      message: "Please upload a valid address proof document for your DOB correction request (REQ-2024-003).",
-      time: "2 days ago",
-      read: true,
-      requestId: "REQ-2024-003",
-    },
-    {
-      id: 4,
-      type: "success",
-      title: "Duplicate Request Prevented",
-      message: "We detected and prevented a duplicate submission for address update. No action needed.",
-      time: "3 days ago",
-      read: true,
-    },
-    {
-      id: 5,
-      type: "error",
-      title: "Request Rejected",
-      message: "Your previous DOB correction request was rejected due to insufficient supporting documents.",
-      time: "1 week ago",
-      read: true,
-      requestId: "REQ-2023-089",
-    },
-  ]);
-
-  const markAllRead = () => {
-    setNotifications(notifications.map(n => ({ ...n, read: true })));
+  const [userName, setUserName] = useState("User");
+  const [notifications, setNotifications] = useState<Notification[]>([]);
+  const [unreadCount, setUnreadCount] = useState(0);
+  const [nextCursor, setNextCursor] = useState<string | null>(null);
+  const [loading, setLoading] = useState(true);
+  const [loadingMore, setLoadingMore] = useState(false);
+
+  const token = localStorage.getItem("token");
+
+  useEffect(() => {
+    const userStr = localStorage.getItem("user");
+    if (userStr) {
+      try {
+        setUserName(JSON.parse(userStr).name || "User");
+      } catch (e) {
+        console.error("Error parsing user data", e);
+      }
+    }
+    fetchNotifications();
+  }, []);
+
+  const fetchNotifications = async (cursor?: string) => {
+    try {
+      const query = cursor ? `?cursor=${encodeURIComponent(cursor)}` : "";
+      const res = await fetch(`${API_BASE}/notifications${query}`, {
+        headers: { Authorization: `Bearer ${token}` }
+      });
+      const data = await res.json();
+      if (data.success) {
+        setNotifications(prev => cursor ? [...prev, ...data.notifications] : data.notifications);
+        setUnreadCount(data.unread);
+        setNextCursor(data.next_cursor);
+      }
+    } catch (err) {
+      console.error("Fetch notifications error:", err);
+    } finally {
+      setLoading(false);
+      setLoadingMore(false);
+    }
   };
 
-  const markAsRead = (id: number) => {
-    setNotifications(notifications.map(n => 
-      n.id === id ? { ...n, read: true } : n
-    ));
+  const loadMore = () => {
+    if (!nextCursor) return;
+    setLoadingMore(true);
+    fetchNotifications(nextCursor);
+  };
+
+  const markRead = async (ids?: number[]) => {
+    try {
+      const res = await fetch(`${API_BASE}/notifications/read`, {
+        method: "POST",
+        headers: {
+          "Content-Type": "application/json",
+          Authorization: `Bearer ${token}`
+        },
+        // Without ids the backend marks every unread notification
+        body: JSON.stringify(ids ? { ids } : {})
+      });
+      const data = await res.json();
+      if (data.success) {
+        setNotifications(prev => prev.map(n => (!ids || ids.includes(n.id) ? { ...n, read: true } : n)));
+        setUnreadCount(data.unread);
+      }
+    } catch (err) {
+      console.error("Mark notifications read error:", err);
+    }
+  };
+
+  const markAllRead = () => markRead();
+
+  const markAsRead = (notification: Notification) => {
+    if (!notification.read) {
+      markRead([notification.id]);
+    }
   };
 
+  const formatTime = (notification: Notification) =>
+    notification.created_at
+      ? formatDistanceToNow(new Date(`${notification.created_at}Z`), { addSuffix: true })
+      : notification.time;
+
   const typeConfig = {
     success: { icon: CheckCircle, color: "text-success", bg: "bg-success/10" },
     warning: { icon: AlertCircle, color: "text-warning", bg: "bg-warning/10" },
@@ -81,11 +109,9 @@ const Notifications = () => {
     info: { icon: Info, color: "text-info", bg: "bg-info/10" },
   };
 
-  const unreadCount = notifications.filter(n => !n.read).length;
-
   return (
     <div className="min-h-screen bg-background">
-      <Navbar userType="user" userName="Rahul Sharma" />
+      <Navbar userType="user" userName={userName} />
 
       <main className="container mx-auto px-4 py-8 max-w-3xl">
         {/* Header */}
@@ -112,16 +138,22 @@ const Notifications = () => {
           </div>
         </div>
 
+        {loading && (
+          <div className="flex justify-center py-16">
+            <Loader2 className="animate-spin text-muted-foreground" size={28} />
+          </div>
+        )}
+
         {/* Notifications List */}
         <div className="space-y-4">
           {notifications.map((notification) => {
-            const config = typeConfig[notification.type];
+            const config = typeConfig[notification.type] || typeConfig.info;
             const Icon = config.icon;
 
             return (
               <div
                 key={notification.id}
-                onClick={() => markAsRead(notification.id)}
+                onClick={() => markAsRead(notification)}
                 className={cn(
                   "p-5 rounded-xl border transition-all duration-200 cursor-pointer",
                   notification.read
@@ -147,7 +179,7 @@ const Notifications = () => {
                         )}
                       </div>
                       <span className="text-xs text-muted-foreground whitespace-nowrap">
-                        {notification.time}
+                        {formatTime(notification)}
                       </span>
                     </div>
                     <p className="text-sm text-muted-foreground mt-1">
@@ -171,8 +203,17 @@ const Notifications = () => {
           })}
         </div>
 
+        {nextCursor && (
+          <div className="flex justify-center mt-6">
+            <Button variant="outline" onClick={loadMore} disabled={loadingMore}>
+              {loadingMore && <Loader2 className="animate-spin" size={16} />}
+              Load more
+            </Button>
+          </div>
+        )}
+
         {/* Empty State */}
-        {notifications.length === 0 && (
+        {!loading && notifications.length === 0 && (
           <div className="text-center py-16">
             <div className="w-16 h-16 rounded-full bg-muted flex items-center justify-center mx-auto mb-4">
               <Bell className="text-muted-foreground" size={28} />
@@ -1,5 +1,6 @@
 import { useEffect, useState } from "react";
 import { Link } from "react-router-dom";
+import { formatDistanceToNow } from "date-fns";
 import { FileText, Search, Bell, Plus, CheckCircle, Clock, XCircle, ArrowRight, TrendingUp } from "lucide-react";
 import { Button } from "@/components/ui/button";
 import Navbar from "@/components/Navbar";
@@ -192,7 +193,11 @@ const UserDashboard = () => {
                     <div className={`w-2 h-2 rounded-full mt-2 ${notification.type === "success" ? "bg-success" : "bg-info"}`} />
                     <div>
                       <p className="text-sm text-foreground">{notification.message}</p>
-                      <p className="text-xs text-muted-foreground mt-1">{notification.time}</p>
+                      <p className="text-xs text-muted-foreground mt-1">
+                        {notification.created_at
+                          ? formatDistanceToNow(new Date(`${notification.created_at}Z`), { addSuffix: true })
+                          : notification.time}
+                      </p>
                     </div>
                   </div>
                 </div>